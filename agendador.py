@@ -0,0 +1,579 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Agendador contínuo de monitoramento do catálogo
+
+Cada produto do catálogo (MEIU_CATALOGO, padrão catalogo.json) tem intervalo
+de atualização, prioridade e fonte próprios:
+
+    {"padrao": {"intervalo_min": 360, "prioridade": 5, "fonte": "google_shopping"},
+     "orcamentos": {"global": 600, "google_shopping": 600},
+     "produtos": [{"produto": "geladeira frost free", "intervalo_min": 60, "prioridade": 1}, ...]}
+
+Sem o catálogo, as linhas de produtos.txt entram com os valores padrão.
+
+As próximas execuções ficam em um heap ordenado pelo horário devido. Um
+produto novo recebe uma fase estável dentro do próprio intervalo (derivada
+do nome), de modo que milhares de produtos com o mesmo intervalo se
+distribuem ao longo dele em vez de vencerem todos juntos. Entre os produtos
+vencidos, os de maior prioridade (menor número) saem primeiro, limitados
+pelos orçamentos de buscas por hora (global e por fonte, em baldes de
+fichas). A prioridade envelhece: cada ENVELHECIMENTO_S de atraso vale um
+nível a mais, de modo que sob orçamento apertado os produtos de baixa
+prioridade atrasam, mas não ficam sem execução para sempre. Produtos buscados há pouco (por este agendador ou por outro
+caminho, segundo o histórico) são pulados e reagendados.
+
+O estado (última execução, próxima execução e falhas de cada produto) é
+gravado em dados/agendador_estado.json; depois de um reinício só os
+produtos realmente vencidos são buscados.
+
+Uso:
+    python agendador.py executar [--threads 3]
+    python agendador.py simular [--horas 24] [--threads 3] [--duracao-busca 8] [--sinteticos 5000]
+
+O modo `simular` roda o agendamento com relógio simulado, sem rede e sem
+gravar o estado, e informa vazão, atraso de cada produto em relação ao
+horário previsto e produtos famintos (esperando mais que o próprio
+intervalo).
+"""
+
+import argparse
+import heapq
+import json
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from historico import DATA_DIR, obter_historico
+from tentativas import MARCACAO, TRANSITORIA, BuscaAdiada, classificar_falha, obter_disjuntor
+
+ARQUIVO_CATALOGO = os.environ.get("MEIU_CATALOGO", "catalogo.json")
+ARQUIVO_ESTADO = os.path.join(DATA_DIR, "agendador_estado.json")
+INTERVALO_PADRAO_MIN = int(os.environ.get("MEIU_INTERVALO_PADRAO_MIN", "360"))
+ORCAMENTO_GLOBAL_HORA = int(os.environ.get("MEIU_ORCAMENTO_GLOBAL_HORA", "600"))
+PRIORIDADE_PADRAO = 5
+FONTE_PADRAO = "google_shopping"
+
+# Um produto buscado há menos desta fração do intervalo é considerado atualizado
+FRACAO_FRESCOR = 0.9
+ESPERA_FALHA_S = 300            # primeira espera após uma falha, dobrando até o intervalo
+INTERVALO_GRAVACAO_S = 30
+INTERVALO_FRESCOR_S = 600       # releitura do histórico para detectar buscas feitas por outros caminhos
+# Segundos de atraso que equivalem a um nível de prioridade
+ENVELHECIMENTO_S = float(os.environ.get("MEIU_ENVELHECIMENTO_S", "1800"))
+
+
+class OrcamentoTaxa:
+    """Balde de fichas: `por_hora` buscas por hora com rajada de um minuto"""
+
+    def __init__(self, por_hora, agora):
+        self.taxa = por_hora / 3600.0
+        self.capacidade = max(1.0, por_hora / 60.0)
+        self.fichas = self.capacidade
+        self.atualizado_em = agora
+
+    def _repor(self, agora):
+        self.fichas = min(self.capacidade, self.fichas + (agora - self.atualizado_em) * self.taxa)
+        self.atualizado_em = agora
+
+    def disponivel(self, agora):
+        self._repor(agora)
+        return self.fichas >= 1.0
+
+    def consumir(self, agora):
+        self._repor(agora)
+        self.fichas -= 1.0
+
+    def espera(self, agora):
+        """Segundos até a próxima ficha"""
+        self._repor(agora)
+        if self.fichas >= 1.0:
+            return 0.0
+        return (1.0 - self.fichas) / self.taxa if self.taxa else float("inf")
+
+
+def carregar_catalogo(caminho=ARQUIVO_CATALOGO):
+    """Itens do catálogo e orçamentos por hora ({"global": n, fonte: n})"""
+    if os.path.exists(caminho):
+        with open(caminho, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+    elif os.path.exists("produtos.txt"):
+        with open("produtos.txt", 'r', encoding='utf-8') as f:
+            dados = {"produtos": [{"produto": linha.strip()} for linha in f if linha.strip()]}
+    else:
+        raise FileNotFoundError(f"Catálogo não encontrado: {caminho}")
+
+    padrao = {"intervalo_min": INTERVALO_PADRAO_MIN, "prioridade": PRIORIDADE_PADRAO, "fonte": FONTE_PADRAO}
+    padrao.update(dados.get("padrao", {}))
+    itens = {}
+    for entrada in dados.get("produtos", []):
+        if isinstance(entrada, str):
+            entrada = {"produto": entrada}
+        item = dict(padrao, **entrada)
+        item["produto"] = item["produto"].strip()
+        if item["produto"]:
+            itens[item["produto"]] = item
+    orcamentos = {"global": ORCAMENTO_GLOBAL_HORA}
+    orcamentos.update(dados.get("orcamentos", {}))
+    return list(itens.values()), orcamentos
+
+
+def catalogo_sintetico(quantidade, semente=0):
+    """Catálogo fictício com intervalos e prioridades variados, para simulações"""
+    aleatorio = random.Random(semente)
+    perfis = [(60, 1), (180, 3), (360, 5), (720, 5), (1440, 8)]
+    pesos = [5, 15, 40, 25, 15]
+    itens = []
+    for i in range(quantidade):
+        intervalo, prioridade = aleatorio.choices(perfis, pesos)[0]
+        itens.append({"produto": f"sku {i:05d}", "intervalo_min": intervalo,
+                      "prioridade": prioridade, "fonte": FONTE_PADRAO})
+    return itens
+
+
+def fase_estavel(produto, intervalo_s):
+    """Deslocamento do produto dentro do intervalo, sempre o mesmo para o mesmo nome"""
+    return (zlib.crc32(produto.encode("utf-8")) / 2 ** 32) * intervalo_s
+
+
+def classificar_resultado(resultado):
+    """
+    "sucesso" ou o tipo de falha (tentativas) de um resultado de busca
+
+    buscar_produtos_patrocinados devolve um resultado vazio quando todas as
+    tentativas falham, então busca sem ofertas também conta como falha. Os
+    bloqueios chegam como BuscaAdiada e são tratados à parte.
+    """
+    if resultado.get("erro"):
+        return TRANSITORIA
+    if not resultado.get("produtos_patrocinados"):
+        return MARCACAO
+    return "sucesso"
+
+
+def _epoca(timestamp):
+    try:
+        return datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class Agendador:
+    """
+    Núcleo do agendamento, sem threads nem relógio próprio
+
+    `proximas_tarefas(agora, vagas)` devolve os produtos a iniciar e
+    `concluir(produto, agora, resultado)` reagenda; o laço de execução e a
+    simulação usam os mesmos métodos.
+    """
+
+    def __init__(self, itens, orcamentos, agora, estado=None):
+        self.itens = {item["produto"]: item for item in itens}
+        self.orcamentos = {fonte: OrcamentoTaxa(por_hora, agora) for fonte, por_hora in orcamentos.items()}
+        self.estado = {}
+        self._agenda = []       # (devido_em, seq, produto)
+        self._prontos = []      # (prioridade envelhecida, devido_em, seq, produto)
+        self._em_execucao = {}
+        self._seq = 0
+        self._lock = threading.RLock()
+        self.contadores = {"iniciadas": 0, "sucessos": 0, "falhas": 0, "adiadas": 0, "puladas_frescas": 0}
+        self.atrasos = {}       # produto -> [soma_s, execucoes, maximo_s]
+        self.falhas_por_tipo = {}
+
+        estado = estado or {}
+        for produto, item in self.itens.items():
+            anterior = estado.get(produto, {})
+            intervalo = item["intervalo_min"] * 60
+            ultima = anterior.get("ultima_execucao")
+            proxima = anterior.get("proxima")
+            if proxima is None:
+                proxima = ultima + intervalo if ultima else agora + fase_estavel(produto, intervalo)
+            self.estado[produto] = {"ultima_execucao": ultima, "proxima": proxima,
+                                    "falhas": anterior.get("falhas", 0)}
+            self._agendar(produto, proxima)
+
+    def _agendar(self, produto, devido_em):
+        self.estado[produto]["proxima"] = devido_em
+        self._seq += 1
+        heapq.heappush(self._agenda, (devido_em, self._seq, produto))
+
+    def _intervalo(self, produto):
+        return self.itens[produto]["intervalo_min"] * 60
+
+    def _mover_vencidos(self, agora):
+        while self._agenda and self._agenda[0][0] <= agora:
+            devido_em, seq, produto = heapq.heappop(self._agenda)
+            # Entradas antigas de um produto reagendado são descartadas aqui
+            if produto not in self.estado or self.estado[produto]["proxima"] != devido_em:
+                continue
+            heapq.heappush(self._prontos, (self._chave_prioridade(produto, devido_em), devido_em, seq, produto))
+
+    def _chave_prioridade(self, produto, devido_em):
+        # prioridade - atraso / ENVELHECIMENTO_S ordena os prontos do mesmo jeito a qualquer
+        # instante; multiplicada por ENVELHECIMENTO_S vira uma chave fixa para o heap
+        return self.itens[produto]["prioridade"] * ENVELHECIMENTO_S + devido_em
+
+    def _orcamentos_de(self, produto):
+        fonte = self.itens[produto]["fonte"]
+        return [self.orcamentos[nome] for nome in ("global", fonte) if nome in self.orcamentos]
+
+    def proximas_tarefas(self, agora, vagas):
+        """Retira até `vagas` produtos vencidos, por prioridade envelhecida, dentro dos orçamentos"""
+        with self._lock:
+            self._mover_vencidos(agora)
+            iniciar = []
+            sem_orcamento = []
+            fontes_esgotadas = set()
+            global_ = self.orcamentos.get("global")
+            if vagas <= 0 or (global_ is not None and not global_.disponivel(agora)):
+                return iniciar
+            while self._prontos and len(iniciar) < vagas:
+                chave, devido_em, seq, produto = heapq.heappop(self._prontos)
+                estado = self.estado[produto]
+                if estado["proxima"] != devido_em:
+                    continue
+                ultima = estado["ultima_execucao"]
+                if ultima and agora - ultima < FRACAO_FRESCOR * self._intervalo(produto) and not estado["falhas"]:
+                    self.contadores["puladas_frescas"] += 1
+                    self._agendar(produto, ultima + self._intervalo(produto))
+                    continue
+                fonte = self.itens[produto]["fonte"]
+                orcamentos = self._orcamentos_de(produto)
+                if fonte in fontes_esgotadas or not all(o.disponivel(agora) for o in orcamentos):
+                    # Outras fontes podem ter orçamento; este espera no heap de prontos
+                    fontes_esgotadas.add(fonte)
+                    sem_orcamento.append((chave, devido_em, seq, produto))
+                    if global_ is not None and not global_.disponivel(agora) or len(sem_orcamento) > 50:
+                        break
+                    continue
+                for orcamento in orcamentos:
+                    orcamento.consumir(agora)
+                atraso = max(0.0, agora - devido_em)
+                acumulado = self.atrasos.setdefault(produto, [0.0, 0, 0.0])
+                acumulado[0] += atraso
+                acumulado[1] += 1
+                acumulado[2] = max(acumulado[2], atraso)
+                self._em_execucao[produto] = agora
+                estado["proxima"] = None
+                self.contadores["iniciadas"] += 1
+                iniciar.append(produto)
+            for entrada in sem_orcamento:
+                heapq.heappush(self._prontos, entrada)
+            return iniciar
+
+    def concluir(self, produto, agora, resultado):
+        """Reagenda após a busca: "sucesso", "adiada" (disjuntor de bloqueio) ou qualquer tipo de falha"""
+        with self._lock:
+            self._em_execucao.pop(produto, None)
+            if produto not in self.estado:
+                return
+            estado = self.estado[produto]
+            intervalo = self._intervalo(produto)
+            if resultado == "sucesso":
+                self.contadores["sucessos"] += 1
+                estado["ultima_execucao"] = agora
+                estado["falhas"] = 0
+                self._agendar(produto, agora + intervalo)
+            elif resultado == "adiada":
+                self.contadores["adiadas"] += 1
+                self._agendar(produto, agora + ESPERA_FALHA_S)
+            else:
+                self.contadores["falhas"] += 1
+                self.falhas_por_tipo[resultado] = self.falhas_por_tipo.get(resultado, 0) + 1
+                estado["falhas"] += 1
+                espera = min(intervalo, ESPERA_FALHA_S * 2 ** (estado["falhas"] - 1))
+                self._agendar(produto, agora + espera)
+
+    def registrar_buscas_externas(self, ultimas):
+        """Adianta a última execução dos produtos buscados por outros caminhos ({produto: época})"""
+        with self._lock:
+            for produto, ultima in ultimas.items():
+                estado = self.estado.get(produto)
+                if estado is None or produto in self._em_execucao or ultima is None:
+                    continue
+                if estado["ultima_execucao"] is None or ultima > estado["ultima_execucao"]:
+                    estado["ultima_execucao"] = ultima
+                    if estado["proxima"] is not None and ultima + self._intervalo(produto) > estado["proxima"]:
+                        self._agendar(produto, ultima + self._intervalo(produto))
+
+    def proximo_evento(self, agora):
+        """Horário em que vale a pena chamar proximas_tarefas de novo"""
+        with self._lock:
+            candidatos = []
+            if self._prontos:
+                produto = self._prontos[0][3]
+                candidatos.append(agora + max(o.espera(agora) for o in self._orcamentos_de(produto)))
+            if self._agenda:
+                candidatos.append(self._agenda[0][0])
+            return min(candidatos) if candidatos else None
+
+    def pendentes(self, agora):
+        """Produtos vencidos que ainda não começaram"""
+        with self._lock:
+            self._mover_vencidos(agora)
+            return len(self._prontos)
+
+    def exportar_estado(self):
+        with self._lock:
+            return {produto: dict(estado) for produto, estado in self.estado.items()}
+
+    def relatorio_atrasos(self, agora=None):
+        """Atraso de cada produto em relação ao horário previsto, com percentis gerais e famintos"""
+        with self._lock:
+            por_produto = {
+                produto: {"execucoes": n, "atraso_medio_s": round(soma / n, 1), "atraso_maximo_s": round(maximo, 1)}
+                for produto, (soma, n, maximo) in self.atrasos.items() if n
+            }
+            # Produtos vencidos que ainda esperam contam com o atraso atual
+            if agora is not None:
+                for _, devido_em, _, produto in self._prontos:
+                    if self.estado[produto]["proxima"] == devido_em and agora > devido_em:
+                        atual = por_produto.setdefault(produto, {"execucoes": 0, "atraso_medio_s": 0.0,
+                                                                 "atraso_maximo_s": 0.0})
+                        atual["atraso_maximo_s"] = max(atual["atraso_maximo_s"], round(agora - devido_em, 1))
+        maximos = sorted(d["atraso_maximo_s"] for d in por_produto.values())
+        # Faminto: esperou mais que o próprio intervalo, ou seja, perdeu um ciclo inteiro
+        famintos = sorted(produto for produto, d in por_produto.items()
+                          if d["atraso_maximo_s"] > self._intervalo(produto))
+        por_prioridade = {}
+        for produto, d in por_produto.items():
+            prioridade = self.itens[produto]["prioridade"]
+            por_prioridade[prioridade] = max(por_prioridade.get(prioridade, 0.0), d["atraso_maximo_s"])
+
+        def percentil(p):
+            return maximos[min(len(maximos) - 1, int(p * len(maximos)))] if maximos else 0.0
+
+        return {
+            "produtos_com_execucao": sum(1 for d in por_produto.values() if d["execucoes"]),
+            "sem_execucao": len(self.estado) - sum(1 for d in por_produto.values() if d["execucoes"]),
+            "atraso_maximo_p50_s": percentil(0.5),
+            "atraso_maximo_p95_s": percentil(0.95),
+            "atraso_maximo_s": maximos[-1] if maximos else 0.0,
+            "atraso_maximo_por_prioridade": {str(p): por_prioridade[p] for p in sorted(por_prioridade)},
+            "famintos": len(famintos),
+            "famintos_sem_execucao": sum(1 for p in famintos if not por_produto[p]["execucoes"]),
+            "exemplos_famintos": famintos[:10],
+            "piores": sorted(({"produto": p, **d} for p, d in por_produto.items()),
+                             key=lambda d: -d["atraso_maximo_s"])[:10],
+            "por_produto": por_produto,
+        }
+
+
+def carregar_estado(caminho=ARQUIVO_ESTADO):
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def salvar_estado(agendador, caminho=ARQUIVO_ESTADO):
+    """Grava o estado de forma atômica (arquivo temporário + rename)"""
+    conteudo = json.dumps(agendador.exportar_estado(), ensure_ascii=False)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + ".tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        f.write(conteudo)
+    os.replace(temporario, caminho)
+
+
+def _ultimas_do_historico(historico):
+    return {produto: _epoca(ts) for produto, ts in historico.ultimas_buscas().items()}
+
+
+def simular(itens, orcamentos, horas=24, max_threads=3, duracao_busca=8.0, taxa_falha=0.02,
+            estado=None, semente=0):
+    """
+    Simula `horas` de agendamento com relógio próprio (eventos discretos)
+
+    Cada busca dura `duracao_busca` segundos (±50%) e falha com probabilidade
+    `taxa_falha`. Retorna vazão por hora, contadores e atrasos por produto.
+    """
+    aleatorio = random.Random(semente)
+    inicio = time.time()
+    agora = inicio
+    fim = inicio + horas * 3600
+    agendador = Agendador(itens, orcamentos, agora, estado=estado)
+    em_execucao = []    # (termina_em, seq, produto)
+    seq = 0
+    inicios_por_hora = [0] * int(horas)
+    fila_maxima = 0
+
+    while agora < fim:
+        while em_execucao and em_execucao[0][0] <= agora:
+            termina_em, _, produto = heapq.heappop(em_execucao)
+            agendador.concluir(produto, termina_em, "falha" if aleatorio.random() < taxa_falha else "sucesso")
+
+        for produto in agendador.proximas_tarefas(agora, max_threads - len(em_execucao)):
+            hora = int((agora - inicio) // 3600)
+            if hora < len(inicios_por_hora):
+                inicios_por_hora[hora] += 1
+            seq += 1
+            duracao = duracao_busca * aleatorio.uniform(0.5, 1.5)
+            heapq.heappush(em_execucao, (agora + duracao, seq, produto))
+        fila_maxima = max(fila_maxima, agendador.pendentes(agora))
+
+        candidatos = [fim]
+        if em_execucao:
+            candidatos.append(em_execucao[0][0])
+        if len(em_execucao) < max_threads:
+            proximo = agendador.proximo_evento(agora)
+            if proximo is not None:
+                candidatos.append(proximo)
+        agora = max(agora + 0.001, min(candidatos))
+
+    atrasos = agendador.relatorio_atrasos(agora)
+    intervalos = [item["intervalo_min"] for item in itens]
+    demanda_hora = sum(60.0 / i for i in intervalos)
+    return {
+        "parametros": {"produtos": len(itens), "horas": horas, "threads": max_threads,
+                       "duracao_busca_s": duracao_busca, "taxa_falha": taxa_falha, "orcamentos": orcamentos},
+        "demanda_buscas_hora": round(demanda_hora, 1),
+        "capacidade_buscas_hora": round(min(3600.0 * max_threads / duracao_busca,
+                                            *orcamentos.values()), 1),
+        "vazao_buscas_hora": round(agendador.contadores["iniciadas"] / horas, 1),
+        "inicios_por_hora": inicios_por_hora,
+        "fila_maxima": fila_maxima,
+        "contadores": agendador.contadores,
+        "falhas_por_tipo": agendador.falhas_por_tipo,
+        "atrasos": atrasos,
+    }
+
+
+class ServicoAgendador:
+    """Laço de longa duração que executa as buscas vencidas com o buscador compartilhado"""
+
+    def __init__(self, agendador, max_threads=3, buscador=None, historico=None, detector=None,
+                 arquivo_estado=ARQUIVO_ESTADO):
+        self.agendador = agendador
+        self.max_threads = max_threads
+        self.buscador = buscador
+        self.historico = historico or obter_historico()
+        self.detector = detector
+        self.arquivo_estado = arquivo_estado
+        self._parar = threading.Event()
+        self._mudou = threading.Event()
+        self._em_execucao = 0
+        self._lock = threading.Lock()
+
+    def parar(self):
+        self._parar.set()
+        self._mudou.set()
+
+    def _buscar(self, produto):
+        resultado_agenda = TRANSITORIA
+        try:
+            resultado = self.buscador.buscar(produto, forcar=True)
+            resultado_agenda = classificar_resultado(resultado)
+            self.historico.salvar_buscas([resultado])
+            if resultado_agenda == "sucesso" and self.detector is not None:
+                self.detector.processar(resultado)
+            ofertas = len(resultado.get("produtos_patrocinados", []))
+            if resultado_agenda == "sucesso":
+                print(f" Agendador: {produto} ({ofertas} produtos)")
+            else:
+                print(f" Agendador: falha em '{produto}' ({resultado_agenda}, {ofertas} produtos)")
+        except BuscaAdiada as e:
+            print(f" Agendador: {e}")
+            resultado_agenda = "adiada"
+        except Exception as e:
+            resultado_agenda = classificar_falha(e)
+            print(f" Agendador: erro em '{produto}' ({resultado_agenda}): {e}")
+        finally:
+            self.agendador.concluir(produto, time.time(), resultado_agenda)
+            with self._lock:
+                self._em_execucao -= 1
+            self._mudou.set()
+
+    def executar(self):
+        from alertas import obter_detector
+
+        pool = None
+        if self.buscador is None:
+            from backends_busca import BuscadorBackends, BackendSelenium
+            from pool_drivers import PoolDrivers
+
+            pool = PoolDrivers(tamanho=self.max_threads, aquecer=False)
+            self.buscador = BuscadorBackends(selenium=BackendSelenium(pool_drivers=pool))
+        self.detector = self.detector or obter_detector()
+        disjuntor = obter_disjuntor()
+        executor = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix="agendador")
+        ultima_gravacao = ultima_leitura_historico = 0.0
+        print(f"Agendador iniciado com {len(self.agendador.itens)} produtos e {self.max_threads} threads")
+        try:
+            while not self._parar.is_set():
+                agora = time.time()
+                if agora - ultima_leitura_historico >= INTERVALO_FRESCOR_S:
+                    self.agendador.registrar_buscas_externas(_ultimas_do_historico(self.historico))
+                    ultima_leitura_historico = agora
+                if not disjuntor.aguardar_liberacao(self._parar):
+                    break
+
+                with self._lock:
+                    vagas = self.max_threads - self._em_execucao
+                for produto in self.agendador.proximas_tarefas(agora, vagas):
+                    with self._lock:
+                        self._em_execucao += 1
+                    executor.submit(self._buscar, produto)
+
+                if agora - ultima_gravacao >= INTERVALO_GRAVACAO_S:
+                    salvar_estado(self.agendador, self.arquivo_estado)
+                    ultima_gravacao = agora
+
+                proximo = self.agendador.proximo_evento(time.time())
+                espera = INTERVALO_GRAVACAO_S if proximo is None else min(INTERVALO_GRAVACAO_S, proximo - time.time())
+                self._mudou.wait(max(0.05, espera))
+                self._mudou.clear()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            salvar_estado(self.agendador, self.arquivo_estado)
+            if pool is not None:
+                self.buscador.fechar()
+                pool.fechar()
+            print("Agendador encerrado; estado salvo")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agendador contínuo de monitoramento de preços")
+    parser.add_argument("comando", choices=["executar", "simular"])
+    parser.add_argument("--catalogo", default=ARQUIVO_CATALOGO)
+    parser.add_argument("--threads", type=int, default=3)
+    parser.add_argument("--horas", type=float, default=24)
+    parser.add_argument("--duracao-busca", type=float, default=8.0, help="duração simulada de cada busca (s)")
+    parser.add_argument("--taxa-falha", type=float, default=0.02)
+    parser.add_argument("--sinteticos", type=int, default=0, help="simula um catálogo fictício com N produtos")
+    parser.add_argument("--estado-limpo", action="store_true", help="simula sem o estado gravado")
+    parser.add_argument("--saida", help="grava o relatório da simulação em JSON")
+    args = parser.parse_args()
+
+    if args.sinteticos:
+        itens, orcamentos = catalogo_sintetico(args.sinteticos), {"global": ORCAMENTO_GLOBAL_HORA}
+    else:
+        itens, orcamentos = carregar_catalogo(args.catalogo)
+
+    if args.comando == "simular":
+        estado = {} if args.estado_limpo or args.sinteticos else carregar_estado()
+        relatorio = simular(itens, orcamentos, horas=args.horas, max_threads=args.threads,
+                            duracao_busca=args.duracao_busca, taxa_falha=args.taxa_falha, estado=estado)
+        resumo = {k: v for k, v in relatorio.items() if k != "atrasos"}
+        resumo["atrasos"] = {k: v for k, v in relatorio["atrasos"].items() if k != "por_produto"}
+        print(json.dumps(resumo, indent=2, ensure_ascii=False))
+        if args.saida:
+            with open(args.saida, 'w', encoding='utf-8') as f:
+                json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        sys.exit(0)
+
+    historico = obter_historico()
+    agendador = Agendador(itens, orcamentos, time.time(), estado=carregar_estado())
+    agendador.registrar_buscas_externas(_ultimas_do_historico(historico))
+    servico = ServicoAgendador(agendador, max_threads=args.threads, historico=historico)
+    try:
+        servico.executar()
+    except KeyboardInterrupt:
+        servico.parar()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Agrupamento de ofertas de lojas diferentes em produtos canônicos
+
+Títulos são normalizados (acentos, unidades, códigos de modelo) e cada
+oferta só é comparada com os grupos que compartilham alguma chave de bloco
+em um índice invertido (códigos de modelo e os termos mais raros do
+título), em vez de comparar todos os pares. O agrupamento é incremental:
+novas ofertas entram em um grupo existente ou abrem um novo.
+
+Uso para avaliar com ofertas rotuladas:
+    python agrupamento.py avaliar [fixtures/ofertas_rotuladas.json]
+"""
+
+import json
+import math
+import os
+import re
+import sys
+import threading
+import unicodedata
+from collections import Counter
+
+from precos import centavos_da_oferta
+
+LIMIAR_SIMILARIDADE = 0.5
+# Com um código de modelo em comum basta uma similaridade menor
+LIMIAR_MESMO_MODELO = 0.3
+CHAVES_RARAS_POR_OFERTA = 3
+# Chaves comuns demais não servem para bloquear (exceto códigos de modelo)
+MAX_GRUPOS_POR_CHAVE = 200
+
+ARQUIVO_ROTULADO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "ofertas_rotuladas.json")
+
+PALAVRAS_IGNORADAS = {
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "com", "para", "por", "p", "c",
+    "novo", "nova", "original", "oficial", "frete", "gratis", "promocao", "oferta", "envio", "imediato",
+    "ate", "cor", "un", "unidade", "kit", "produto", "loja", "br", "www", "https", "http", "mlb",
+}
+
+UNIDADES = {
+    "l": "l", "lt": "l", "lts": "l", "litro": "l", "litros": "l",
+    "ml": "ml", "kg": "kg", "gr": "g", "gramas": "g",
+    "gb": "gb", "tb": "tb", "mb": "mb",
+    "w": "w", "watts": "w", "v": "v", "volts": "v", "hz": "hz", "mah": "mah",
+    "mm": "mm", "cm": "cm", "m": "m", "metro": "m", "metros": "m",
+    "pol": "pol", "polegadas": "pol", "\"": "pol", "btu": "btu", "btus": "btu",
+}
+
+REGEX_MEDIDA = re.compile(
+    r'(?<![a-z0-9.])(\d+(?:[.,]\d+)?)\s*(' + "|".join(sorted((re.escape(u) for u in UNIDADES), key=len, reverse=True)) + r')(?![a-z0-9])'
+)
+REGEX_TERMOS = re.compile(r'[a-z0-9.]+')
+REGEX_DECIMAL = re.compile(r'(\d),(\d)')
+REGEX_NUMERO = re.compile(r'\d+\.\d+')
+# Código com hífen: "AF-30" -> "af30"
+REGEX_CODIGO_HIFEN = re.compile(r'\b([a-z]{1,4})-(\d{2,})\b')
+# Em slugs de URL a vírgula decimal vira hífen: "1-50", "3-5l"
+REGEX_DECIMAL_SLUG = re.compile(r'\b(\d)-(\d{1,2})(?!\d)')
+# Especificações genéricas que parecem código de modelo mas não identificam o produto
+REGEX_ESPECIFICACAO = re.compile(r'(lp)?ddr\d+x?|gddr\d+x?|pcie\d*|m2|usb\d*|[2345]g|wifi\d*|hdmi\d*|ipx?\d+|\d+x\d+')
+# Unidades convertidas para uma base comum antes de comparar medidas
+CONVERSOES = {"tb": ("gb", 1000), "kg": ("g", 1000), "cm": ("mm", 10), "m": ("mm", 1000)}
+
+
+def _sem_acentos(texto):
+    return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
+
+def _numero(valor):
+    """'1,50' -> '1.5', '16' -> '16'"""
+    return f"{float(valor.replace(',', '.')):g}"
+
+
+def normalizar_titulo(titulo):
+    """
+    Termos normalizados de um título, seus códigos de modelo e medidas
+
+    Retorna (termos, modelos, medidas): medidas viram um termo só
+    ("16 litros" -> "16l") e também são devolvidas como pares (valor,
+    unidade) na unidade base; códigos que misturam letras e números (ou
+    números longos) são tratados como modelo, inclusive quando vêm separados
+    ("RTX 4060", "AF-30").
+    """
+    texto = _sem_acentos((titulo or "").casefold())
+    if " " in texto.strip():
+        texto = REGEX_CODIGO_HIFEN.sub(r'\1\2', texto)
+    else:
+        # Slug de URL: todos os separadores são hífens
+        texto = REGEX_DECIMAL_SLUG.sub(r'\1.\2', texto)
+    texto = texto.replace("-", " ").replace("_", " ")
+    medidas = set()
+
+    def trocar_medida(m):
+        unidade = UNIDADES[m.group(2)]
+        valor = float(m.group(1).replace(',', '.'))
+        base, fator = CONVERSOES.get(unidade, (unidade, 1))
+        medidas.add((f"{valor * fator:g}", base))
+        return f" {valor * fator:g}{base} "
+
+    texto = REGEX_MEDIDA.sub(trocar_medida, texto)
+    texto = REGEX_DECIMAL.sub(r'\1.\2', texto)
+    brutos = [t.strip(".") for t in REGEX_TERMOS.findall(texto)]
+    brutos = [t for t in brutos if t and t not in PALAVRAS_IGNORADAS]
+    # Números decimais sem unidade (tamanhos como "1,50") também contam como medida
+    for i, termo in enumerate(brutos):
+        if REGEX_NUMERO.fullmatch(termo):
+            brutos[i] = _numero(termo)
+            medidas.add((brutos[i], ""))
+
+    termos_medida = {valor + unidade for valor, unidade in medidas}
+    modelos = set()
+    for i, termo in enumerate(brutos):
+        if termo in termos_medida or REGEX_ESPECIFICACAO.fullmatch(termo.replace(".", "")):
+            continue
+        tem_digito = any(c.isdigit() for c in termo)
+        tem_letra = any(c.isalpha() for c in termo)
+        if (tem_digito and tem_letra and len(termo) >= 3) or (termo.isdigit() and len(termo) >= 4):
+            modelos.add(termo.replace(".", ""))
+        # Letras seguidas de número longo: "rtx 4060" -> "rtx4060"
+        if (i + 1 < len(brutos) and termo.isalpha() and len(termo) <= 4
+                and brutos[i + 1].isdigit() and len(brutos[i + 1]) >= 3):
+            modelos.add(termo + brutos[i + 1])
+
+    return set(brutos) | modelos, modelos, medidas
+
+
+def modelos_compativeis(a, b):
+    """Há um código em comum, ou um é prefixo do outro ("un50cu7700" e "un50cu7700gxzd")"""
+    if a & b:
+        return True
+    return any(x.startswith(y) or y.startswith(x) for x in a for y in b if min(len(x), len(y)) >= 5)
+
+
+def medidas_conflitantes(a, b):
+    """Alguma unidade presente nos dois lados sem nenhum valor em comum (16 L x 26 L)"""
+    unidades = {u for _, u in a} & {u for _, u in b}
+    return any(not ({v for v, u in a if u == unidade} & {v for v, u in b if u == unidade}) for unidade in unidades)
+
+
+class Grupo:
+    """Produto canônico formado por ofertas equivalentes"""
+
+    __slots__ = ("id", "ofertas", "contagem", "modelos", "medidas", "representantes")
+
+    def __init__(self, grupo_id):
+        self.id = grupo_id
+        self.ofertas = []
+        self.contagem = Counter()
+        self.modelos = set()
+        self.medidas = set()
+        self.representantes = set()
+
+    def adicionar(self, oferta, termos, modelos, medidas):
+        self.ofertas.append(oferta)
+        self.contagem.update(termos)
+        self.modelos |= modelos
+        self.medidas |= medidas
+        # Termos presentes em pelo menos metade das ofertas do grupo
+        minimo = len(self.ofertas) / 2
+        self.representantes = {t for t, n in self.contagem.items() if n >= minimo}
+
+    def nome(self):
+        """Título mais curto do grupo, normalmente o mais limpo"""
+        nomes = [o.get("nome") for o in self.ofertas if o.get("nome")]
+        return min(nomes, key=len) if nomes else None
+
+    def menor_oferta(self):
+        com_preco = [(centavos_da_oferta(o), o) for o in self.ofertas]
+        com_preco = [(p, o) for p, o in com_preco if p is not None]
+        return min(com_preco, key=lambda item: item[0]) if com_preco else (None, None)
+
+    def como_dict(self, incluir_ofertas=True):
+        preco, oferta = self.menor_oferta()
+        dados = {
+            "grupo": self.id,
+            "nome": self.nome(),
+            "modelos": sorted(self.modelos),
+            "lojas": sorted({o.get("loja") for o in self.ofertas if o.get("loja")}),
+            "total_ofertas": len(self.ofertas),
+            "menor_preco_centavos": preco,
+            "loja_menor_preco": oferta.get("loja") if oferta else None,
+            "link_menor_preco": oferta.get("link") if oferta else None,
+        }
+        if incluir_ofertas:
+            dados["ofertas"] = self.ofertas
+        return dados
+
+
+class AgrupadorOfertas:
+    """
+    Agrupamento incremental com bloqueio por índice invertido
+
+    Cada oferta é comparada apenas com os grupos que compartilham uma chave
+    de bloco; a similaridade é um Jaccard ponderado pelo IDF dos termos, e
+    ofertas com códigos de modelo distintos nunca são unidas.
+    """
+
+    def __init__(self, limiar=LIMIAR_SIMILARIDADE, limiar_mesmo_modelo=LIMIAR_MESMO_MODELO):
+        self.limiar = limiar
+        self.limiar_mesmo_modelo = limiar_mesmo_modelo
+        self.grupos = []
+        self._indice = {}
+        self._frequencia = Counter()
+        self._total_ofertas = 0
+        self.comparacoes = 0
+
+    def _idf(self, termo):
+        return math.log((self._total_ofertas + 1) / (self._frequencia[termo] + 1)) + 1
+
+    def _similaridade(self, termos, grupo):
+        representantes = grupo.representantes
+        uniao = termos | representantes
+        if not uniao:
+            return 0.0
+        comuns = sum(self._idf(t) for t in termos & representantes)
+        return comuns / sum(self._idf(t) for t in uniao)
+
+    def _chaves_bloco(self, termos, modelos):
+        raros = sorted(termos - modelos, key=lambda t: (self._frequencia[t], t))[:CHAVES_RARAS_POR_OFERTA]
+        return modelos | set(raros)
+
+    def _candidatos(self, chaves, modelos):
+        candidatos = set()
+        for chave in chaves:
+            grupos = self._indice.get(chave)
+            if grupos and (chave in modelos or len(grupos) <= MAX_GRUPOS_POR_CHAVE):
+                candidatos |= grupos
+        return candidatos
+
+    def adicionar(self, oferta, titulo=None):
+        """Coloca a oferta em um grupo (existente ou novo) e retorna o ID do grupo"""
+        termos, modelos, medidas = normalizar_titulo(titulo if titulo is not None else oferta.get("nome"))
+        self._total_ofertas += 1
+        self._frequencia.update(termos)
+
+        melhor, melhor_similaridade = None, 0.0
+        for grupo_id in self._candidatos(self._chaves_bloco(termos, modelos), modelos):
+            grupo = self.grupos[grupo_id]
+            self.comparacoes += 1
+            mesmo_modelo = modelos_compativeis(modelos, grupo.modelos)
+            if (modelos and grupo.modelos and not mesmo_modelo) or medidas_conflitantes(medidas, grupo.medidas):
+                continue
+            similaridade = self._similaridade(termos, grupo)
+            # Mesmo modelo, ou as mesmas medidas sem conflito, pedem menos termos em comum
+            limiar = self.limiar_mesmo_modelo if (mesmo_modelo and modelos) or medidas & grupo.medidas else self.limiar
+            if similaridade >= limiar and similaridade > melhor_similaridade:
+                melhor, melhor_similaridade = grupo, similaridade
+
+        if melhor is None:
+            melhor = Grupo(len(self.grupos))
+            self.grupos.append(melhor)
+        melhor.adicionar(oferta, termos, modelos, medidas)
+        for chave in self._chaves_bloco(termos, modelos) | modelos:
+            self._indice.setdefault(chave, set()).add(melhor.id)
+        return melhor.id
+
+    def adicionar_resultado(self, resultado):
+        """Agrupa todas as ofertas de um resultado de buscar_produtos_patrocinados"""
+        return [self.adicionar(oferta) for oferta in resultado.get("produtos_patrocinados", [])]
+
+    def menores_precos(self, minimo_lojas=1, incluir_ofertas=False):
+        """Grupos com a loja de menor preço, do maior para o menor número de lojas"""
+        grupos = [g.como_dict(incluir_ofertas) for g in self.grupos]
+        grupos = [g for g in grupos if len(g["lojas"]) >= minimo_lojas]
+        return sorted(grupos, key=lambda g: (-len(g["lojas"]), g["nome"] or ""))
+
+
+def agrupar_historico(historico, agrupador=None, desde_id=0, lote=5000):
+    """
+    Alimenta o agrupador com as ofertas do histórico de id maior que `desde_id`
+
+    Lê em lotes para não carregar todo o histórico na memória. Retorna
+    (agrupador, ultimo_id) para continuar de onde parou na próxima chamada.
+    """
+    agrupador = agrupador or AgrupadorOfertas()
+    ultimo_id = desde_id
+    while True:
+        linhas = historico.consultar(
+            "SELECT o.id, o.nome, o.preco, o.preco_centavos, l.nome AS loja, o.link, p.nome AS produto_buscado "
+            "FROM ofertas o JOIN produtos p ON p.id = o.produto_id LEFT JOIN lojas l ON l.id = o.loja_id "
+            "WHERE o.id > ? AND o.do_cache IS NULL ORDER BY o.id LIMIT ?",
+            (ultimo_id, lote)
+        )
+        if not linhas:
+            return agrupador, ultimo_id
+        for linha in linhas:
+            agrupador.adicionar(linha)
+        ultimo_id = linhas[-1]["id"]
+
+
+_agrupador = None
+_ultimo_id = 0
+_remocoes = 0
+_lock_agrupador = threading.Lock()
+
+
+def agrupador_historico(historico):
+    """
+    Agrupador compartilhado do processo, atualizado só com as ofertas gravadas desde a última chamada
+
+    Um relatório regravado apaga suas ofertas e as insere de novo com outros
+    IDs; nesse caso (historico.remocoes() mudou) o agrupador é refeito do
+    zero, para não contar as ofertas duas vezes nem manter as apagadas.
+    """
+    global _agrupador, _ultimo_id, _remocoes
+    with _lock_agrupador:
+        remocoes = historico.remocoes()
+        if remocoes != _remocoes:
+            _agrupador, _ultimo_id, _remocoes = None, 0, remocoes
+        _agrupador, _ultimo_id = agrupar_historico(historico, _agrupador, desde_id=_ultimo_id)
+        return _agrupador
+
+
+def _pares(n):
+    return n * (n - 1) // 2
+
+
+def avaliar_agrupamento(ofertas_rotuladas, agrupador=None):
+    """
+    Qualidade do agrupamento contra ofertas rotuladas (campo "grupo")
+
+    Precisão e revocação por pares, calculadas pela tabela de contingência
+    (sem enumerar os pares).
+    """
+    agrupador = agrupador or AgrupadorOfertas()
+    previstos = [agrupador.adicionar(oferta) for oferta in ofertas_rotuladas]
+    rotulos = [oferta["grupo"] for oferta in ofertas_rotuladas]
+
+    pares_juntos = sum(_pares(n) for n in Counter(zip(previstos, rotulos)).values())
+    pares_previstos = sum(_pares(n) for n in Counter(previstos).values())
+    pares_reais = sum(_pares(n) for n in Counter(rotulos).values())
+
+    precisao = pares_juntos / pares_previstos if pares_previstos else 1.0
+    revocacao = pares_juntos / pares_reais if pares_reais else 1.0
+    f1 = 2 * precisao * revocacao / (precisao + revocacao) if precisao + revocacao else 0.0
+    return {
+        "ofertas": len(ofertas_rotuladas),
+        "grupos_reais": len(set(rotulos)),
+        "grupos_previstos": len(set(previstos)),
+        "precisao": round(precisao, 4),
+        "revocacao": round(revocacao, 4),
+        "f1": round(f1, 4),
+        "comparacoes": agrupador.comparacoes,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "avaliar":
+        print(__doc__)
+        sys.exit(1)
+
+    with open(sys.argv[2] if len(sys.argv) > 2 else ARQUIVO_ROTULADO, 'r', encoding='utf-8') as f:
+        ofertas = json.load(f)
+    for chave, valor in avaliar_agrupamento(ofertas).items():
+        print(f"{chave}: {valor}")
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Detecção incremental de mudanças de preço e alertas
+
+Depois de cada busca, cada oferta é comparada com o último preço conhecido
+do mesmo par (produto, loja), mantido em uma tabela indexada pela chave do
+par, sem varrer o histórico. Só as mudanças são emitidas (queda, alta, nova
+loja, oferta que sumiu) e as regras de alerta do produto são avaliadas na
+mesma passada. As mudanças também são anexadas a um feed JSONL.
+"""
+
+import json
+import os
+import threading
+import time
+
+from historico import DATA_DIR, obter_historico
+from precos import centavos_da_oferta, formatar_centavos
+
+ARQUIVO_FEED = os.path.join(DATA_DIR, "mudancas.jsonl")
+
+ESQUEMA_ALERTAS = """
+CREATE TABLE IF NOT EXISTS precos_atuais (
+    produto TEXT NOT NULL,
+    loja TEXT NOT NULL,
+    preco_centavos INTEGER NOT NULL,
+    nome TEXT,
+    link TEXT,
+    timestamp TEXT NOT NULL,
+    PRIMARY KEY (produto, loja)
+);
+
+CREATE TABLE IF NOT EXISTS menores_precos (
+    produto TEXT PRIMARY KEY,
+    preco_centavos INTEGER NOT NULL,
+    loja TEXT,
+    timestamp TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS regras_alerta (
+    id INTEGER PRIMARY KEY,
+    produto TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    valor REAL
+);
+
+CREATE TABLE IF NOT EXISTS mudancas (
+    id INTEGER PRIMARY KEY,
+    produto TEXT NOT NULL,
+    loja TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    preco_anterior_centavos INTEGER,
+    preco_centavos INTEGER,
+    variacao_percentual REAL,
+    alertas TEXT,
+    link TEXT,
+    timestamp TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_regras_produto ON regras_alerta (produto);
+CREATE INDEX IF NOT EXISTS idx_mudancas_data ON mudancas (timestamp);
+"""
+
+# Tipos de regra: "*" em `produto` aplica a regra a todos os produtos
+TIPOS_REGRA = {
+    "queda_percentual",   # queda de pelo menos `valor` %
+    "queda_absoluta",     # queda de pelo menos `valor` centavos
+    "alta_percentual",    # alta de pelo menos `valor` %
+    "alta_absoluta",      # alta de pelo menos `valor` centavos
+    "preco_abaixo",       # preço menor ou igual a `valor` centavos
+    "menor_preco",        # novo menor preço já visto para o produto
+}
+
+LOJA_DESCONHECIDA = ""
+
+
+def _variacao(anterior, atual):
+    if anterior is None or atual is None or not anterior:
+        return None
+    return round(100 * (atual - anterior) / anterior, 2)
+
+
+def avaliar_regras(regras, mudanca, novo_menor):
+    """Nomes das regras disparadas por uma mudança"""
+    disparadas = []
+    anterior = mudanca["preco_anterior_centavos"]
+    atual = mudanca["preco_centavos"]
+    diferenca = (atual - anterior) if (anterior is not None and atual is not None) else None
+    variacao = mudanca["variacao_percentual"]
+
+    for regra in regras:
+        tipo, valor = regra["tipo"], regra["valor"]
+        if tipo == "queda_percentual" and variacao is not None and -variacao >= valor:
+            disparadas.append(f"queda de {-variacao}%")
+        elif tipo == "queda_absoluta" and diferenca is not None and -diferenca >= valor:
+            disparadas.append(f"queda de {formatar_centavos(-diferenca)}")
+        elif tipo == "alta_percentual" and variacao is not None and variacao >= valor:
+            disparadas.append(f"alta de {variacao}%")
+        elif tipo == "alta_absoluta" and diferenca is not None and diferenca >= valor:
+            disparadas.append(f"alta de {formatar_centavos(diferenca)}")
+        elif tipo == "preco_abaixo" and atual is not None and atual <= valor:
+            disparadas.append(f"preço abaixo de {formatar_centavos(int(valor))}")
+        elif tipo == "menor_preco" and novo_menor:
+            disparadas.append("novo menor preço")
+    return disparadas
+
+
+class DetectorMudancas:
+    """Compara cada busca com o último preço conhecido e gera mudanças e alertas"""
+
+    def __init__(self, historico=None, arquivo_feed=ARQUIVO_FEED):
+        self.historico = historico or obter_historico()
+        self.arquivo_feed = arquivo_feed
+        self._lock_feed = threading.Lock()
+        with self.historico.transacao() as conexao:
+            conexao.executescript(ESQUEMA_ALERTAS)
+
+    def adicionar_regra(self, produto, tipo, valor=None):
+        """Cadastra uma regra de alerta ('*' para todos os produtos)"""
+        if tipo not in TIPOS_REGRA:
+            raise ValueError(f"Tipo de regra desconhecido: {tipo}")
+        with self.historico.transacao() as conexao:
+            conexao.execute("INSERT INTO regras_alerta (produto, tipo, valor) VALUES (?, ?, ?)",
+                            (produto, tipo, valor))
+
+    def listar_regras(self):
+        """Regras cadastradas, agrupadas por produto"""
+        return self.historico.consultar("SELECT * FROM regras_alerta ORDER BY produto, tipo")
+
+    def remover_regra(self, regra_id):
+        """Remove uma regra pelo ID"""
+        with self.historico.transacao() as conexao:
+            conexao.execute("DELETE FROM regras_alerta WHERE id = ?", (regra_id,))
+
+    def processar(self, resultado):
+        """
+        Processa o resultado de uma busca e retorna a lista de mudanças
+
+        Uma busca sem ofertas (bloqueio, erro) não marca ofertas como sumidas.
+        """
+        produto = resultado["produto_buscado"]
+        timestamp = resultado.get("timestamp") or time.strftime("%Y-%m-%d %H:%M:%S")
+
+        # Menor preço da busca em cada loja
+        novos = {}
+        for oferta in resultado.get("produtos_patrocinados", []):
+            preco = centavos_da_oferta(oferta)
+            if preco is None:
+                continue
+            loja = oferta.get("loja") or LOJA_DESCONHECIDA
+            if loja not in novos or preco < novos[loja]["preco_centavos"]:
+                novos[loja] = {"preco_centavos": preco, "nome": oferta.get("nome"), "link": oferta.get("link")}
+        if not novos:
+            return []
+
+        mudancas = []
+        with self.historico.transacao() as conexao:
+            atuais = {
+                linha["loja"]: linha["preco_centavos"]
+                for linha in conexao.execute(
+                    "SELECT loja, preco_centavos FROM precos_atuais WHERE produto = ?", (produto,))
+            }
+            regras = [dict(linha) for linha in conexao.execute(
+                "SELECT tipo, valor FROM regras_alerta WHERE produto IN (?, '*')", (produto,))]
+            menor = conexao.execute(
+                "SELECT preco_centavos FROM menores_precos WHERE produto = ?", (produto,)).fetchone()
+            menor_conhecido = menor["preco_centavos"] if menor else None
+
+            menor_busca_loja = min(novos, key=lambda loja: novos[loja]["preco_centavos"])
+            menor_busca = novos[menor_busca_loja]["preco_centavos"]
+            novo_menor = menor_conhecido is not None and menor_busca < menor_conhecido
+
+            for loja, oferta in novos.items():
+                anterior = atuais.get(loja)
+                atual = oferta["preco_centavos"]
+                if anterior is None:
+                    tipo = "nova_loja"
+                elif atual < anterior:
+                    tipo = "queda"
+                elif atual > anterior:
+                    tipo = "alta"
+                else:
+                    continue
+                mudancas.append({
+                    "produto": produto, "loja": loja, "tipo": tipo,
+                    "preco_anterior_centavos": anterior, "preco_centavos": atual,
+                    "variacao_percentual": _variacao(anterior, atual),
+                    "link": oferta["link"], "timestamp": timestamp,
+                    "menor_da_busca": loja == menor_busca_loja,
+                })
+
+            for loja, anterior in atuais.items():
+                if loja not in novos:
+                    mudancas.append({
+                        "produto": produto, "loja": loja, "tipo": "oferta_sumiu",
+                        "preco_anterior_centavos": anterior, "preco_centavos": None,
+                        "variacao_percentual": None, "link": None, "timestamp": timestamp,
+                        "menor_da_busca": False,
+                    })
+
+            for mudanca in mudancas:
+                menor_da_busca = mudanca.pop("menor_da_busca")
+                mudanca["alertas"] = avaliar_regras(regras, mudanca, novo_menor and menor_da_busca)
+
+            # Atualiza o último preço conhecido de cada par e o menor preço do produto
+            conexao.executemany(
+                "INSERT OR REPLACE INTO precos_atuais (produto, loja, preco_centavos, nome, link, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(produto, loja, o["preco_centavos"], o["nome"], o["link"], timestamp) for loja, o in novos.items()]
+            )
+            sumidas = [m["loja"] for m in mudancas if m["tipo"] == "oferta_sumiu"]
+            conexao.executemany("DELETE FROM precos_atuais WHERE produto = ? AND loja = ?",
+                                [(produto, loja) for loja in sumidas])
+            if menor_conhecido is None or novo_menor:
+                conexao.execute(
+                    "INSERT OR REPLACE INTO menores_precos (produto, preco_centavos, loja, timestamp) VALUES (?, ?, ?, ?)",
+                    (produto, menor_busca, menor_busca_loja, timestamp)
+                )
+            conexao.executemany(
+                "INSERT INTO mudancas (produto, loja, tipo, preco_anterior_centavos, preco_centavos, "
+                "variacao_percentual, alertas, link, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(m["produto"], m["loja"], m["tipo"], m["preco_anterior_centavos"], m["preco_centavos"],
+                  m["variacao_percentual"], json.dumps(m["alertas"], ensure_ascii=False), m["link"],
+                  m["timestamp"]) for m in mudancas]
+            )
+
+        self._anexar_feed(mudancas)
+        return mudancas
+
+    def _anexar_feed(self, mudancas):
+        if not mudancas or not self.arquivo_feed:
+            return
+        with self._lock_feed:
+            os.makedirs(os.path.dirname(self.arquivo_feed), exist_ok=True)
+            with open(self.arquivo_feed, 'a', encoding='utf-8') as f:
+                for mudanca in mudancas:
+                    f.write(json.dumps(mudanca, ensure_ascii=False) + "\n")
+
+    def mudancas_recentes(self, limite=100, somente_alertas=False):
+        """Mudanças mais recentes, opcionalmente apenas as que dispararam alertas"""
+        consulta = "SELECT * FROM mudancas"
+        if somente_alertas:
+            consulta += " WHERE alertas != '[]'"
+        consulta += " ORDER BY id DESC LIMIT ?"
+        linhas = self.historico.consultar(consulta, (limite,))
+        for linha in linhas:
+            linha["alertas"] = json.loads(linha["alertas"] or "[]")
+        return linhas
+
+
+_detector = None
+_lock_detector = threading.Lock()
+
+
+def obter_detector():
+    """Detector compartilhado do processo"""
+    global _detector
+    with _lock_detector:
+        if _detector is None:
+            _detector = DetectorMudancas()
+        return _detector
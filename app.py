@@ -1,75 +1,344 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context, abort
+import hashlib
 import json
 import os
 from datetime import datetime
 import time
-import subprocess
-import glob
-import sys
+
+from fila_buscas import obter_fila
+from historico import obter_historico, ORDENACOES_OFERTAS
+from estatisticas import estatisticas_historico
+from precos import formatar_centavos
+from relatorio_incremental import carregar_relatorio_arquivo
+from cache_resultados import obter_cache
+from alertas import obter_detector, TIPOS_REGRA
+from agrupamento import AgrupadorOfertas, agrupador_historico
+from instrumentacao import obter_metricas
+from seletores import obter_registro_seletores
+from tentativas import obter_disjuntor
+from fontes import obter_busca_multifonte
 
 app = Flask(__name__)
 app.secret_key = 'monitoramento_inteligente_precos'
 
 # Diretório onde os relatórios são armazenados
 RELATORIOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '')
+RELATORIOS_POR_PAGINA = 20
+PRODUTOS_POR_PAGINA = 20
+MAX_POR_PAGINA = 200
+
+def _parametro_inteiro(nome, padrao, minimo=None, maximo=None):
+    """Inteiro da query string limitado a [minimo, maximo]; valor não numérico responde 400"""
+    valor = request.args.get(nome)
+    if valor is None or valor == '':
+        valor = padrao
+    else:
+        try:
+            valor = int(valor)
+        except ValueError:
+            abort(400, description=f"Parâmetro '{nome}' deve ser um número inteiro")
+    if minimo is not None:
+        valor = max(minimo, valor)
+    if maximo is not None:
+        valor = min(maximo, valor)
+    return valor
 
 @app.route('/')
 def index():
-    """Página inicial com formulários de busca"""
-    # Encontrar todos os arquivos de relatório
-    relatorios = []
-    for file in glob.glob(os.path.join(RELATORIOS_DIR, 'relatorio_buscas_*.json')):
-        relatorios.append(os.path.basename(file))
-    relatorios.sort(reverse=True)  # Mais recente primeiro
+    """Página inicial com formulários de busca e o índice paginado de relatórios"""
+    filtros = {
+        'desde': request.args.get('desde') or None,
+        'ate': request.args.get('ate') or None,
+        'produto': (request.args.get('produto') or '').strip() or None,
+    }
+    # O índice fica no histórico; nenhum arquivo de relatório é lido aqui
+    indice = obter_historico().pagina_relatorios(
+        pagina=_parametro_inteiro('pagina', 1, minimo=1),
+        por_pagina=_parametro_inteiro('por_pagina', RELATORIOS_POR_PAGINA, minimo=1, maximo=MAX_POR_PAGINA),
+        **filtros
+    )
+    aba_historico = 'pagina' in request.args or any(filtros.values())
     
-    return render_template('index.html', relatorios=relatorios)
+    return render_template('index.html', indice=indice, filtros=filtros, aba_historico=aba_historico)
 
 @app.route('/buscar', methods=['POST'])
 def buscar():
-    """Processa a busca de produtos e redireciona para resultados"""
+    """Enfileira a busca de produtos e redireciona para o acompanhamento do job"""
     tipo_busca = request.form.get('tipo_busca')
     
     # Preparar lista de produtos para busca
     if tipo_busca == 'individual':
-        produtos = [request.form.get('produto')]
+        produtos = [(request.form.get('produto') or '').strip()]
     else:
-        produtos = request.form.get('produtos').strip().split('\n')
-        # Remover linhas vazias
-        produtos = [p.strip() for p in produtos if p.strip()]
+        produtos = (request.form.get('produtos') or '').strip().split('\n')
+    # Remover linhas vazias
+    produtos = [p.strip() for p in produtos if p.strip()]
     
-    # Salvar produtos em arquivo temporário
-    with open('produtos_temp.txt', 'w', encoding='utf-8') as f:
-        for produto in produtos:
-            f.write(f"{produto}\n")
+    if not produtos:
+        flash('Informe ao menos um produto para buscar')
+        return redirect(url_for('index'))
+    
+    # Cada envio vira um job isolado; a resposta volta imediatamente
+    job = obter_fila().enviar(produtos, forcar_atualizacao=request.form.get('forcar_atualizacao') == '1')
+    
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({"job_id": job.id, "status_url": url_for('status_job', job_id=job.id)}), 202
+    return redirect(url_for('acompanhar_job', job_id=job.id))
+
+@app.route('/jobs/<job_id>')
+def status_job(job_id):
+    """Estado atual do job e resultados parciais em JSON"""
+    job = obter_fila().obter(job_id)
+    if not job:
+        abort(404)
+    return jsonify(job.como_dict())
+
+@app.route('/jobs/<job_id>/eventos')
+def eventos_job(job_id):
+    """Progresso do job via Server-Sent Events"""
+    job = obter_fila().obter(job_id)
+    if not job:
+        abort(404)
     
-    # Executar busca (chamando script principal)
+    # Last-Event-ID vem do cliente: qualquer valor inválido recomeça do primeiro evento
     try:
-        subprocess.run([sys.executable, 'main.py'], check=True)
-        
-        # Encontrar o relatório mais recente
-        relatorios = sorted(glob.glob(os.path.join(RELATORIOS_DIR, 'relatorio_buscas_*.json')), reverse=True)
-        if relatorios:
-            ultimo_relatorio = os.path.basename(relatorios[0])
-            return redirect(url_for('ver_relatorio', nome_relatorio=ultimo_relatorio))
-        else:
-            flash('Erro: Nenhum relatório foi gerado')
-            return redirect(url_for('index'))
-    except subprocess.CalledProcessError:
-        flash('Erro ao executar a busca. Verifique o console para mais detalhes.')
+        inicio = max(0, int(request.headers.get('Last-Event-ID', -1)) + 1)
+    except ValueError:
+        inicio = 0
+    
+    def gerar():
+        proximo = inicio
+        while True:
+            eventos = job.aguardar_eventos(proximo)
+            for evento in eventos:
+                yield f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {json.dumps(evento, ensure_ascii=False)}\n\n"
+            proximo += len(eventos)
+            if not eventos:
+                # Mantém a conexão aberta enquanto o job não emite eventos
+                yield ": ping\n\n"
+            if job.finalizado() and proximo >= len(job.eventos):
+                break
+    
+    return Response(stream_with_context(gerar()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/jobs/<job_id>/acompanhar')
+def acompanhar_job(job_id):
+    """Página de progresso do job"""
+    job = obter_fila().obter(job_id)
+    if not job:
+        flash('Busca não encontrada')
         return redirect(url_for('index'))
+    return render_template('job.html', job=job)
+
+def _carregar_resumo(nome_relatorio):
+    """Resumo do relatório no histórico, importando o arquivo JSON na primeira visualização"""
+    historico = obter_historico()
+    resumo = historico.resumo_relatorio(nome_relatorio)
+    if resumo is None:
+        caminho_relatorio = os.path.join(RELATORIOS_DIR, os.path.basename(nome_relatorio))
+        historico.registrar_relatorio(nome_relatorio, carregar_relatorio_arquivo(caminho_relatorio))
+        resumo = historico.resumo_relatorio(nome_relatorio)
+    return resumo
+
+def _filtros_ofertas():
+    """Ordenação e filtros das ofertas a partir da query string"""
+    return {
+        'ordenar': request.args.get('ordenar', 'posicao'),
+        'decrescente': request.args.get('direcao') == 'desc',
+        'loja': request.args.get('loja') or None,
+        'texto': (request.args.get('texto') or '').strip() or None,
+    }
+
+def _etag_relatorio(resumo, *extras):
+    """ETag derivada do resumo gravado (muda se o relatório for regravado) e dos parâmetros da página"""
+    chave = json.dumps([resumo, sorted(request.args.items(multi=True)), extras], sort_keys=True, default=str)
+    return hashlib.sha1(chave.encode('utf-8')).hexdigest()
+
+def _nao_modificado(etag):
+    """Resposta 304 quando o cliente já tem a versão atual"""
+    if request.if_none_match.contains(etag):
+        resposta = Response(status=304)
+        resposta.set_etag(etag)
+        return resposta
+    return None
 
 @app.route('/relatorio/<nome_relatorio>')
 def ver_relatorio(nome_relatorio):
-    """Exibe um relatório específico"""
+    """Exibe uma página de produtos do relatório, gerando o HTML em fluxo"""
     try:
-        caminho_relatorio = os.path.join(RELATORIOS_DIR, nome_relatorio)
-        with open(caminho_relatorio, 'r', encoding='utf-8') as f:
-            relatorio = json.load(f)
-        
-        return render_template('relatorio.html', relatorio=relatorio, nome_relatorio=nome_relatorio)
-    except (FileNotFoundError, json.JSONDecodeError) as e:
+        resumo = _carregar_resumo(nome_relatorio)
+    except (OSError, ValueError) as e:
         flash(f'Erro ao carregar relatório: {str(e)}')
         return redirect(url_for('index'))
+    
+    etag = _etag_relatorio(resumo)
+    resposta = _nao_modificado(etag)
+    if resposta:
+        return resposta
+    
+    historico = obter_historico()
+    filtros = _filtros_ofertas()
+    pagina = historico.produtos_relatorio(
+        nome_relatorio,
+        pagina=_parametro_inteiro('pagina', 1, minimo=1),
+        por_pagina=_parametro_inteiro('por_pagina', PRODUTOS_POR_PAGINA, minimo=1, maximo=MAX_POR_PAGINA),
+        produto=(request.args.get('produto') or '').strip() or None
+    )
+    # Só o primeiro produto da página vem com as ofertas; os demais são carregados ao abrir
+    primeiras_ofertas = []
+    if pagina['produtos']:
+        primeiras_ofertas = historico.ofertas_busca(pagina['produtos'][0]['busca_id'], **filtros)
+    estatisticas = {
+        'por_loja': estatisticas_historico(historico, 'loja', relatorio=nome_relatorio),
+        'por_produto': {linha['produto']: linha
+                        for linha in estatisticas_historico(historico, 'produto', relatorio=nome_relatorio)},
+    }
+    
+    template = app.jinja_env.get_template('relatorio.html')
+    contexto = dict(nome_relatorio=nome_relatorio, resumo=resumo, pagina=pagina, filtros=filtros,
+                    primeiras_ofertas=primeiras_ofertas, estatisticas=estatisticas,
+                    ordenacoes=ORDENACOES_OFERTAS, parametros=request.args.to_dict())
+    app.update_template_context(contexto)
+    resposta = Response(stream_with_context(template.generate(**contexto)), mimetype='text/html')
+    resposta.set_etag(etag)
+    return resposta
+
+@app.route('/api/relatorio/<nome_relatorio>/buscas/<int:busca_id>')
+def api_ofertas_relatorio(nome_relatorio, busca_id):
+    """Ofertas de um produto do relatório (parâmetros: ordenar, direcao, loja, texto)"""
+    resumo = obter_historico().resumo_relatorio(nome_relatorio)
+    produto = obter_historico().busca_do_relatorio(nome_relatorio, busca_id) if resumo else None
+    if produto is None:
+        abort(404)
+    
+    etag = _etag_relatorio(resumo, busca_id)
+    resposta = _nao_modificado(etag)
+    if resposta:
+        return resposta
+    
+    ofertas = obter_historico().ofertas_busca(busca_id, **_filtros_ofertas())
+    for oferta in ofertas:
+        for chave in ('valor_parcela_centavos', 'preco_anterior_centavos'):
+            if oferta[chave] is not None:
+                oferta[chave.replace('_centavos', '_formatado')] = formatar_centavos(oferta[chave])
+    resposta = jsonify({"produto": produto, "busca_id": busca_id, "ofertas": ofertas})
+    resposta.set_etag(etag)
+    return resposta
+
+@app.route('/api/relatorio/<nome_relatorio>/grupos')
+def api_grupos_relatorio(nome_relatorio):
+    """Ofertas do relatório agrupadas por produto equivalente entre lojas, com a loja mais barata"""
+    relatorio = obter_historico().carregar_relatorio(nome_relatorio)
+    if relatorio is None:
+        abort(404)
+    agrupador = AgrupadorOfertas()
+    for resultado in relatorio['resultados_detalhados'].values():
+        agrupador.adicionar_resultado(resultado)
+    return jsonify(agrupador.menores_precos(minimo_lojas=request.args.get('minimo_lojas', 1, type=int),
+                                            incluir_ofertas=request.args.get('detalhes') == '1'))
+
+@app.route('/api/grupos')
+def api_grupos():
+    """Produtos equivalentes em todo o histórico (parâmetros: produto, minimo_lojas, detalhes)"""
+    agrupador = agrupador_historico(obter_historico())
+    grupos = agrupador.menores_precos(minimo_lojas=request.args.get('minimo_lojas', 2, type=int),
+                                      incluir_ofertas=True)
+    produto = (request.args.get('produto') or '').casefold()
+    if produto:
+        grupos = [g for g in grupos if any(produto in (o.get('produto_buscado') or '').casefold()
+                                           for o in g['ofertas'])]
+    if request.args.get('detalhes') != '1':
+        for grupo in grupos:
+            del grupo['ofertas']
+    return jsonify(grupos[:request.args.get('limite', 200, type=int)])
+
+@app.route('/api/cache')
+def api_cache():
+    """Contadores do cache de resultados"""
+    cache = obter_cache()
+    return jsonify(dict(cache.contadores, ttl=cache.ttl, max_itens=cache.max_itens))
+
+@app.route('/api/seletores')
+def api_seletores():
+    """Ordem atual e desempenho de cada seletor das cascatas"""
+    return jsonify(obter_registro_seletores().relatorio())
+
+@app.route('/api/disjuntor')
+def api_disjuntor():
+    """Estado do disjuntor de bloqueio (fechado, aberto ou meio_aberto) e taxa de bloqueios"""
+    return jsonify(obter_disjuntor().relatorio())
+
+@app.route('/api/fontes')
+def api_fontes():
+    """Saúde de cada fonte de preço (falhas seguidas, suspensão, latência média)"""
+    return jsonify(obter_busca_multifonte().relatorio())
+
+@app.route('/api/fontes/buscar')
+def api_fontes_buscar():
+    """Busca um produto em todas as fontes e devolve o que chegou dentro do prazo"""
+    produto = (request.args.get('produto') or '').strip()
+    if not produto:
+        return jsonify({'erro': 'Informe o produto'}), 400
+    return jsonify(obter_busca_multifonte().buscar(produto, prazo=request.args.get('prazo', type=float)))
+
+@app.route('/metrics')
+def metrics():
+    """Histogramas de duração por etapa e contadores, no formato do Prometheus"""
+    return Response(obter_metricas().exportar_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/historico')
+def api_historico():
+    """Histórico de ofertas de um produto (parâmetros: produto, dias, loja)"""
+    produto = request.args.get('produto')
+    if not produto:
+        return jsonify({"erro": "Parâmetro 'produto' é obrigatório"}), 400
+    dias = request.args.get('dias', 90, type=int)
+    ofertas = obter_historico().historico_produto(produto, dias=dias, loja=request.args.get('loja'))
+    return jsonify({"produto": produto, "dias": dias, "ofertas": ofertas})
+
+@app.route('/alertas', methods=['GET', 'POST'])
+def alertas():
+    """Mudanças de preço recentes e cadastro de regras de alerta"""
+    detector = obter_detector()
+    if request.method == 'POST':
+        try:
+            if request.form.get('remover'):
+                detector.remover_regra(int(request.form['remover']))
+            else:
+                produto = (request.form.get('produto') or '').strip() or '*'
+                valor = request.form.get('valor', type=float)
+                if valor is not None and request.form.get('tipo', '').endswith(('_absoluta', '_abaixo')):
+                    # Valores absolutos são informados em reais e guardados em centavos
+                    valor = round(valor * 100)
+                detector.adicionar_regra(produto, request.form.get('tipo'), valor)
+        except ValueError as e:
+            flash(str(e))
+        return redirect(url_for('alertas'))
+    
+    somente_alertas = request.args.get('somente_alertas') == '1'
+    mudancas = detector.mudancas_recentes(limite=request.args.get('limite', 200, type=int),
+                                          somente_alertas=somente_alertas)
+    return render_template('alertas.html', mudancas=mudancas, regras=detector.listar_regras(),
+                           tipos_regra=sorted(TIPOS_REGRA), somente_alertas=somente_alertas)
+
+@app.route('/alertas/feed.jsonl')
+def feed_mudancas():
+    """Feed de mudanças em JSONL, a partir do byte `desde` (para leitura incremental)"""
+    arquivo = obter_detector().arquivo_feed
+    desde = _parametro_inteiro('desde', 0, minimo=0)
+    if not os.path.exists(arquivo):
+        return Response('', mimetype='application/x-ndjson', headers={'X-Feed-Offset': '0'})
+    with open(arquivo, 'rb') as f:
+        f.seek(desde)
+        conteudo = f.read()
+    return Response(conteudo, mimetype='application/x-ndjson',
+                    headers={'X-Feed-Offset': str(desde + len(conteudo))})
+
+@app.template_filter('format_centavos')
+def format_centavos(value):
+    """Formata preços em centavos como 'R$ 1.234,56'"""
+    return formatar_centavos(value) if value is not None else '-'
 
 @app.template_filter('format_datetime')
 def format_datetime(value):
@@ -88,5 +357,10 @@ if __name__ == '__main__':
     os.makedirs(os.path.join(os.path.dirname(__file__), 'static', 'js'), exist_ok=True)
     os.makedirs(os.path.join(os.path.dirname(__file__), 'templates'), exist_ok=True)
     
+    # Importar relatórios JSON antigos para o histórico (apenas os ainda ausentes)
+    importados = obter_historico().importar_relatorios_json(RELATORIOS_DIR)
+    if importados:
+        print(f"{importados} relatórios importados para o histórico")
+    
     # Iniciar aplicação
     app.run(debug=True, host='0.0.0.0', port=5000)
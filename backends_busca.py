@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Backends de coleta plugáveis
+
+O backend "http" baixa o HTML renderizado no servidor com um cliente leve
+(conexões keep-alive reaproveitadas, compressão e limite de concorrência por
+host) e o analisa com a extração offline. O backend "selenium" é o fluxo
+completo com Chrome. O modo "auto" só recorre ao Selenium quando o HTTP não
+retorna nenhum card.
+
+Um bloqueio (HTTP 429, captcha) em qualquer backend levanta
+tentativas.BuscaAdiada, que atravessa o BuscadorBackends para a busca voltar
+à fila do MultiBuscador. Uma resposta HTTP 200 só conta como sucesso para o
+disjuntor quando traz cards; sem eles (página de consentimento, layout novo)
+conta como falha de marcação e não fecha um disjuntor meio-aberto.
+"""
+
+import gzip
+import http.client
+import os
+import threading
+import time
+import zlib
+from urllib.parse import quote_plus, urlsplit, urljoin
+
+from extracao import URL_BUSCA_DIRETA, LIMITE_OFERTAS
+from extracao_offline import extrair_produtos_html
+from instrumentacao import contexto, span, registrar_span
+from tentativas import (
+    BLOQUEIO, MARCACAO, TRANSITORIA, MOTIVO_DISJUNTOR, BuscaAdiada, classificar_texto, obter_disjuntor
+)
+
+BACKEND_PADRAO = os.environ.get("MEIU_BACKEND", "auto")
+
+CABECALHOS_PADRAO = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "pt-BR,pt;q=0.9",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+
+
+class PoolConexoes:
+    """Conexões HTTP keep-alive reaproveitadas, com limite de concorrência por host"""
+
+    def __init__(self, max_por_host=4, timeout=15, max_redirecionamentos=3):
+        self.max_por_host = max_por_host
+        self.timeout = timeout
+        self.max_redirecionamentos = max_redirecionamentos
+        self._livres = {}
+        self._semaforos = {}
+        self._lock = threading.Lock()
+        self.estatisticas = {"requisicoes": 0, "conexoes_abertas": 0, "reusos": 0}
+
+    def _semaforo(self, chave):
+        with self._lock:
+            if chave not in self._semaforos:
+                self._semaforos[chave] = threading.BoundedSemaphore(self.max_por_host)
+            return self._semaforos[chave]
+
+    def _obter(self, chave, timeout):
+        with self._lock:
+            livres = self._livres.get(chave)
+            if livres:
+                self.estatisticas["reusos"] += 1
+                conexao = livres.pop()
+                conexao.timeout = timeout
+                if conexao.sock is not None:
+                    conexao.sock.settimeout(timeout)
+                return conexao
+            self.estatisticas["conexoes_abertas"] += 1
+        esquema, host, porta = chave
+        classe = http.client.HTTPSConnection if esquema == "https" else http.client.HTTPConnection
+        return classe(host, porta, timeout=timeout)
+
+    def _devolver(self, chave, conexao):
+        with self._lock:
+            self._livres.setdefault(chave, []).append(conexao)
+
+    def _requisitar_uma_vez(self, url, cabecalhos, timeout):
+        partes = urlsplit(url)
+        porta = partes.port or (443 if partes.scheme == "https" else 80)
+        chave = (partes.scheme, partes.hostname, porta)
+        caminho = partes.path or "/"
+        if partes.query:
+            caminho += "?" + partes.query
+
+        with self._semaforo(chave):
+            # Uma conexão keep-alive reaproveitada pode ter sido fechada pelo servidor
+            for tentativa in range(2):
+                conexao = self._obter(chave, timeout)
+                try:
+                    conexao.request("GET", caminho, headers=cabecalhos)
+                    resposta = conexao.getresponse()
+                    corpo = resposta.read()
+                    break
+                except (http.client.HTTPException, OSError):
+                    conexao.close()
+                    if tentativa == 1:
+                        raise
+
+            if resposta.will_close:
+                conexao.close()
+            else:
+                self._devolver(chave, conexao)
+
+        with self._lock:
+            self.estatisticas["requisicoes"] += 1
+        return resposta, corpo
+
+    def get(self, url, cabecalhos=None, prazo=None):
+        """
+        Executa um GET e retorna (status, texto), seguindo redirecionamentos
+
+        `prazo` (segundos) vale para o GET inteiro: cada requisição usa no
+        máximo o tempo restante como timeout de socket e, esgotado o prazo
+        entre redirecionamentos, levanta TimeoutError.
+        """
+        cabecalhos = dict(CABECALHOS_PADRAO, **(cabecalhos or {}))
+        limite = time.monotonic() + prazo if prazo is not None else None
+        for _ in range(self.max_redirecionamentos + 1):
+            timeout = self.timeout
+            if limite is not None:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise TimeoutError(f"Prazo esgotado antes de {url}")
+                timeout = min(restante, self.timeout)
+            resposta, corpo = self._requisitar_uma_vez(url, cabecalhos, timeout)
+            if resposta.status in (301, 302, 303, 307, 308) and resposta.getheader("Location"):
+                url = urljoin(url, resposta.getheader("Location"))
+                continue
+            break
+
+        codificacao = (resposta.getheader("Content-Encoding") or "").lower()
+        if codificacao == "gzip":
+            corpo = gzip.decompress(corpo)
+        elif codificacao == "deflate":
+            corpo = zlib.decompress(corpo)
+
+        charset = resposta.headers.get_content_charset() or "utf-8"
+        return resposta.status, corpo.decode(charset, errors="replace")
+
+    def fechar(self):
+        with self._lock:
+            for conexoes in self._livres.values():
+                for conexao in conexoes:
+                    conexao.close()
+            self._livres.clear()
+
+
+class BackendHTTP:
+    """Busca leve: baixa o HTML de resultados e aplica a extração offline"""
+
+    nome = "http"
+
+    def __init__(self, url_busca=URL_BUSCA_DIRETA, pool=None, **opcoes_pool):
+        self.url_busca = url_busca
+        self.pool = pool or PoolConexoes(**opcoes_pool)
+
+    def buscar(self, produto, ao_ofertar=None, prazo=None):
+        url = self.url_busca.format(consulta=quote_plus(produto))
+        resultados = {
+            "produto_buscado": produto,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "produtos_patrocinados": []
+        }
+        disjuntor = obter_disjuntor()
+        if not disjuntor.permitir():
+            raise BuscaAdiada(produto, MOTIVO_DISJUNTOR)
+        try:
+            with span("download_http"):
+                status, html = self.pool.get(url, prazo=prazo)
+        except Exception:
+            # Timeout ou conexão recusada: libera a busca de teste de um disjuntor meio-aberto
+            disjuntor.registrar(TRANSITORIA)
+            raise
+        if status == 429 or classificar_texto("", html) == BLOQUEIO:
+            # Bloqueio vale para o IP inteiro: recorrer ao Selenium só pioraria
+            disjuntor.registrar(BLOQUEIO)
+            raise BuscaAdiada(produto, f"bloqueio (HTTP {status})")
+        if status != 200:
+            disjuntor.registrar(TRANSITORIA)
+            print(f" Backend HTTP: status {status} para '{produto}'")
+            return resultados
+        try:
+            with span("extracao_estrategia", estrategia="http"):
+                resultados["produtos_patrocinados"] = extrair_produtos_html(html, limite=LIMITE_OFERTAS, url_base=url)
+        finally:
+            disjuntor.registrar("sucesso" if resultados["produtos_patrocinados"] else MARCACAO)
+        if ao_ofertar:
+            for oferta in resultados["produtos_patrocinados"]:
+                ao_ofertar(oferta)
+        return resultados
+
+    def fechar(self):
+        self.pool.fechar()
+
+
+class BackendSelenium:
+    """Fluxo completo com Chrome (configurar_driver e extração via JavaScript)"""
+
+    nome = "selenium"
+
+    def __init__(self, pool_drivers=None, **opcoes_busca):
+        self.pool_drivers = pool_drivers
+        self.opcoes_busca = opcoes_busca
+
+    def buscar(self, produto, ao_ofertar=None, prazo=None):
+        from main import buscar_produtos_patrocinados
+        return buscar_produtos_patrocinados(produto, pool=self.pool_drivers, ao_ofertar=ao_ofertar,
+                                            prazo_tarefa=prazo, **self.opcoes_busca)
+
+    def fechar(self):
+        pass
+
+
+class BuscadorBackends:
+    """
+    Executa a busca no backend configurado e registra qual backend respondeu
+
+    `modo` pode ser "http", "selenium" ou "auto" (HTTP primeiro, Selenium
+    apenas quando o HTTP não encontra cards). Com um `cache`
+    (cache_resultados.CacheResultados), consultas repetidas dentro do TTL e
+    consultas simultâneas idênticas não disparam novas buscas.
+    """
+
+    def __init__(self, modo=None, http=None, selenium=None, cache=None):
+        self.modo = modo or BACKEND_PADRAO
+        if self.modo not in ("auto", "http", "selenium"):
+            raise ValueError(f"Backend desconhecido: {self.modo}")
+        self.http = http or BackendHTTP()
+        self.selenium = selenium or BackendSelenium()
+        self.cache = cache
+        self._lock = threading.Lock()
+        self.estatisticas = {
+            nome: {"tentativas": 0, "acertos": 0, "erros": 0, "tempo_total_s": 0.0}
+            for nome in ("http", "selenium")
+        }
+
+    def _executar(self, backend, produto, ao_ofertar=None, prazo=None):
+        inicio = time.time()
+        erro = False
+        try:
+            resultados = backend.buscar(produto, ao_ofertar=ao_ofertar, prazo=prazo)
+        except BuscaAdiada:
+            registrar_span("busca_backend", time.time() - inicio, "adiada", backend=backend.nome)
+            raise
+        except Exception as e:
+            print(f" Backend {backend.nome} falhou: {e}")
+            erro = True
+            resultados = {
+                "produto_buscado": produto,
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "produtos_patrocinados": []
+            }
+        duracao = time.time() - inicio
+        registrar_span("busca_backend", duracao, "erro" if erro else "ok", backend=backend.nome)
+
+        with self._lock:
+            stats = self.estatisticas[backend.nome]
+            stats["tentativas"] += 1
+            stats["tempo_total_s"] += duracao
+            if erro:
+                stats["erros"] += 1
+            elif resultados["produtos_patrocinados"]:
+                stats["acertos"] += 1
+
+        resultados["backend"] = backend.nome
+        resultados["tempo_backend_s"] = round(duracao, 3)
+        return resultados
+
+    def buscar(self, produto, forcar=False, ao_ofertar=None, prazo=None):
+        """
+        Busca o produto; `forcar=True` ignora o cache
+
+        `ao_ofertar(oferta)` recebe cada oferta assim que ela é extraída; um
+        resultado vindo do cache tem as ofertas repassadas de uma vez.
+        `prazo` (segundos) limita a busca inteira, inclusive o recurso ao
+        Selenium no modo "auto".
+        """
+        limite = time.monotonic() + prazo if prazo is not None else None
+        entregues = []
+
+        def repassar(oferta):
+            entregues.append(oferta)
+            ao_ofertar(oferta)
+
+        ao_buscar = repassar if ao_ofertar else None
+        with contexto(produto=produto):
+            if self.cache is not None:
+                resultados = self.cache.obter_ou_buscar(
+                    produto, lambda p: self._buscar_sem_cache(p, ao_buscar, limite), forcar=forcar)
+            else:
+                resultados = self._buscar_sem_cache(produto, ao_buscar, limite)
+        if ao_ofertar and not entregues:
+            for oferta in resultados["produtos_patrocinados"]:
+                ao_ofertar(oferta)
+        return resultados
+
+    def _buscar_sem_cache(self, produto, ao_ofertar=None, limite=None):
+        def restante():
+            return None if limite is None else max(0.0, limite - time.monotonic())
+
+        if self.modo in ("auto", "http"):
+            resultados = self._executar(self.http, produto, ao_ofertar, restante())
+            if self.modo == "http" or resultados["produtos_patrocinados"]:
+                return resultados
+            print(" Backend HTTP sem cards, recorrendo ao Selenium...")
+        return self._executar(self.selenium, produto, ao_ofertar, restante())
+
+    def relatorio(self):
+        """Taxa de acerto e latência média por backend"""
+        with self._lock:
+            relatorio = {}
+            for nome, stats in self.estatisticas.items():
+                tentativas = stats["tentativas"]
+                relatorio[nome] = dict(
+                    stats,
+                    taxa_acerto=round(stats["acertos"] / tentativas, 3) if tentativas else 0.0,
+                    latencia_media_s=round(stats["tempo_total_s"] / tentativas, 3) if tentativas else 0.0
+                )
+            return relatorio
+
+    def fechar(self):
+        self.http.fechar()
+        self.selenium.fechar()
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark offline do pipeline de coleta e extração
+
+Reproduz o corpus de páginas salvas do Google Shopping (fixtures/paginas) por
+um servidor HTTP local e mede, separadamente:
+
+- extração offline: análise do HTML e custo por card de extrair_produtos_html;
+- backend HTTP: vazão de ponta a ponta em diferentes níveis de concorrência;
+- Selenium (se disponível): inicialização do driver (configurar_driver),
+  navegação e espera pelos cards, e custo por card de cada estratégia
+  (lote, extrair_info_produto_melhorado, extrair_produtos_generico, offline).
+
+Cada extração é conferida com fixtures/paginas/esperado.json. Os resultados
+vão para um arquivo JSON; com `--base` os tempos são comparados com uma
+execução anterior usando as tolerâncias de fixtures/benchmark_limites.json.
+O processo termina com código 1 se houver perda de dados ou regressão.
+
+Uso:
+    python benchmark.py [--saida resultados_benchmark.json] [--base anterior.json]
+                        [--repeticoes 20] [--concorrencia 1,2,4,8] [--atraso-ms 50] [--sem-selenium]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from backends_busca import BackendHTTP
+from extracao_offline import analisar_html, extrair_produtos_html
+
+DIRETORIO_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DIRETORIO_CORPUS = os.path.join(DIRETORIO_FIXTURES, "paginas")
+ARQUIVO_LIMITES = os.path.join(DIRETORIO_FIXTURES, "benchmark_limites.json")
+AQUECIMENTO = 2                 # execuções descartadas antes de cada medição
+URL_BASE_ORIGINAL = "https://www.google.com/"
+
+# Campos conferidos em cada oferta; um campo ausente no esperado também deve faltar na extração
+CAMPOS_CONFERIDOS = ("nome", "loja", "link", "preco_centavos", "preco_anterior_centavos",
+                     "parcelas", "valor_parcela_centavos")
+
+PAGINA_INICIAL = """<!DOCTYPE html>
+<html lang="pt-BR"><head><meta charset="utf-8"><title>Google Shopping</title></head>
+<body><form action="/search" method="get"><input id="APjFqb" name="q" type="search"></form></body></html>
+"""
+
+
+def _recurso(tipo, tamanho, semente):
+    return tipo, random.Random(semente).randbytes(tamanho)
+
+
+# Recursos pesados típicos da página de resultados (caminho -> tipo, conteúdo)
+RECURSOS_SIMULADOS = dict(
+    {f"/recursos/produto_{i}.jpg": _recurso("image/jpeg", 40_000, i) for i in range(8)},
+    **{
+        "/recursos/fonte.woff2": _recurso("font/woff2", 60_000, 100),
+        "/recursos/estilo.css": ("text/css", b"body{font-family:Simulada,sans-serif}" + b"/*" + b"x" * 20_000 + b"*/"),
+        "/recursos/www.googletagmanager.com/gtm.js": ("application/javascript", b"/*" + b"y" * 80_000 + b"*/"),
+    }
+)
+
+
+def _bloco_recursos(origem):
+    """Referências aos recursos simulados, com URLs absolutas (a página tem <base> do Google)"""
+    imagens = "".join(f'<img src="{origem}{caminho}" width="90" height="90">'
+                      for caminho in RECURSOS_SIMULADOS if caminho.endswith(".jpg"))
+    return (
+        f'<style>@font-face{{font-family:Simulada;src:url({origem}/recursos/fonte.woff2)}}</style>'
+        f'<link rel="stylesheet" href="{origem}/recursos/estilo.css">'
+        f'<script async src="{origem}/recursos/www.googletagmanager.com/gtm.js"></script>'
+        f'<div>{imagens}</div>'
+    ).encode("utf-8")
+
+
+def carregar_corpus(diretorio=DIRETORIO_CORPUS):
+    """Páginas do corpus com a consulta e as ofertas esperadas"""
+    with open(os.path.join(diretorio, "esperado.json"), 'r', encoding='utf-8') as f:
+        paginas = json.load(f)
+    for pagina in paginas:
+        with open(os.path.join(diretorio, pagina["arquivo"]), 'r', encoding='utf-8') as f:
+            pagina["html"] = f.read()
+    return paginas
+
+
+def carregar_limites(caminho=ARQUIVO_LIMITES):
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class ServidorCorpus:
+    """
+    Servidor HTTP local que faz o papel do Google Shopping
+
+    `/search?q=<consulta>` devolve a página do corpus daquela consulta (com
+    gzip, se aceito, e keep-alive); `/shopping` devolve uma página inicial com
+    o campo de busca. `atraso` simula a latência da rede, em segundos.
+
+    Com `com_recursos=True` as páginas também referenciam imagens, fonte,
+    folha de estilo e um script de rastreamento servidos em `/recursos/`
+    (com Cache-Control), como a página real, para medir o efeito do bloqueio
+    de recursos e do cache do perfil do Chrome.
+    """
+
+    def __init__(self, corpus, atraso=0.0, com_recursos=False):
+        # O <base> mantém os links relativos (/url?q=...) apontando para o Google, como na página original
+        base = f'<head><base href="{URL_BASE_ORIGINAL}">'
+        paginas = {p["consulta"]: p["html"].replace("<head>", base, 1).encode("utf-8") for p in corpus}
+        atraso_resposta = atraso
+        recursos = RECURSOS_SIMULADOS if com_recursos else {}
+
+        class Manipulador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                partes = urlsplit(self.path)
+                tipo, cache = "text/html; charset=utf-8", None
+                if partes.path == "/search":
+                    consulta = parse_qs(partes.query).get("q", [""])[0]
+                    corpo = paginas.get(consulta)
+                    if corpo and recursos:
+                        origem = f"http://127.0.0.1:{self.server.server_address[1]}"
+                        corpo = corpo.replace(b"</body>", _bloco_recursos(origem) + b"</body>", 1)
+                elif partes.path in ("/", "/shopping"):
+                    corpo = PAGINA_INICIAL.encode("utf-8")
+                elif partes.path in recursos:
+                    tipo, corpo = recursos[partes.path]
+                    cache = "public, max-age=86400"
+                else:
+                    corpo = None
+                if atraso_resposta:
+                    time.sleep(atraso_resposta)
+
+                if corpo is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", tipo)
+                if cache:
+                    self.send_header("Cache-Control", cache)
+                if tipo.startswith("text/") and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                    corpo = gzip.compress(corpo)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manipulador)
+        self.servidor.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.servidor.server_address[1]}"
+        self.url_busca = self.url + "/search?q={consulta}"
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+def _percentil(ordenados, fracao):
+    return ordenados[min(len(ordenados) - 1, int(round(fracao * (len(ordenados) - 1))))]
+
+
+def resumo_tempos(tempos):
+    """
+    Mediana, p95, mínimo e intervalo interquartil (dispersão) de uma lista
+    de durações em segundos, em milissegundos
+    """
+    ordenados = sorted(tempos)
+    return {
+        "mediana_ms": round(statistics.median(ordenados) * 1000, 3),
+        "p95_ms": round(_percentil(ordenados, 0.95) * 1000, 3),
+        "min_ms": round(ordenados[0] * 1000, 3),
+        "iqr_ms": round((_percentil(ordenados, 0.75) - _percentil(ordenados, 0.25)) * 1000, 3),
+    }
+
+
+def medir(funcao, repeticoes, aquecimento=AQUECIMENTO):
+    """
+    Executa `funcao` `aquecimento` vezes sem medir e depois `repeticoes`
+    vezes; retorna (último resultado, durações)
+    """
+    for _ in range(aquecimento):
+        funcao()
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return resultado, tempos
+
+
+def conferir_extracao(obtidas, esperadas):
+    """Compara as ofertas extraídas com as esperadas, casando pelo link canônico"""
+    por_link = {o.get("link"): o for o in obtidas}
+    corretas = 0
+    divergencias = []
+    for esperada in esperadas:
+        obtida = por_link.get(esperada["link"])
+        if obtida is None:
+            divergencias.append({"link": esperada["link"], "campo": "oferta", "esperado": "presente", "obtido": None})
+            continue
+        campos = [c for c in CAMPOS_CONFERIDOS if esperada.get(c) != obtida.get(c)]
+        for campo in campos:
+            divergencias.append({"link": esperada["link"], "campo": campo,
+                                 "esperado": esperada.get(campo), "obtido": obtida.get(campo)})
+        if not campos:
+            corretas += 1
+    return {
+        "esperadas": len(esperadas),
+        "obtidas": len(obtidas),
+        "corretas": corretas,
+        "precisao": round(corretas / len(obtidas), 4) if obtidas else 0.0,
+        "recall": round(corretas / len(esperadas), 4) if esperadas else 1.0,
+        "divergencias": divergencias,
+    }
+
+
+def benchmark_extracao_offline(corpus, repeticoes):
+    """Tempo de análise do HTML e de extração por página, por card, e conferência"""
+    paginas = {}
+    for pagina in corpus:
+        _, tempos_analise = medir(lambda: analisar_html(pagina["html"]), repeticoes)
+        ofertas, tempos = medir(lambda: extrair_produtos_html(pagina["html"]), repeticoes)
+        cards = max(1, len(ofertas))
+        paginas[pagina["arquivo"]] = {
+            "bytes": len(pagina["html"].encode("utf-8")),
+            "analise_html": resumo_tempos(tempos_analise),
+            "extracao": resumo_tempos(tempos),
+            "por_card": resumo_tempos([t / cards for t in tempos]),
+            "conferencia": conferir_extracao(ofertas, pagina["ofertas"]),
+        }
+    return paginas
+
+
+def benchmark_http(servidor, corpus, niveis, repeticoes):
+    """Vazão de ponta a ponta do backend HTTP (download + extração) por nível de concorrência"""
+    esperadas = {p["consulta"]: p["ofertas"] for p in corpus}
+    consultas = [p["consulta"] for p in corpus] * repeticoes
+    resultados = {}
+    for nivel in niveis:
+        backend = BackendHTTP(url_busca=servidor.url_busca, max_por_host=nivel)
+
+        def buscar(consulta):
+            inicio = time.perf_counter()
+            resultado = backend.buscar(consulta)
+            return resultado, time.perf_counter() - inicio
+
+        try:
+            # Aquecimento: abre as conexões keep-alive antes de medir
+            with ThreadPoolExecutor(max_workers=nivel) as executor:
+                list(executor.map(buscar, [p["consulta"] for p in corpus] * AQUECIMENTO))
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=nivel) as executor:
+                respostas = list(executor.map(buscar, consultas))
+            total = time.perf_counter() - inicio
+        finally:
+            backend.fechar()
+
+        conferencias = [conferir_extracao(r["produtos_patrocinados"], esperadas[r["produto_buscado"]])
+                        for r, _ in respostas]
+        resultados[str(nivel)] = {
+            "buscas": len(consultas),
+            "total_s": round(total, 3),
+            "buscas_por_segundo": round(len(consultas) / total, 2),
+            "latencia": resumo_tempos([t for _, t in respostas]),
+            "conexoes": dict(backend.pool.estatisticas),
+            "recall_minimo": min(c["recall"] for c in conferencias),
+            "precisao_minima": min(c["precisao"] for c in conferencias),
+        }
+    return resultados
+
+
+def benchmark_selenium(servidor, corpus, repeticoes):
+    """Inicialização do Chrome, navegação, espera e custo por card de cada estratégia"""
+    try:
+        import main
+        from espera import Prazo, aguardar_resultados
+        from extracao_lote import extrair_produtos_lote
+        from selenium.common.exceptions import TimeoutException
+    except ImportError as e:
+        return {"ignorado": f"Selenium indisponível: {e}"}
+
+    inicio = time.perf_counter()
+    driver = main.configurar_driver()
+    inicializacao = time.perf_counter() - inicio
+    if driver is None:
+        return {"ignorado": "Não foi possível iniciar o Chrome"}
+
+    resultados = {"inicializacao_driver": resumo_tempos([inicializacao]), "paginas": {}}
+    try:
+        for pagina in corpus:
+            url = servidor.url_busca.format(consulta=pagina["consulta"].replace(" ", "+"))
+            inicio = time.perf_counter()
+            driver.get(url)
+            navegacao = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            try:
+                aguardar_resultados(driver, Prazo(30))
+            except TimeoutException:
+                pass
+            espera = time.perf_counter() - inicio
+
+            estrategias = {
+                "lote": lambda: extrair_produtos_lote(driver),
+                "elemento": lambda: main.extrair_produtos_por_elemento(driver),
+                "generico": lambda: main.extrair_produtos_generico(driver),
+                "offline": lambda: extrair_produtos_html(driver.page_source, url_base=url),
+            }
+            medidas = {"navegacao": resumo_tempos([navegacao]), "espera_resultados": resumo_tempos([espera])}
+            for nome, funcao in estrategias.items():
+                ofertas, tempos = medir(funcao, repeticoes)
+                cards = max(1, len(ofertas))
+                medidas[nome] = {
+                    "extracao": resumo_tempos(tempos),
+                    "por_card": resumo_tempos([t / cards for t in tempos]),
+                    "conferencia": conferir_extracao(ofertas, pagina["ofertas"]),
+                }
+            resultados["paginas"][pagina["arquivo"]] = medidas
+    finally:
+        driver.quit()
+    return resultados
+
+
+def _metricas_tempo(dados, prefixo=""):
+    """Achata o resultado em {caminho: valor} para as métricas comparáveis entre execuções"""
+    metricas = {}
+    if isinstance(dados, dict):
+        for chave, valor in dados.items():
+            caminho = f"{prefixo}.{chave}" if prefixo else chave
+            if chave in ("mediana_ms", "iqr_ms", "buscas_por_segundo") and isinstance(valor, (int, float)):
+                metricas[caminho] = valor
+            else:
+                metricas.update(_metricas_tempo(valor, caminho))
+    return metricas
+
+
+def verificar_regressoes(atual, base, limites):
+    """
+    Métricas que pioraram além da tolerância em relação à execução base
+
+    Um tempo só conta como regressão quando a piora passa da tolerância
+    relativa, do mínimo absoluto e da dispersão somada das duas execuções
+    (IQR x `regressao_fator_dispersao`). Métricas cujo caminho contém um
+    trecho de `regressao_somente_aviso` (latência de rede simulada, por
+    exemplo) vão para a lista de avisos e não reprovam a execução.
+
+    Retorna (regressoes, avisos).
+    """
+    tolerancia = limites["regressao_tolerancia"]
+    minimo_ms = limites["regressao_minima_ms"]
+    fator_dispersao = limites.get("regressao_fator_dispersao", 1.0)
+    somente_aviso = limites.get("regressao_somente_aviso", [])
+    metricas_base = _metricas_tempo(base)
+    metricas_atual = _metricas_tempo(atual)
+    regressoes, avisos = [], []
+    for caminho, valor in metricas_atual.items():
+        anterior = metricas_base.get(caminho)
+        if not anterior or caminho.endswith("iqr_ms"):
+            continue
+        if caminho.endswith("buscas_por_segundo"):
+            piorou = valor < anterior * (1 - tolerancia)
+        else:
+            caminho_dispersao = caminho[:-len("mediana_ms")] + "iqr_ms"
+            dispersao = metricas_base.get(caminho_dispersao, 0.0) + metricas_atual.get(caminho_dispersao, 0.0)
+            piora = valor - anterior
+            piorou = valor > anterior * (1 + tolerancia) and piora > minimo_ms and piora > fator_dispersao * dispersao
+        if piorou:
+            registro = {"metrica": caminho, "base": anterior, "atual": valor,
+                        "variacao_percentual": round(100 * (valor - anterior) / anterior, 1)}
+            (avisos if any(t in caminho for t in somente_aviso) else regressoes).append(registro)
+    return regressoes, avisos
+
+
+def verificar_precisao(resultados, limites):
+    """Extrações abaixo da precisão ou do recall mínimos"""
+    falhas = []
+    verificadas = set(limites["estrategias_verificadas"])
+
+    def conferir(origem, precisao, recall):
+        if precisao < limites["precisao_minima"] or recall < limites["recall_minimo"]:
+            falhas.append({"origem": origem, "precisao": precisao, "recall": recall})
+
+    for arquivo, medidas in resultados["extracao_offline"].items():
+        conferir(f"extracao_offline.{arquivo}", medidas["conferencia"]["precisao"], medidas["conferencia"]["recall"])
+    for nivel, medidas in resultados["http"].items():
+        conferir(f"http.{nivel}", medidas["precisao_minima"], medidas["recall_minimo"])
+    for arquivo, medidas in resultados["selenium"].get("paginas", {}).items():
+        for estrategia, dados in medidas.items():
+            if estrategia in verificadas:
+                conferir(f"selenium.{arquivo}.{estrategia}",
+                         dados["conferencia"]["precisao"], dados["conferencia"]["recall"])
+    return falhas
+
+
+def executar(repeticoes=20, niveis=(1, 2, 4, 8), atraso=0.05, selenium=True, corpus=None):
+    """Executa todas as etapas e retorna o dicionário de resultados"""
+    corpus = corpus or carregar_corpus()
+    resultados = {
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "repeticoes": repeticoes,
+            "atraso_servidor_ms": round(atraso * 1000),
+        }
+    }
+    print(" Extração offline...")
+    resultados["extracao_offline"] = benchmark_extracao_offline(corpus, repeticoes)
+    with ServidorCorpus(corpus, atraso=atraso) as servidor:
+        print(f" Backend HTTP em {servidor.url} (concorrência {', '.join(map(str, niveis))})...")
+        resultados["http"] = benchmark_http(servidor, corpus, niveis, max(2, repeticoes // 2))
+        if selenium:
+            print(" Selenium...")
+            resultados["selenium"] = benchmark_selenium(servidor, corpus, max(1, repeticoes // 5))
+        else:
+            resultados["selenium"] = {"ignorado": "desativado (--sem-selenium)"}
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline de coleta e extração")
+    parser.add_argument("--saida", default="resultados_benchmark.json")
+    parser.add_argument("--base", help="resultado de uma execução anterior para detectar regressões")
+    parser.add_argument("--limites", default=ARQUIVO_LIMITES)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--concorrencia", default="1,2,4,8")
+    parser.add_argument("--atraso-ms", type=float, default=50)
+    parser.add_argument("--sem-selenium", action="store_true")
+    args = parser.parse_args()
+
+    limites = carregar_limites(args.limites)
+    resultados = executar(
+        repeticoes=args.repeticoes,
+        niveis=[int(n) for n in args.concorrencia.split(",")],
+        atraso=args.atraso_ms / 1000,
+        selenium=not args.sem_selenium,
+    )
+    resultados["falhas_precisao"] = verificar_precisao(resultados, limites)
+    resultados["regressoes"], resultados["avisos_regressao"] = [], []
+    if args.base:
+        with open(args.base, 'r', encoding='utf-8') as f:
+            resultados["regressoes"], resultados["avisos_regressao"] = verificar_regressoes(
+                resultados, json.load(f), limites)
+
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+    for arquivo, medidas in resultados["extracao_offline"].items():
+        print(f" {arquivo}: {medidas['extracao']['mediana_ms']} ms/página, "
+              f"{medidas['por_card']['mediana_ms']} ms/card, recall {medidas['conferencia']['recall']}")
+    for nivel, medidas in resultados["http"].items():
+        print(f" HTTP x{nivel}: {medidas['buscas_por_segundo']} buscas/s, p95 {medidas['latencia']['p95_ms']} ms")
+    if "ignorado" in resultados["selenium"]:
+        print(f" Selenium ignorado: {resultados['selenium']['ignorado']}")
+    for falha in resultados["falhas_precisao"]:
+        print(f"❌ Perda de dados em {falha['origem']}: precisão {falha['precisao']}, recall {falha['recall']}")
+    for regressao in resultados["regressoes"]:
+        print(f"❌ Regressão em {regressao['metrica']}: {regressao['base']} -> {regressao['atual']} "
+              f"({regressao['variacao_percentual']:+}%)")
+    for aviso in resultados["avisos_regressao"]:
+        print(f"⚠️ Piora em {aviso['metrica']} (latência simulada, não reprova): {aviso['base']} -> "
+              f"{aviso['atual']} ({aviso['variacao_percentual']:+}%)")
+    print(f" Resultados salvos em {args.saida}")
+    sys.exit(1 if resultados["falhas_precisao"] or resultados["regressoes"] else 0)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cache de resultados de busca com TTL e coalescência de buscas idênticas
+
+Camada em memória (LRU com tamanho máximo) e camada opcional em disco que
+sobrevive a reinícios. Buscas simultâneas pela mesma consulta normalizada
+compartilham uma única execução (single-flight) em vez de abrir vários
+navegadores.
+
+Arquivos vencidos da camada em disco são removidos ao serem lidos e numa
+varredura feita, no máximo, a cada INTERVALO_LIMPEZA_DISCO_S durante as
+gravações.
+
+Resultados entregues pelo cache (inclusive os coalescidos) saem marcados com
+`do_cache=True` e mantêm o timestamp da busca original; o histórico usa a
+marca para não contar as mesmas ofertas duas vezes.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from historico import DATA_DIR
+
+CACHE_TTL = int(os.environ.get("MEIU_CACHE_TTL", "900"))
+CACHE_MAX_ITENS = int(os.environ.get("MEIU_CACHE_MAX_ITENS", "500"))
+INTERVALO_LIMPEZA_DISCO_S = 300
+
+
+def normalizar_consulta(produto):
+    """Chave do cache: consulta sem diferença de caixa e de espaços"""
+    return " ".join(produto.casefold().split())
+
+
+class _EmAndamento:
+    """Busca em execução aguardada pelas requisições coalescidas"""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+    def erro_para_seguidor(self):
+        """
+        Cópia da exceção do líder para uma requisição coalescida
+
+        Levantar a mesma instância em várias threads mistura os tracebacks;
+        a cópia mantém o tipo e os atributos e aponta para a original.
+        """
+        erro = self.erro
+        copia = type(erro).__new__(type(erro))
+        copia.args = erro.args
+        copia.__dict__.update(erro.__dict__)
+        copia.__cause__ = erro
+        return copia
+
+
+class CacheResultados:
+    """Cache LRU com TTL, camada em disco opcional e single-flight"""
+
+    def __init__(self, ttl=CACHE_TTL, max_itens=CACHE_MAX_ITENS, diretorio_disco=None):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self.diretorio_disco = diretorio_disco
+        if diretorio_disco:
+            os.makedirs(diretorio_disco, exist_ok=True)
+        self._memoria = OrderedDict()
+        self._em_andamento = {}
+        self._lock = threading.Lock()
+        self._ultima_limpeza = time.time()
+        self.contadores = {
+            "acertos_memoria": 0,
+            "acertos_disco": 0,
+            "falhas": 0,
+            "coalescidas": 0,
+            "atualizacoes_forcadas": 0,
+            "removidos_disco": 0,
+        }
+
+    def _arquivo_disco(self, chave):
+        nome = hashlib.sha1(chave.encode('utf-8')).hexdigest() + ".json"
+        return os.path.join(self.diretorio_disco, nome)
+
+    def _ler_disco(self, chave):
+        if not self.diretorio_disco:
+            return None
+        try:
+            with open(self._arquivo_disco(chave), 'r', encoding='utf-8') as f:
+                item = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if item.get("chave") != chave:
+            return None
+        if item.get("expira_em", 0) <= time.time():
+            self._remover_disco(self._arquivo_disco(chave))
+            return None
+        return item["expira_em"], item["resultado"]
+
+    def _remover_disco(self, caminho):
+        try:
+            os.remove(caminho)
+        except OSError:
+            return False
+        with self._lock:
+            self.contadores["removidos_disco"] += 1
+        return True
+
+    def limpar_disco(self):
+        """Remove da camada em disco os itens vencidos e temporários abandonados; retorna quantos"""
+        if not self.diretorio_disco:
+            return 0
+        agora = time.time()
+        removidos = 0
+        try:
+            nomes = os.listdir(self.diretorio_disco)
+        except OSError:
+            return 0
+        for nome in nomes:
+            caminho = os.path.join(self.diretorio_disco, nome)
+            if nome.endswith(".tmp"):
+                # Gravação interrompida; uma gravação em curso tem menos de um TTL
+                try:
+                    vencido = os.path.getmtime(caminho) < agora - self.ttl
+                except OSError:
+                    continue
+            elif nome.endswith(".json"):
+                try:
+                    with open(caminho, 'r', encoding='utf-8') as f:
+                        vencido = json.load(f).get("expira_em", 0) <= agora
+                except (OSError, ValueError, AttributeError):
+                    vencido = True
+            else:
+                continue
+            if vencido and self._remover_disco(caminho):
+                removidos += 1
+        return removidos
+
+    def _gravar_disco(self, chave, expira_em, resultado):
+        if not self.diretorio_disco:
+            return
+        with self._lock:
+            limpar = time.time() - self._ultima_limpeza >= INTERVALO_LIMPEZA_DISCO_S
+            if limpar:
+                self._ultima_limpeza = time.time()
+        if limpar:
+            self.limpar_disco()
+        caminho = self._arquivo_disco(chave)
+        temporario = caminho + ".tmp"
+        try:
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump({"chave": chave, "expira_em": expira_em, "resultado": resultado}, f, ensure_ascii=False)
+            os.replace(temporario, caminho)
+        except OSError as e:
+            print(f"Erro ao gravar cache em disco: {e}")
+
+    def _guardar_memoria(self, chave, expira_em, resultado):
+        # Chamado com o lock adquirido
+        self._memoria[chave] = (expira_em, resultado)
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.max_itens:
+            self._memoria.popitem(last=False)
+
+    def obter(self, produto):
+        """Resultado em cache ainda válido, ou None"""
+        chave = normalizar_consulta(produto)
+        with self._lock:
+            item = self._memoria.get(chave)
+            if item and item[0] > time.time():
+                self._memoria.move_to_end(chave)
+                self.contadores["acertos_memoria"] += 1
+                return self._copia(item[1], "memoria")
+            if item:
+                del self._memoria[chave]
+
+        item = self._ler_disco(chave)
+        if item:
+            with self._lock:
+                self._guardar_memoria(chave, *item)
+                self.contadores["acertos_disco"] += 1
+            return self._copia(item[1], "disco")
+        return None
+
+    def guardar(self, produto, resultado):
+        chave = normalizar_consulta(produto)
+        expira_em = time.time() + self.ttl
+        with self._lock:
+            self._guardar_memoria(chave, expira_em, resultado)
+        self._gravar_disco(chave, expira_em, resultado)
+
+    def invalidar(self, produto):
+        chave = normalizar_consulta(produto)
+        with self._lock:
+            self._memoria.pop(chave, None)
+        if self.diretorio_disco:
+            try:
+                os.remove(self._arquivo_disco(chave))
+            except OSError:
+                pass
+
+    @staticmethod
+    def _copia(resultado, origem):
+        copia = copy.deepcopy(resultado)
+        copia["origem_cache"] = origem
+        copia["do_cache"] = True
+        return copia
+
+    def obter_ou_buscar(self, produto, buscar, forcar=False):
+        """
+        Retorna o resultado em cache ou executa `buscar(produto)`
+
+        Com `forcar=True` o cache é ignorado e uma nova busca é feita. Buscas
+        simultâneas pela mesma consulta aguardam a execução já em andamento.
+        Apenas resultados com ofertas são guardados.
+        """
+        chave = normalizar_consulta(produto)
+        if forcar:
+            with self._lock:
+                self.contadores["atualizacoes_forcadas"] += 1
+        else:
+            resultado = self.obter(produto)
+            if resultado is not None:
+                return resultado
+
+        with self._lock:
+            em_andamento = self._em_andamento.get(chave)
+            lider = em_andamento is None
+            if lider:
+                em_andamento = self._em_andamento[chave] = _EmAndamento()
+                if not forcar:
+                    self.contadores["falhas"] += 1
+            else:
+                self.contadores["coalescidas"] += 1
+
+        if not lider:
+            em_andamento.evento.wait()
+            if em_andamento.erro is not None:
+                raise em_andamento.erro_para_seguidor()
+            return self._copia(em_andamento.resultado, "coalescida")
+
+        try:
+            resultado = buscar(produto)
+            if resultado and resultado.get("produtos_patrocinados"):
+                self.guardar(produto, resultado)
+            em_andamento.resultado = resultado
+            return copy.deepcopy(resultado)
+        except Exception as e:
+            em_andamento.erro = e
+            raise
+        finally:
+            with self._lock:
+                self._em_andamento.pop(chave, None)
+            em_andamento.evento.set()
+
+
+_cache = None
+_lock_cache = threading.Lock()
+
+
+def obter_cache():
+    """Cache compartilhado do processo, com camada em disco no diretório de dados"""
+    global _cache
+    with _lock_cache:
+        if _cache is None:
+            _cache = CacheResultados(diretorio_disco=os.path.join(DATA_DIR, "cache"))
+        return _cache
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Esperas orientadas a eventos para o fluxo de busca
+
+Substitui os `time.sleep` fixos por condições reais (campo de busca pronto,
+primeiro card renderizado, quantidade de cards estável, rede ociosa), todas
+limitadas por um único prazo por consulta.
+"""
+
+import time
+from urllib.parse import quote_plus
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+
+from extracao import SELETORES_PRODUTOS, URL_BUSCA_DIRETA
+from instrumentacao import registrar_span
+from seletores import obter_registro_seletores
+
+# Conta os cards do primeiro seletor que tiver resultados e os recursos de rede já carregados
+SCRIPT_ESTADO_PAGINA = """
+const seletores = arguments[0];
+let seletor = null, cards = 0;
+for (const s of seletores) {
+    let n = 0;
+    try { n = document.querySelectorAll(s).length; } catch (e) {}
+    if (n) { seletor = s; cards = n; break; }
+}
+const recursos = (window.performance && performance.getEntriesByType)
+    ? performance.getEntriesByType('resource').length : 0;
+return {seletor: seletor, cards: cards, recursos: recursos, pronto: document.readyState};
+"""
+
+# Rola até o fim dos resultados e aciona o botão de mais resultados, se houver
+SCRIPT_CARREGAR_MAIS = """
+window.scrollTo(0, document.body.scrollHeight);
+const rotulos = ['mais resultados', 'mais produtos', 'more results', 'ver mais', 'próxima', 'next'];
+for (const el of document.querySelectorAll('a[role="button"], button, div[role="button"], a#pnnext')) {
+    const texto = ((el.innerText || el.getAttribute('aria-label') || '') + '').trim().toLowerCase();
+    if (el.id === 'pnnext' || rotulos.some(r => texto === r || texto.startsWith(r))) {
+        if (el.offsetParent !== null) { el.scrollIntoView(); el.click(); return texto || el.id; }
+    }
+}
+return null;
+"""
+
+
+def url_busca_direta(produto):
+    """URL de resultados do Google Shopping com a consulta já codificada"""
+    return URL_BUSCA_DIRETA.format(consulta=quote_plus(produto))
+
+
+class Prazo:
+    """Prazo total de uma consulta, compartilhado entre todas as esperas"""
+
+    def __init__(self, segundos):
+        self.limite = time.monotonic() + segundos
+
+    def restante(self):
+        return max(0.0, self.limite - time.monotonic())
+
+    def esgotado(self):
+        return self.restante() <= 0
+
+
+class CronometroFases:
+    """
+    Registra quanto tempo cada fase da consulta realmente levou
+
+    Cada fase encerrada também vira um span da instrumentação (navegação,
+    campo de busca, digitação, espera dos resultados, extração).
+    """
+
+    def __init__(self):
+        self.tempos = {}
+        self._fase = None
+        self._inicio = None
+
+    def iniciar(self, fase):
+        self.encerrar()
+        self._fase = fase
+        self._inicio = time.monotonic()
+
+    def encerrar(self):
+        if self._fase:
+            duracao = time.monotonic() - self._inicio
+            self.tempos[self._fase] = round(self.tempos.get(self._fase, 0.0) + duracao, 3)
+            registrar_span(self._fase, duracao)
+            self._fase = None
+
+    def resumo(self):
+        self.encerrar()
+        return dict(self.tempos)
+
+
+def aguardar(condicao, prazo, intervalo=0.1, descricao="condição"):
+    """Avalia `condicao()` até retornar um valor verdadeiro ou o prazo acabar"""
+    while True:
+        try:
+            resultado = condicao()
+            if resultado:
+                return resultado
+        except Exception:
+            pass
+        if prazo.esgotado():
+            raise TimeoutException(f"Tempo esgotado aguardando {descricao}")
+        time.sleep(min(intervalo, prazo.restante()))
+
+
+def campo_busca_pronto(driver, prazo):
+    """
+    Retorna o primeiro campo de busca visível e habilitado entre os seletores conhecidos
+
+    Os seletores são tentados na ordem do registro adaptativo; só a passada
+    que encontra o campo (ou o esgotamento do prazo) entra nas estatísticas,
+    para que as tentativas durante o carregamento não contem como falhas.
+    """
+    registro = obter_registro_seletores()
+    seletores = registro.ordem("busca")
+
+    def condicao():
+        for seletor in seletores:
+            inicio = time.perf_counter()
+            for elemento in driver.find_elements(By.CSS_SELECTOR, seletor):
+                if elemento.is_displayed() and elemento.is_enabled():
+                    registro.registrar("busca", seletor, True, time.perf_counter() - inicio)
+                    registro.registrar_cascata("busca", seletores[:seletores.index(seletor)], None)
+                    return elemento
+        return None
+
+    try:
+        return aguardar(condicao, prazo, descricao="campo de busca")
+    except TimeoutException:
+        registro.registrar_cascata("busca", seletores, None)
+        raise
+
+
+def valor_do_campo(campo, esperado, prazo):
+    """Aguarda o campo de busca conter exatamente o texto esperado"""
+    return aguardar(lambda: campo.get_attribute("value") == esperado or None, prazo,
+                    intervalo=0.05, descricao="texto no campo de busca")
+
+
+def estado_pagina(driver, seletores=None):
+    return driver.execute_script(SCRIPT_ESTADO_PAGINA, seletores or SELETORES_PRODUTOS)
+
+
+def aguardar_resultados(driver, prazo, janela_estavel=0.75, intervalo=0.15):
+    """
+    Aguarda os resultados renderizarem
+
+    Espera o primeiro card de qualquer seletor de cards (na ordem do registro
+    adaptativo) e então considera a página pronta quando a quantidade de
+    cards e de recursos de rede fica estável por `janela_estavel` segundos.
+    Se o prazo acabar depois do primeiro card, segue com o que já foi
+    renderizado.
+    """
+    registro = obter_registro_seletores()
+    seletores = registro.ordem("produtos")
+
+    def primeiro_card():
+        estado = estado_pagina(driver, seletores)
+        return estado if estado.get("cards") else None
+
+    try:
+        estado = aguardar(primeiro_card, prazo, intervalo=intervalo, descricao="primeiro card de produto")
+    except TimeoutException:
+        registro.registrar_cascata("produtos", seletores, None)
+        raise
+    registro.registrar_cascata("produtos", seletores, estado.get("seletor"))
+
+    ultimo = (estado["cards"], estado["recursos"])
+    estavel_desde = time.monotonic()
+    while not prazo.esgotado():
+        time.sleep(min(intervalo, prazo.restante()))
+        try:
+            estado = estado_pagina(driver, seletores)
+        except Exception:
+            break
+        atual = (estado["cards"], estado["recursos"])
+        if atual != ultimo:
+            ultimo = atual
+            estavel_desde = time.monotonic()
+        elif estado.get("pronto") == "complete" and time.monotonic() - estavel_desde >= janela_estavel:
+            break
+    return estado
+
+
+def carregar_mais_resultados(driver, prazo, seletores=None, janela=3.0, intervalo=0.2):
+    """
+    Rola a página (e aciona "mais resultados") e espera novos cards aparecerem
+
+    Retorna True se a quantidade de cards aumentou dentro de `janela`
+    segundos (limitados pelo prazo da busca profunda).
+    """
+    seletores = seletores or obter_registro_seletores().ordem("produtos")
+    antes = estado_pagina(driver, seletores).get("cards", 0)
+    driver.execute_script(SCRIPT_CARREGAR_MAIS)
+    limite = Prazo(min(janela, prazo.restante()))
+
+    def mais_cards():
+        return estado_pagina(driver, seletores).get("cards", 0) > antes
+
+    try:
+        aguardar(mais_cards, limite, intervalo=intervalo, descricao="novos cards após rolagem")
+        return True
+    except TimeoutException:
+        return False
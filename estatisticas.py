@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Estatísticas de preço por produto e por loja
+
+Sobre o histórico, o cálculo é feito pelo próprio SQLite em uma única
+consulta com funções de janela (todas as ofertas ordenadas e agregadas de
+uma vez, sem laços em Python por produto). Para um relatório já carregado
+em memória há uma versão equivalente em Python puro.
+"""
+
+from datetime import datetime, timedelta
+
+from precos import centavos_da_oferta
+
+# Percentis calculados (nearest-rank inferior, igual nas duas versões)
+PERCENTIS = (25, 50, 75, 90)
+
+AGRUPAMENTOS = {
+    "produto": ("o.produto_id", "p.nome AS produto"),
+    "loja": ("o.loja_id", "l.nome AS loja"),
+    "produto_loja": ("o.produto_id, o.loja_id", "p.nome AS produto, l.nome AS loja"),
+}
+
+
+def _posicao_percentil(n, percentil):
+    """Posição (base 1) do percentil em uma lista ordenada de n valores"""
+    return int((n - 1) * percentil / 100) + 1
+
+
+def _consulta_estatisticas(agrupamento, filtro="o.timestamp >= ?"):
+    particao, colunas = AGRUPAMENTOS[agrupamento]
+    nomes = [coluna.split(" AS ")[1] for coluna in colunas.split(", ")]
+    percentis = ",\n            ".join(
+        f"MAX(CASE WHEN pos = CAST((n - 1) * {p} / 100 AS INTEGER) + 1 THEN preco END) AS p{p}"
+        for p in PERCENTIS
+    )
+    return f"""
+        WITH base AS (
+            SELECT {colunas}, o.preco_centavos AS preco,
+                   ROW_NUMBER() OVER (PARTITION BY {particao} ORDER BY o.preco_centavos) AS pos,
+                   COUNT(*) OVER (PARTITION BY {particao}) AS n
+            FROM ofertas o
+            JOIN produtos p ON p.id = o.produto_id
+            LEFT JOIN lojas l ON l.id = o.loja_id
+            WHERE o.preco_centavos IS NOT NULL AND {filtro}
+        )
+        SELECT {", ".join(nomes)},
+            COUNT(*) AS ofertas,
+            MIN(preco) AS minimo,
+            MAX(preco) AS maximo,
+            CAST(AVG(preco) AS INTEGER) AS media,
+            {percentis}
+        FROM base
+        GROUP BY {", ".join(nomes)}
+    """
+
+
+def _completar(linha):
+    linha["mediana"] = linha.get("p50")
+    linha["amplitude"] = linha["maximo"] - linha["minimo"]
+    linha["amplitude_percentual"] = round(100 * linha["amplitude"] / linha["minimo"], 1) if linha["minimo"] else None
+    return linha
+
+
+def estatisticas_historico(historico, agrupamento="produto", dias=90, relatorio=None):
+    """
+    Estatísticas de preço (em centavos) sobre todo o histórico dos últimos `dias`
+
+    Ofertas de acertos de cache repetem as da busca original e só entram nas
+    estatísticas de um relatório.
+
+    `agrupamento` pode ser "produto", "loja" ou "produto_loja". Com
+    `relatorio`, considera apenas as ofertas desse relatório (e ignora `dias`).
+    Retorna uma lista de dicionários com ofertas, minimo, maximo, media,
+    mediana, p25, p50, p75, p90, amplitude e amplitude_percentual.
+    """
+    if relatorio is not None:
+        consulta = _consulta_estatisticas(
+            agrupamento, "o.busca_id IN (SELECT id FROM buscas WHERE relatorio = ?)")
+        return [_completar(linha) for linha in historico.consultar(consulta, (relatorio,))]
+    desde = (datetime.now() - timedelta(days=dias)).strftime("%Y-%m-%d %H:%M:%S")
+    consulta = _consulta_estatisticas(agrupamento, "o.timestamp >= ? AND o.do_cache IS NULL")
+    return [_completar(linha) for linha in historico.consultar(consulta, (desde,))]
+
+
+def estatisticas_precos(precos):
+    """Mesmas estatísticas para uma lista de preços em centavos (None é ignorado)"""
+    valores = sorted(p for p in precos if p is not None)
+    if not valores:
+        return None
+    n = len(valores)
+    linha = {
+        "ofertas": n,
+        "minimo": valores[0],
+        "maximo": valores[-1],
+        "media": sum(valores) // n,
+    }
+    for p in PERCENTIS:
+        linha[f"p{p}"] = valores[_posicao_percentil(n, p) - 1]
+    return _completar(linha)
+
+
+def estatisticas_relatorio(relatorio):
+    """Estatísticas por produto buscado e por loja de um relatório carregado"""
+    por_produto = {}
+    precos_por_loja = {}
+    for produto, dados in relatorio.get("resultados_detalhados", {}).items():
+        ofertas = dados.get("produtos_patrocinados", [])
+        precos = [centavos_da_oferta(o) for o in ofertas]
+        por_produto[produto] = estatisticas_precos(precos)
+        for oferta, preco in zip(ofertas, precos):
+            if preco is not None:
+                precos_por_loja.setdefault(oferta.get("loja") or "Desconhecida", []).append(preco)
+
+    por_loja = {loja: estatisticas_precos(precos) for loja, precos in sorted(precos_por_loja.items())}
+    return {"por_produto": por_produto, "por_loja": por_loja}
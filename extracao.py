@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Seletores e regras de extração compartilhados pelas estratégias de coleta"""
+
+import os
+import re
+from urllib.parse import unquote
+
+from links import resolver_link, processar_links
+from precos import analisar_preco
+
+URL_GOOGLE_SHOPPING = "https://www.google.com/shopping?hl=pt-BR"
+URL_BUSCA_DIRETA = "https://www.google.com/search?tbm=shop&hl=pt-BR&q={consulta}"
+
+# Ofertas por busca: normal (cards já renderizados) e profunda (rolando a página)
+LIMITE_OFERTAS = int(os.environ.get("MEIU_LIMITE_OFERTAS", "20"))
+LIMITE_PROFUNDO = int(os.environ.get("MEIU_LIMITE_PROFUNDO", "100"))
+PRAZO_PROFUNDO = float(os.environ.get("MEIU_PRAZO_PROFUNDO", "20"))
+BUSCA_PROFUNDA = os.environ.get("MEIU_BUSCA_PROFUNDA", "0") == "1"
+
+# Seletores usados na página de resultados do Google Shopping
+SELETORES_BUSCA = ["#APjFqb", "input[name='q']", "input[type='search']"]
+
+SELETORES_PRODUTOS = [
+    "[id^='vplahcl_']",
+    "[data-docid][jscontroller]", 
+    ".sh-dgr__content",
+    ".PLla-d",
+    "[role='listitem']"
+]
+
+SELETOR_PRODUTOS_AMPLO = "div[data-hveid], div[data-ved]"
+
+SELETORES_NOME = [
+    "span.pymv4e",  # Classe específica vista na imagem
+    "span[class*='pymv4e']",
+    ".pymv4e",
+    "h3", "h4", "h2",
+    "[aria-label]",
+    "[title]",
+    ".sh-np__product-title",
+    ".PLla-d",
+    "a[href] span",
+    "a[href] div",
+    "span[role='link']",
+    "*[class*='title']",
+    "*[class*='name']",
+    "*[class*='product']"
+]
+
+SELETORES_PRECO = [
+    "div[class*='qptdjc']",  # Classe comum para preços
+    "span[class*='qptdjc']",
+    ".qptdjc",
+    "div[style*='webkit-line-clamp']",  # Preços com truncamento
+    "[class*='13vB']",  # Padrão de classe para preços
+    "[class*='RRDx']",  # Outro padrão comum
+    "[class*='hdYIY']",  # Classe encontrada no debug
+    "div[data-offer-id] span",
+    "div[data-offer-id] div"
+]
+
+# Textos que claramente não são nomes de produto
+FILTROS_INVALIDOS = [
+    'custava', 'reais', 'ver mais', 'comprar', 'classificado como',
+    'estrelas', 'avaliação', 'nota', 'rating', 'review',
+    'de 5', 'promoção', 'desconto', 'frete', 'de amazon',
+    'de mercadolivre', 'de pichau', 'de kabum'
+]
+
+SELETORES_PRODUTOS_GENERICO = [
+    ".sh-dgr__content",
+    "[data-docid]",
+    ".PLla-d",
+    ".sh-dlr__list-result"
+]
+
+REGEX_PRECO = re.compile(r'R\$\s*[\d,.]+')
+PADROES_NOME_URL = [
+    re.compile(r'/([^/]+?)(?:-\d+|/dp/|/p/)'),  # Amazon e Mercado Livre
+    re.compile(r'/([^/]+?)(?:\?|$)'),           # Genérico
+]
+
+def nome_valido(texto):
+    """Indica se o texto parece ser um nome de produto"""
+    if not texto or len(texto) <= 5 or texto.startswith('R$'):
+        return False
+    texto_lower = texto.lower()
+    return not any(filtro in texto_lower for filtro in FILTROS_INVALIDOS)
+
+def extrair_preco_texto(texto):
+    """Retorna o primeiro valor no formato 'R$ 1.234,56' encontrado no texto"""
+    if not texto or 'R$' not in texto:
+        return None
+    match = REGEX_PRECO.search(texto)
+    return match.group(0) if match else None
+
+def extrair_loja_do_link(link):
+    """Identifica a loja a partir do domínio do link (desembrulhando redirecionamentos)"""
+    if not link:
+        return None
+    return resolver_link(link)["loja"]
+
+def extrair_nome_do_link(link):
+    """Tenta extrair o nome do produto a partir da URL"""
+    link = unquote(link)
+    for padrao in PADROES_NOME_URL:
+        match = padrao.search(link)
+        if match:
+            nome_url = match.group(1)
+            # Limpa e formata o nome
+            nome_url = nome_url.replace('-', ' ').replace('_', ' ')
+            nome_url = re.sub(r'%[0-9A-F]{2}', ' ', nome_url)  # Remove códigos URL
+            nome_url = ' '.join(nome_url.split())  # Remove espaços extras
+            
+            if len(nome_url) > 5:
+                return nome_url
+    return None
+
+def completar_produto(produto_info, texto_card=None):
+    """
+    Converte o preço para centavos e detecta parcelamento e preço anterior
+
+    Loja, link canônico e nome a partir da URL são resolvidos depois, para a
+    página inteira, por `finalizar_ofertas`.
+    """
+    produto_info.update(analisar_preco(produto_info.get("preco"), texto_card))
+    return produto_info
+
+def chave_oferta(oferta):
+    """Identifica uma oferta entre passadas de extração: link canônico ou nome e preço"""
+    if oferta.get("link"):
+        return oferta["link"]
+    return f"{oferta.get('nome')}|{oferta.get('preco')}"
+
+def finalizar_ofertas(produtos, url_base=URL_GOOGLE_SHOPPING):
+    """
+    Resolve os links de todas as ofertas de uma página de uma vez
+
+    Troca cada link pelo canônico (sem redirecionamento do Google nem
+    parâmetros de rastreamento), define a loja pelo registro de domínios,
+    preenche o nome a partir da URL quando faltar e descarta ofertas
+    repetidas (mesmo link canônico), mantendo a primeira posição.
+    """
+    resolvidos = processar_links([p.get("link") for p in produtos], url_base)
+    vistos = set()
+    finais = []
+    for produto, resolvido in zip(produtos, resolvidos):
+        if resolvido:
+            if resolvido["chave"] in vistos:
+                continue
+            vistos.add(resolvido["chave"])
+            if not produto.get("nome"):
+                produto["nome"] = extrair_nome_do_link(produto["link"]) or extrair_nome_do_link(resolvido["link"])
+            produto["link"] = resolvido["link"]
+            if resolvido["loja"]:
+                produto["loja"] = resolvido["loja"]
+        finais.append(produto)
+    return finais
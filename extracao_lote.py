@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+
+from extracao import (
+    SELETOR_PRODUTOS_AMPLO, FILTROS_INVALIDOS, completar_produto, finalizar_ofertas
+)
+from seletores import obter_registro_seletores
+
+# Script injetado uma única vez por página: percorre todos os cards no próprio
+# navegador e devolve um array JSON, evitando uma chamada WebDriver por seletor.
+# Reproduz a mesma cascata de extrair_info_produto_melhorado.
+SCRIPT_EXTRACAO_LOTE = r"""
+const [seletoresProdutos, seletorAmplo, seletoresNome, seletoresPreco, filtros, limite, apenasNovos] = arguments;
+const regexPreco = /R\$\s*[\d,.]+/;
+
+function nomeValido(texto) {
+    if (!texto || texto.length <= 5 || texto.startsWith('R$')) return false;
+    const lower = texto.toLowerCase();
+    return !filtros.some(f => lower.includes(f));
+}
+
+function consultar(raiz, seletor) {
+    try { return raiz.querySelectorAll(seletor); } catch (e) { return []; }
+}
+
+function findProductName(element) {
+    const nameElement = element.querySelector('span.pymv4e');
+    if (nameElement && nameElement.textContent) {
+        return nameElement.textContent.trim();
+    }
+    for (const span of element.querySelectorAll('span')) {
+        const text = span.textContent || span.innerText || '';
+        if (text.length > 10 &&
+            !text.includes('R$') &&
+            !text.includes('Custava') &&
+            !text.includes('De ') &&
+            !text.includes('Classificado') &&
+            !text.includes('estrelas')) {
+            return text.trim();
+        }
+    }
+    return null;
+}
+
+function extrairNome(card) {
+    for (const seletor of seletoresNome) {
+        for (const el of consultar(card, seletor)) {
+            const textos = [
+                (el.innerText || '').trim(),
+                el.textContent,
+                el.innerText,
+                el.getAttribute('title'),
+                el.getAttribute('aria-label')
+            ];
+            for (const texto of textos) {
+                if (nomeValido(texto)) return texto;
+            }
+        }
+    }
+
+    // Mesmo fallback JavaScript da extração por elemento
+    const nomeJs = findProductName(card);
+    if (nomeJs && nomeJs.length > 5) return nomeJs;
+
+    // Analisa todo o texto do card linha a linha
+    const linhas = (card.innerText || '').split('\n').map(l => l.trim()).filter(l => l);
+    for (const linha of linhas) {
+        const lower = linha.toLowerCase();
+        if (linha.length > 8 && !linha.startsWith('R$') &&
+            !lower.includes('custava') && !lower.includes('reais') && !/^\d+$/.test(linha)) {
+            return linha;
+        }
+    }
+    return null;
+}
+
+function extrairPreco(card) {
+    for (const seletor of seletoresPreco) {
+        for (const el of consultar(card, seletor)) {
+            const textos = [
+                (el.innerText || '').trim(),
+                el.textContent,
+                el.innerText,
+                el.getAttribute('aria-label'),
+                el.getAttribute('title')
+            ];
+            for (const texto of textos) {
+                if (texto && texto.includes('R$')) {
+                    const match = texto.match(regexPreco);
+                    if (match) return match[0];
+                }
+            }
+        }
+    }
+    for (const el of card.querySelectorAll('*')) {
+        const text = el.textContent || el.innerText || '';
+        const match = text.includes('R$') && text.match(regexPreco);
+        if (match) return match[0].trim();
+    }
+    return null;
+}
+
+function extrairLink(card) {
+    const a = card.tagName === 'A' ? card : card.querySelector('a[href]');
+    return a ? a.href || a.getAttribute('href') : null;
+}
+
+let cards = [];
+let seletorUsado = null;
+for (const seletor of seletoresProdutos) {
+    const encontrados = consultar(document, seletor);
+    if (encontrados.length) {
+        cards = Array.from(encontrados);
+        seletorUsado = seletor;
+        break;
+    }
+}
+if (!cards.length) {
+    cards = Array.from(consultar(document, seletorAmplo));
+}
+
+if (apenasNovos) {
+    // Rolagem profunda: cada card é extraído uma única vez entre as passadas
+    cards = cards.filter(card => !card.hasAttribute('data-meiu-visto'));
+}
+const selecionados = cards.slice(0, limite);
+if (apenasNovos) {
+    selecionados.forEach(card => card.setAttribute('data-meiu-visto', '1'));
+}
+
+const produtos = selecionados.map(card => {
+    try {
+        return {
+            nome: extrairNome(card), preco: extrairPreco(card), loja: null, link: extrairLink(card),
+            texto: card.innerText || ''
+        };
+    } catch (e) {
+        return null;
+    }
+});
+
+return JSON.stringify({seletor: seletorUsado, total: cards.length, produtos: produtos});
+"""
+
+
+def extrair_produtos_lote(driver, limite=20, apenas_novos=False):
+    """
+    Extrai nome, preço, loja e link de todos os cards em um único execute_script
+
+    Retorna a lista no mesmo formato de `produtos_patrocinados`. Links, loja e
+    nome a partir da URL são resolvidos em Python, para a página inteira, com
+    as mesmas regras da extração por elemento.
+
+    Com `apenas_novos=True` os cards extraídos são marcados na página e as
+    chamadas seguintes só devolvem cards que ainda não foram vistos (usado
+    entre as passadas de rolagem da busca profunda).
+    """
+    # Mesma ordem adaptativa das cascatas usada pela extração por elemento
+    registro = obter_registro_seletores()
+    bruto = driver.execute_script(
+        SCRIPT_EXTRACAO_LOTE,
+        registro.ordem("produtos"),
+        SELETOR_PRODUTOS_AMPLO,
+        registro.ordem("nome"),
+        registro.ordem("preco"),
+        FILTROS_INVALIDOS,
+        limite,
+        apenas_novos
+    )
+    dados = json.loads(bruto) if bruto else {"produtos": []}
+
+    if dados.get("seletor"):
+        print(f" Lote: {dados.get('total', 0)} elementos com seletor: {dados['seletor']}")
+
+    produtos = []
+    for item in dados.get("produtos", []):
+        if not item:
+            continue
+        texto_card = item.pop("texto", None)
+        produto_info = completar_produto(item, texto_card)
+        if any(produto_info.values()):
+            produtos.append(produto_info)
+    return finalizar_ofertas(produtos)
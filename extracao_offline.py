@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Extração offline a partir de um snapshot de `driver.page_source`
+
+Todo o parsing acontece no próprio processo, sem chamadas ao WebDriver, com os
+mesmos seletores e fallbacks de extrair_info_produto_melhorado e
+extrair_produtos_generico. Permite reprocessar páginas HTML salvas quando o
+Google muda a estrutura, sem precisar buscar de novo.
+"""
+
+import json
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+from extracao import (
+    SELETORES_PRODUTOS, SELETOR_PRODUTOS_AMPLO, SELETORES_NOME, SELETORES_PRECO,
+    SELETORES_PRODUTOS_GENERICO, nome_valido, extrair_preco_texto, completar_produto,
+    finalizar_ofertas
+)
+from ofertas import serializar_resultado, desserializar_resultado
+from precos import analisar_preco
+
+URL_BASE_PADRAO = "https://www.google.com/"
+
+ELEMENTOS_VAZIOS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr"
+}
+
+ELEMENTOS_BLOCO = {
+    "address", "article", "aside", "blockquote", "dd", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3",
+    "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre",
+    "section", "table", "tr", "ul"
+}
+
+ELEMENTOS_SEM_TEXTO = {"script", "style", "noscript", "template"}
+
+
+class No:
+    """Elemento do HTML analisado"""
+
+    __slots__ = ("tag", "attrs", "filhos", "pai")
+
+    def __init__(self, tag, attrs=None, pai=None):
+        self.tag = tag
+        self.attrs = attrs or {}
+        self.filhos = []
+        self.pai = pai
+
+    def get(self, nome):
+        return self.attrs.get(nome)
+
+    def classes(self):
+        return (self.attrs.get("class") or "").split()
+
+    def descendentes(self):
+        """Percorre os elementos descendentes em ordem de documento"""
+        pilha = [f for f in reversed(self.filhos) if isinstance(f, No)]
+        while pilha:
+            no = pilha.pop()
+            yield no
+            pilha.extend(f for f in reversed(no.filhos) if isinstance(f, No))
+
+    def text_content(self):
+        """Equivalente a element.textContent"""
+        partes = []
+        pilha = [self]
+        while pilha:
+            atual = pilha.pop()
+            if isinstance(atual, str):
+                partes.append(atual)
+            else:
+                pilha.extend(reversed(atual.filhos))
+        return "".join(partes)
+
+    def inner_text(self):
+        """Aproximação de element.innerText (quebra de linha em blocos e <br>)"""
+        partes = []
+
+        def visitar(no):
+            for filho in no.filhos:
+                if isinstance(filho, str):
+                    partes.append(re.sub(r"\s+", " ", filho))
+                elif filho.tag == "br":
+                    partes.append("\n")
+                elif filho.tag not in ELEMENTOS_SEM_TEXTO:
+                    bloco = filho.tag in ELEMENTOS_BLOCO
+                    if bloco:
+                        partes.append("\n")
+                    visitar(filho)
+                    if bloco:
+                        partes.append("\n")
+
+        visitar(self)
+        linhas = [linha.strip() for linha in "".join(partes).split("\n")]
+        return "\n".join(linha for linha in linhas if linha)
+
+
+class ConstrutorArvore(HTMLParser):
+    """Monta a árvore de nós a partir do HTML bruto"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.raiz = No("#document")
+        self.atual = self.raiz
+
+    def handle_starttag(self, tag, attrs):
+        no = No(tag, {nome: (valor if valor is not None else "") for nome, valor in attrs}, self.atual)
+        self.atual.filhos.append(no)
+        if tag not in ELEMENTOS_VAZIOS:
+            self.atual = no
+
+    def handle_startendtag(self, tag, attrs):
+        no = No(tag, {nome: (valor if valor is not None else "") for nome, valor in attrs}, self.atual)
+        self.atual.filhos.append(no)
+
+    def handle_endtag(self, tag):
+        # Sobe até o elemento correspondente, tolerando HTML malformado
+        no = self.atual
+        while no is not None and no.tag != tag:
+            no = no.pai
+        if no is not None and no.pai is not None:
+            self.atual = no.pai
+
+    def handle_data(self, data):
+        self.atual.filhos.append(data)
+
+
+def analisar_html(html):
+    """Converte o HTML em uma árvore de nós"""
+    construtor = ConstrutorArvore()
+    construtor.feed(html)
+    construtor.close()
+    return construtor.raiz
+
+
+# Subconjunto de CSS usado pelos seletores do projeto: tag, *, #id, .classe,
+# [attr], [attr='v'], [attr^='v'], [attr*='v'], [attr$='v'], descendente e vírgula
+_REGEX_TAG = re.compile(r"^(\*|[a-zA-Z][\w-]*)")
+_REGEX_PARTE = re.compile(
+    r"""\#([\w-]+)|\.([\w-]+)|\[\s*([\w-]+)\s*(?:([*^$~|]?=)\s*(?:'([^']*)'|"([^"]*)"|([^\]\s]+)))?\s*\]"""
+)
+
+
+def _compilar_composto(texto):
+    tag = None
+    match = _REGEX_TAG.match(texto)
+    pos = 0
+    if match:
+        tag = None if match.group(1) == "*" else match.group(1).lower()
+        pos = match.end()
+
+    condicoes = []
+    while pos < len(texto):
+        match = _REGEX_PARTE.match(texto, pos)
+        if not match:
+            raise ValueError(f"Seletor não suportado: {texto}")
+        if match.group(1):
+            condicoes.append(("id", match.group(1)))
+        elif match.group(2):
+            condicoes.append(("classe", match.group(2)))
+        else:
+            valor = next((g for g in match.group(5, 6, 7) if g is not None), None)
+            condicoes.append(("attr", match.group(3).lower(), match.group(4), valor))
+        pos = match.end()
+    return tag, condicoes
+
+
+def _casa_composto(no, composto):
+    tag, condicoes = composto
+    if tag and no.tag != tag:
+        return False
+    for condicao in condicoes:
+        if condicao[0] == "id":
+            if no.get("id") != condicao[1]:
+                return False
+        elif condicao[0] == "classe":
+            if condicao[1] not in no.classes():
+                return False
+        else:
+            _, nome, operador, valor = condicao
+            atual = no.get(nome)
+            if atual is None:
+                return False
+            if operador is None:
+                continue
+            if operador == "=" and atual != valor:
+                return False
+            if operador == "^=" and not (valor and atual.startswith(valor)):
+                return False
+            if operador == "*=" and not (valor and valor in atual):
+                return False
+            if operador == "$=" and not (valor and atual.endswith(valor)):
+                return False
+            if operador == "~=" and valor not in atual.split():
+                return False
+            if operador == "|=" and not (atual == valor or atual.startswith(valor + "-")):
+                return False
+    return True
+
+
+_cache_seletores = {}
+
+
+def compilar_seletor(seletor):
+    """Compila um seletor CSS em listas de compostos (uma por grupo da vírgula)"""
+    if seletor not in _cache_seletores:
+        grupos = []
+        for grupo in seletor.split(","):
+            grupos.append([_compilar_composto(parte) for parte in grupo.split()])
+        _cache_seletores[seletor] = grupos
+    return _cache_seletores[seletor]
+
+
+def _casa_grupo(no, compostos):
+    if not _casa_composto(no, compostos[-1]):
+        return False
+    indice = len(compostos) - 2
+    ancestral = no.pai
+    while indice >= 0 and ancestral is not None:
+        if ancestral.tag != "#document" and _casa_composto(ancestral, compostos[indice]):
+            indice -= 1
+        ancestral = ancestral.pai
+    return indice < 0
+
+
+def selecionar(raiz, seletor):
+    """Equivalente a raiz.querySelectorAll(seletor)"""
+    grupos = compilar_seletor(seletor)
+    return [no for no in raiz.descendentes() if any(_casa_grupo(no, g) for g in grupos)]
+
+
+def selecionar_um(raiz, seletor):
+    """Equivalente a raiz.querySelector(seletor)"""
+    grupos = compilar_seletor(seletor)
+    for no in raiz.descendentes():
+        if any(_casa_grupo(no, g) for g in grupos):
+            return no
+    return None
+
+
+def _href_absoluto(no, url_base):
+    href = no.get("href")
+    return urljoin(url_base, href) if href else href
+
+
+def extrair_info_produto_html(elemento, url_base=URL_BASE_PADRAO):
+    """Versão offline de extrair_info_produto_melhorado para um nó já analisado"""
+    produto_info = {
+        "nome": None,
+        "preco": None,
+        "loja": None,
+        "link": None
+    }
+
+    # Extração do nome com a mesma cascata de seletores
+    for seletor in SELETORES_NOME:
+        for elem in selecionar(elemento, seletor):
+            textos_possiveis = [
+                elem.inner_text().strip(),
+                elem.text_content(),
+                elem.inner_text(),
+                elem.get("title"),
+                elem.get("aria-label")
+            ]
+            for texto in textos_possiveis:
+                if nome_valido(texto):
+                    produto_info["nome"] = texto
+                    break
+            if produto_info["nome"]:
+                break
+        if produto_info["nome"]:
+            break
+
+    # Mesmo fallback do script JavaScript da versão online
+    if not produto_info["nome"]:
+        nome_js = None
+        elem_nome = selecionar_um(elemento, "span.pymv4e")
+        if elem_nome and elem_nome.text_content():
+            nome_js = elem_nome.text_content().strip()
+        else:
+            for span in selecionar(elemento, "span"):
+                texto = span.text_content()
+                if (len(texto) > 10 and 'R$' not in texto and 'Custava' not in texto and
+                        'De ' not in texto and 'Classificado' not in texto and 'estrelas' not in texto):
+                    nome_js = texto.strip()
+                    break
+        if nome_js and len(nome_js) > 5:
+            produto_info["nome"] = nome_js
+
+    # Analisa todo o texto do elemento
+    if not produto_info["nome"]:
+        for linha in elemento.inner_text().split('\n'):
+            linha = linha.strip()
+            if (len(linha) > 8 and
+                not linha.startswith('R$') and
+                'custava' not in linha.lower() and
+                'reais' not in linha.lower() and
+                not linha.isdigit()):
+                produto_info["nome"] = linha
+                break
+
+    # Extração do preço
+    for seletor in SELETORES_PRECO:
+        for elem in selecionar(elemento, seletor):
+            textos_possiveis = [
+                elem.inner_text().strip(),
+                elem.text_content(),
+                elem.inner_text(),
+                elem.get("aria-label"),
+                elem.get("title")
+            ]
+            for texto in textos_possiveis:
+                preco = extrair_preco_texto(texto)
+                if preco:
+                    produto_info["preco"] = preco
+                    break
+            if produto_info["preco"]:
+                break
+        if produto_info["preco"]:
+            break
+
+    if not produto_info["preco"]:
+        for elem in elemento.descendentes():
+            preco = extrair_preco_texto(elem.text_content())
+            if preco:
+                produto_info["preco"] = preco.strip()
+                break
+
+    # Link e loja
+    link_elem = elemento if elemento.tag == "a" else selecionar_um(elemento, "a[href]")
+    if link_elem is not None:
+        produto_info["link"] = _href_absoluto(link_elem, url_base)
+
+    return completar_produto(produto_info, elemento.inner_text())
+
+
+def extrair_produtos_generico_html(raiz, url_base=URL_BASE_PADRAO):
+    """Versão offline de extrair_produtos_generico"""
+    produtos = []
+    for seletor in SELETORES_PRODUTOS_GENERICO:
+        elementos = selecionar(raiz, seletor)
+        if not elementos:
+            continue
+
+        for elem in elementos[:10]:
+            produto = {
+                "nome": None,
+                "preco": None,
+                "loja": None,
+                "link": None
+            }
+
+            nome = selecionar_um(elem, "h3, [role='link'], .sh-dlr__list-result-title")
+            if nome is not None:
+                produto["nome"] = nome.inner_text().strip()
+
+            preco = selecionar_um(elem, "[aria-label*='R$'], .a-price, .sh-dlr__list-result-price")
+            if preco is not None:
+                produto["preco"] = preco.inner_text().strip() or preco.get("aria-label")
+
+            loja = selecionar_um(elem, ".sh-dlr__list-result-merchant, [data-test-id='merchant-name']")
+            if loja is not None:
+                produto["loja"] = loja.inner_text().strip()
+
+            link = selecionar_um(elem, "a[href]")
+            if link is not None:
+                produto["link"] = _href_absoluto(link, url_base)
+
+            if any(produto.values()):
+                produto.update(analisar_preco(produto["preco"]))
+                produtos.append(produto)
+
+        if produtos:
+            break
+    return produtos
+
+
+def extrair_produtos_html(html, limite=20, url_base=URL_BASE_PADRAO):
+    """
+    Extrai a lista `produtos_patrocinados` a partir do HTML bruto da página
+
+    Usa os mesmos seletores de cards da busca online e, se nada for
+    encontrado, recorre à extração genérica.
+    """
+    raiz = analisar_html(html)
+    # Links relativos seguem o <base href> da página, como no navegador
+    base = selecionar_um(raiz, "base[href]")
+    if base is not None:
+        url_base = urljoin(url_base, base.get("href"))
+
+    cards = []
+    for seletor in SELETORES_PRODUTOS:
+        cards = selecionar(raiz, seletor)
+        if cards:
+            break
+    if not cards:
+        cards = selecionar(raiz, SELETOR_PRODUTOS_AMPLO)
+
+    produtos = []
+    for i, card in enumerate(cards[:limite]):
+        try:
+            produto_info = extrair_info_produto_html(card, url_base)
+            if any(produto_info.values()):
+                produtos.append(produto_info)
+        except Exception as e:
+            print(f"Erro ao processar elemento {i}: {e}")
+
+    if not produtos:
+        produtos = extrair_produtos_generico_html(raiz, url_base)
+    return finalizar_ofertas(produtos, url_base)
+
+
+def resultado_de_html(produto, html, timestamp=None, limite=20):
+    """Monta o dicionário de resultados de uma busca a partir do HTML salvo"""
+    return {
+        "produto_buscado": produto,
+        "timestamp": timestamp or time.strftime("%Y-%m-%d %H:%M:%S"),
+        "produtos_patrocinados": extrair_produtos_html(html, limite=limite)
+    }
+
+
+def _analisar_pagina(args):
+    produto, html = args
+    # O resultado volta ao processo principal no formato binário compacto
+    return serializar_resultado(resultado_de_html(produto, html))
+
+
+def analisar_paginas(paginas, max_workers=None):
+    """
+    Analisa várias páginas em paralelo em um pool de processos
+
+    `paginas` é uma lista de tuplas (produto, html); o retorno segue a mesma ordem.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return [desserializar_resultado(dados) for dados in executor.map(_analisar_pagina, paginas)]
+
+
+if __name__ == "__main__":
+    # Reprocessa páginas salvas: python extracao_offline.py pagina1.html [pagina2.html ...]
+    for caminho in sys.argv[1:]:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            produtos = extrair_produtos_html(f.read())
+        print(json.dumps({"arquivo": caminho, "produtos_patrocinados": produtos}, indent=2, ensure_ascii=False))
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Fila de buscas em segundo plano para o app Flask
+
+Cada envio do formulário vira um job com ID próprio. Os jobs rodam em um
+pool de threads de longa duração que compartilha um buscador aquecido
+(pool de navegadores e conexões HTTP), e o progresso de cada produto fica
+disponível para consulta ou streaming enquanto a busca acontece.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from multi_buscador import MultiBuscador
+from cache_resultados import obter_cache
+
+MAX_JOBS_SIMULTANEOS = int(os.environ.get("MEIU_MAX_JOBS", "2"))
+MAX_THREADS_POR_JOB = int(os.environ.get("MEIU_THREADS_POR_JOB", "3"))
+MAX_JOBS_RETIDOS = 200
+
+
+class Job:
+    """Estado de uma busca enviada pelo usuário"""
+
+    def __init__(self, produtos, forcar_atualizacao=False):
+        self.id = uuid.uuid4().hex
+        # Repetidos são buscados uma vez só; o total do progresso acompanha
+        self.produtos = list(dict.fromkeys(produtos))
+        self.forcar_atualizacao = forcar_atualizacao
+        self.status = "pendente"
+        self.criado_em = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.resultados = {}
+        self.ofertas_parciais = {}
+        self.relatorio = None
+        self.erro = None
+        self.eventos = []
+        self._condicao = threading.Condition()
+
+    def registrar_evento(self, tipo, **dados):
+        with self._condicao:
+            evento = dict(dados, tipo=tipo, id=len(self.eventos))
+            self.eventos.append(evento)
+            self._condicao.notify_all()
+
+    def finalizar(self, status, tipo, **dados):
+        """Registra o evento final e só então muda o status, na mesma seção crítica"""
+        with self._condicao:
+            self.registrar_evento(tipo, **dados)
+            self.status = status
+
+    def aguardar_eventos(self, a_partir_de, timeout=15):
+        """Retorna os eventos a partir do índice informado, aguardando novos se necessário"""
+        with self._condicao:
+            if len(self.eventos) <= a_partir_de and self.status not in ("concluido", "erro"):
+                self._condicao.wait(timeout)
+            return self.eventos[a_partir_de:]
+
+    def finalizado(self):
+        return self.status in ("concluido", "erro")
+
+    def como_dict(self, incluir_resultados=True):
+        dados = {
+            "id": self.id,
+            "status": self.status,
+            "criado_em": self.criado_em,
+            "total": len(self.produtos),
+            "concluidos": len(self.resultados),
+            "relatorio": self.relatorio,
+            "erro": self.erro,
+        }
+        if incluir_resultados:
+            dados["resultados"] = self.resultados
+        return dados
+
+
+class FilaBuscas:
+    """Executa jobs de busca em segundo plano, isolados entre si"""
+
+    def __init__(self, max_jobs=MAX_JOBS_SIMULTANEOS, max_threads=MAX_THREADS_POR_JOB, diretorio=None,
+                 buscador=None):
+        self.max_jobs = max_jobs
+        self.max_threads = max_threads
+        self.diretorio = diretorio
+        self._buscador = buscador
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _obter_buscador(self):
+        """Buscador compartilhado criado na primeira execução e mantido aquecido"""
+        with self._lock:
+            if self._buscador is None:
+                from backends_busca import BuscadorBackends, BackendSelenium
+                from pool_drivers import PoolDrivers
+
+                # Os jobs simultâneos dividem o mesmo pool: uma sessão para cada thread de cada job
+                pool = PoolDrivers(tamanho=self.max_jobs * self.max_threads, aquecer=False)
+                self._buscador = BuscadorBackends(selenium=BackendSelenium(pool_drivers=pool), cache=obter_cache())
+            return self._buscador
+
+    def enviar(self, produtos, forcar_atualizacao=False):
+        """Cria um job e o coloca na fila, retornando imediatamente"""
+        job = Job(produtos, forcar_atualizacao)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > MAX_JOBS_RETIDOS:
+                self._jobs.popitem(last=False)
+        job.registrar_evento("enfileirado", total=len(job.produtos))
+        self._executor.submit(self._executar, job)
+        return job
+
+    def obter(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _executar(self, job):
+        job.status = "executando"
+        job.registrar_evento("iniciado", total=len(job.produtos))
+
+        def ao_concluir(produto, resultado):
+            job.resultados[produto] = resultado
+            job.registrar_evento(
+                "progresso",
+                produto=produto,
+                encontrados=len(resultado["produtos_patrocinados"]),
+                concluidos=len(job.resultados),
+                total=len(job.produtos),
+                resultado=resultado
+            )
+
+        def ao_ofertar(produto, oferta):
+            # Ofertas chegam enquanto a página ainda está sendo processada
+            with job._condicao:
+                job.ofertas_parciais[produto] = job.ofertas_parciais.get(produto, 0) + 1
+                encontradas = job.ofertas_parciais[produto]
+            job.registrar_evento("oferta", produto=produto, encontradas=encontradas, oferta=oferta)
+
+        try:
+            buscador = MultiBuscador(buscador=self._obter_buscador(), diretorio=self.diretorio,
+                                     forcar_atualizacao=job.forcar_atualizacao)
+            buscador.executar_buscas_simultaneas(job.produtos, max_threads=self.max_threads,
+                                                 ao_concluir=ao_concluir, ao_ofertar=ao_ofertar)
+            job.relatorio = os.path.basename(buscador.ultimo_relatorio)
+            job.finalizar("concluido", "fim", relatorio=job.relatorio)
+        except Exception as e:
+            print(f"Erro no job {job.id}: {e}")
+            job.erro = str(e)
+            job.finalizar("erro", "erro", erro=job.erro)
+
+
+_fila = None
+_lock_fila = threading.Lock()
+
+
+def obter_fila():
+    """Fila única do processo, criada sob demanda"""
+    global _fila
+    with _lock_fila:
+        if _fila is None:
+            _fila = FilaBuscas()
+        return _fila
@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Busca em várias fontes de preço com prazo único
+
+Cada fonte (Google Shopping, página de busca de uma loja) implementa a mesma
+interface: `consultar(produto)` retorna a lista de ofertas. BuscaMultiFonte
+consulta todas as fontes disponíveis ao mesmo tempo e, ao fim do prazo
+(MEIU_PRAZO_FONTES), devolve o que chegou, com cada oferta marcada com a
+fonte. Fontes lentas continuam em segundo plano: o resultado fica no cache da
+fonte para a próxima busca e `ao_concluir_tardio` é chamado quando chega.
+
+Cada fonte tem timeout, limite de consultas simultâneas e saúde próprios: após
+`limite_falhas` falhas seguidas (ou um bloqueio) ela fica suspensa por
+`pausa_falhas` segundos. A configuração vem de fontes.json (MEIU_ARQUIVO_FONTES);
+MEIU_FONTES restringe as fontes ativas (ex.: "google_shopping,kabum").
+
+Verificação com servidores locais que servem as páginas de fixtures/fontes:
+    python fontes.py verificar [--prazo 2] [--atraso-lento 4]
+    python fontes.py buscar "notebook" [--prazo 8]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as TempoEsgotado
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import quote, quote_plus, urlsplit, parse_qs
+
+from backends_busca import BackendHTTP, BuscadorBackends, PoolConexoes
+from cache_resultados import CacheResultados, obter_cache
+from extracao import completar_produto, finalizar_ofertas, LIMITE_OFERTAS
+from extracao_offline import analisar_html, selecionar, selecionar_um
+from instrumentacao import contar, contexto, span
+from precos import converter_centavos
+from tentativas import BLOQUEIO, TRANSITORIA, FalhaBusca, classificar_texto
+
+ARQUIVO_FONTES = os.environ.get(
+    "MEIU_ARQUIVO_FONTES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fontes.json"))
+DIRETORIO_FIXTURES_FONTES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "fontes")
+PRAZO_MULTIFONTE = float(os.environ.get("MEIU_PRAZO_FONTES", "8"))
+FONTES_ATIVAS = [f for f in os.environ.get("MEIU_FONTES", "").split(",") if f.strip()]
+TTL_FONTES = int(os.environ.get("MEIU_TTL_FONTES", "600"))
+
+
+class SaudeFonte:
+    """Falhas seguidas de uma fonte e suspensão temporária após o limite"""
+
+    def __init__(self, limite_falhas=3, pausa_falhas=600):
+        self.limite_falhas = limite_falhas
+        self.pausa_falhas = pausa_falhas
+        self.falhas_seguidas = 0
+        self.suspensa_ate = 0.0
+        self._lock = threading.Lock()
+        self.estatisticas = {"consultas": 0, "sucessos": 0, "falhas": 0, "suspensoes": 0, "tempo_total_s": 0.0}
+
+    def disponivel(self):
+        with self._lock:
+            return time.monotonic() >= self.suspensa_ate
+
+    def registrar(self, sucesso, duracao, tipo=None):
+        """Registra uma consulta; um bloqueio suspende a fonte na hora"""
+        with self._lock:
+            self.estatisticas["consultas"] += 1
+            self.estatisticas["tempo_total_s"] += duracao
+            if sucesso:
+                self.estatisticas["sucessos"] += 1
+                self.falhas_seguidas = 0
+                return
+            self.estatisticas["falhas"] += 1
+            self.falhas_seguidas += 1
+            if tipo == BLOQUEIO or self.falhas_seguidas >= self.limite_falhas:
+                self.suspensa_ate = time.monotonic() + self.pausa_falhas
+                self.estatisticas["suspensoes"] += 1
+                self.falhas_seguidas = 0
+
+    def relatorio(self):
+        with self._lock:
+            consultas = self.estatisticas["consultas"]
+            return dict(
+                self.estatisticas,
+                tempo_total_s=round(self.estatisticas["tempo_total_s"], 3),
+                latencia_media_s=round(self.estatisticas["tempo_total_s"] / consultas, 3) if consultas else 0.0,
+                falhas_seguidas=self.falhas_seguidas,
+                suspensa_por_s=round(max(0.0, self.suspensa_ate - time.monotonic()), 1),
+            )
+
+
+class Fonte:
+    """
+    Interface comum das fontes de preço
+
+    Subclasses implementam `consultar(produto)`, que retorna a lista de
+    ofertas no formato da extração (nome, preco, loja, link e campos
+    numéricos). `buscar` acrescenta o cache com single-flight, o limite de
+    consultas simultâneas e o registro de saúde.
+    """
+
+    tipo = None
+
+    def __init__(self, nome, timeout=10, max_concorrentes=2, limite_falhas=3, pausa_falhas=600, cache=None):
+        self.nome = nome
+        self.timeout = timeout
+        self.max_concorrentes = max_concorrentes
+        self.saude = SaudeFonte(limite_falhas, pausa_falhas)
+        self.cache = cache if cache is not None else CacheResultados(ttl=TTL_FONTES)
+        self._vagas = threading.BoundedSemaphore(max_concorrentes)
+
+    def consultar(self, produto):
+        raise NotImplementedError
+
+    def _consultar_medindo(self, produto):
+        inicio = time.time()
+        sucesso, tipo = False, None
+        try:
+            with self._vagas, span("busca_fonte", fonte=self.nome):
+                ofertas = self.consultar(produto)
+            sucesso = True
+        except FalhaBusca as e:
+            tipo = e.tipo
+            raise
+        finally:
+            duracao = time.time() - inicio
+            # Uma resposta depois do timeout da fonte conta como falha de saúde
+            self.saude.registrar(sucesso and duracao <= self.timeout, duracao, tipo)
+        return {
+            "produto_buscado": produto,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "produtos_patrocinados": ofertas,
+        }
+
+    def buscar(self, produto, forcar=False):
+        """Ofertas da fonte para o produto (do cache, se ainda válidas)"""
+        resultado = self.cache.obter_ou_buscar(produto, self._consultar_medindo, forcar=forcar)
+        return resultado["produtos_patrocinados"]
+
+    def relatorio(self):
+        return dict(self.saude.relatorio(), tipo=self.tipo, timeout=self.timeout,
+                    max_concorrentes=self.max_concorrentes, disponivel=self.saude.disponivel())
+
+    def fechar(self):
+        pass
+
+
+class FonteGoogleShopping(Fonte):
+    """Anúncios do Google Shopping pelos backends de coleta (HTTP/Selenium)"""
+
+    tipo = "google_shopping"
+
+    def __init__(self, nome="google_shopping", buscador=None, url_busca=None, modo=None, **opcoes):
+        # O cache compartilhado do processo evita repetir a busca feita pelo MultiBuscador
+        opcoes.setdefault("cache", obter_cache())
+        super().__init__(nome, **opcoes)
+        if buscador is None:
+            http = BackendHTTP(url_busca=url_busca) if url_busca else None
+            buscador = BuscadorBackends(modo=modo, http=http)
+        self.buscador = buscador
+
+    def consultar(self, produto):
+        return self.buscador.buscar(produto)["produtos_patrocinados"]
+
+    def fechar(self):
+        self.buscador.fechar()
+
+
+class FonteLojaHTML(Fonte):
+    """
+    Página de busca de uma loja, baixada por HTTP e lida pela extração offline
+
+    `url_busca` aceita {consulta} (espaços como "+") e {consulta_hifen}
+    ("notebook-gamer"); `seletores` traz card, nome, preco, link e,
+    opcionalmente, centavos (lojas que mostram os centavos à parte) e
+    preco_anterior (preço riscado). Os links são resolvidos contra `base`, a
+    origem real da loja.
+    """
+
+    tipo = "loja_html"
+
+    def __init__(self, nome, loja, url_busca, seletores, base=None, pool=None, limite=LIMITE_OFERTAS, **opcoes):
+        super().__init__(nome, **opcoes)
+        self.loja = loja
+        self.url_busca = url_busca
+        self.seletores = seletores
+        self.base = base or url_busca
+        self.limite = limite
+        self.pool = pool or PoolConexoes(max_por_host=self.max_concorrentes, timeout=self.timeout)
+
+    def url_para(self, produto):
+        termos = produto.strip()
+        return self.url_busca.format(consulta=quote_plus(termos),
+                                     consulta_hifen=quote("-".join(termos.lower().split())))
+
+    def consultar(self, produto):
+        with span("download_fonte", fonte=self.nome):
+            status, html = self.pool.get(self.url_para(produto))
+        if status == 429 or classificar_texto("", html) == BLOQUEIO:
+            raise FalhaBusca(BLOQUEIO, f"{self.loja}: bloqueio (HTTP {status})")
+        if status != 200:
+            raise FalhaBusca(TRANSITORIA, f"{self.loja}: HTTP {status}")
+        with span("extracao_estrategia", estrategia=self.nome):
+            return extrair_ofertas_loja(html, self.seletores, self.base, self.loja, self.limite)
+
+    def fechar(self):
+        self.pool.fechar()
+
+
+def _texto(no):
+    return " ".join(no.text_content().split()) if no is not None else None
+
+
+def _preco_do_card(card, seletor, seletor_centavos=None):
+    preco = _texto(selecionar_um(card, seletor))
+    if not preco:
+        return None
+    if "R$" not in preco:
+        preco = "R$ " + preco
+    if seletor_centavos and "," not in preco:
+        centavos = _texto(selecionar_um(card, seletor_centavos))
+        preco += "," + (centavos or "00")
+    return preco
+
+
+def extrair_ofertas_loja(html, seletores, base, loja=None, limite=LIMITE_OFERTAS):
+    """Ofertas da página de busca de uma loja a partir dos seletores configurados"""
+    raiz = analisar_html(html)
+    ofertas = []
+    for card in selecionar(raiz, seletores["card"])[:limite]:
+        nome = _texto(selecionar_um(card, seletores["nome"]))
+        preco = _preco_do_card(card, seletores["preco"], seletores.get("centavos"))
+        if not nome or not preco:
+            continue
+        # O próprio card pode ser o link (ex.: Pichau)
+        no_link = selecionar_um(card, seletores["link"]) or (card if card.get("href") else None)
+        oferta = completar_produto({
+            "nome": nome,
+            "preco": preco,
+            "loja": loja,
+            "link": no_link.get("href") if no_link is not None else None,
+        }, card.inner_text())
+        if seletores.get("preco_anterior") and "preco_anterior_centavos" not in oferta:
+            anterior = converter_centavos(_preco_do_card(card, seletores["preco_anterior"]))
+            if anterior and anterior != oferta["preco_centavos"]:
+                oferta["preco_anterior_centavos"] = anterior
+        ofertas.append(oferta)
+    return finalizar_ofertas(ofertas, base)
+
+
+TIPOS_FONTE = {
+    "google_shopping": FonteGoogleShopping,
+    "loja_html": FonteLojaHTML,
+}
+
+
+def criar_fonte(nome, config):
+    config = dict(config)
+    tipo = config.pop("tipo")
+    if tipo not in TIPOS_FONTE:
+        raise ValueError(f"Tipo de fonte desconhecido: {tipo}")
+    return TIPOS_FONTE[tipo](nome=nome, **config)
+
+
+def carregar_configuracao(caminho=ARQUIVO_FONTES, ativas=None):
+    with open(caminho, 'r', encoding='utf-8') as f:
+        configuracao = json.load(f)
+    ativas = ativas if ativas is not None else FONTES_ATIVAS
+    if ativas:
+        desconhecidas = set(ativas) - set(configuracao)
+        if desconhecidas:
+            raise ValueError(f"Fontes desconhecidas: {', '.join(sorted(desconhecidas))}")
+        configuracao = {nome: c for nome, c in configuracao.items() if nome in ativas}
+    return configuracao
+
+
+def carregar_fontes(caminho=ARQUIVO_FONTES, ativas=None):
+    """Fontes configuradas em fontes.json, na ordem do arquivo"""
+    return [criar_fonte(nome, config) for nome, config in carregar_configuracao(caminho, ativas).items()]
+
+
+class BuscaMultiFonte:
+    """
+    Consulta as fontes em paralelo e devolve o que chegou dentro do prazo
+
+    O status de cada fonte no resultado é "ok", "erro", "suspensa",
+    "timeout" (passou do timeout da própria fonte) ou "pendente" (o prazo da
+    busca acabou antes do timeout da fonte; a consulta segue em segundo plano).
+    """
+
+    def __init__(self, fontes, prazo=PRAZO_MULTIFONTE, ao_concluir_tardio=None):
+        self.fontes = list(fontes)
+        self.prazo = prazo
+        self.ao_concluir_tardio = ao_concluir_tardio
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, sum(f.max_concorrentes for f in self.fontes) * 2),
+            thread_name_prefix="fonte")
+
+    def _consultar(self, fonte, produto, contexto_busca):
+        with contexto(**contexto_busca):
+            return fonte.buscar(produto)
+
+    def _avisar_tardio(self, produto, fonte):
+        def concluido(futuro):
+            if futuro.exception() is not None:
+                print(f" Fonte {fonte.nome} falhou em segundo plano: {futuro.exception()}")
+                return
+            contar("meiu_fontes_tardias_total", fonte=fonte.nome)
+            if self.ao_concluir_tardio:
+                self.ao_concluir_tardio(produto, fonte.nome, futuro.result())
+        return concluido
+
+    def buscar(self, produto, prazo=None):
+        prazo = self.prazo if prazo is None else prazo
+        inicio = time.monotonic()
+        resultado = {
+            "produto_buscado": produto,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "fontes": {},
+            "produtos_patrocinados": [],
+        }
+        futuros = {}
+        for fonte in self.fontes:
+            if not fonte.saude.disponivel():
+                resultado["fontes"][fonte.nome] = {"status": "suspensa", "ofertas": 0, "tempo_s": 0.0}
+                continue
+            futuros[fonte.nome] = self._executor.submit(self._consultar, fonte, produto, {"produto": produto})
+
+        # As fontes com limite mais curto são conferidas primeiro
+        for fonte in sorted((f for f in self.fontes if f.nome in futuros), key=lambda f: min(prazo, f.timeout)):
+            futuro = futuros[fonte.nome]
+            limite = inicio + min(prazo, fonte.timeout)
+            try:
+                ofertas = futuro.result(timeout=max(0.0, limite - time.monotonic()))
+                status = "ok"
+            except TempoEsgotado:
+                ofertas = []
+                status = "timeout" if fonte.timeout <= prazo else "pendente"
+                futuro.add_done_callback(self._avisar_tardio(produto, fonte))
+            except Exception as e:
+                print(f" Fonte {fonte.nome} falhou: {e}")
+                ofertas = []
+                status = "erro"
+            contar("meiu_fontes_consultas_total", fonte=fonte.nome, status=status)
+            resultado["fontes"][fonte.nome] = {
+                "status": status, "ofertas": len(ofertas), "tempo_s": round(time.monotonic() - inicio, 3)}
+            resultado["produtos_patrocinados"].extend(dict(o, fonte=fonte.nome) for o in ofertas)
+
+        # Mantém a ordem de fontes.json no relatório
+        resultado["fontes"] = {f.nome: resultado["fontes"][f.nome] for f in self.fontes}
+        resultado["tempo_total_s"] = round(time.monotonic() - inicio, 3)
+        return resultado
+
+    def relatorio(self):
+        return {fonte.nome: fonte.relatorio() for fonte in self.fontes}
+
+    def fechar(self):
+        self._executor.shutdown(wait=False)
+        for fonte in self.fontes:
+            fonte.fechar()
+
+
+_busca_multifonte = None
+_lock_busca_multifonte = threading.Lock()
+
+
+def obter_busca_multifonte():
+    """Busca multifonte compartilhada do processo, com as fontes de fontes.json"""
+    global _busca_multifonte
+    with _lock_busca_multifonte:
+        if _busca_multifonte is None:
+            _busca_multifonte = BuscaMultiFonte(carregar_fontes())
+        return _busca_multifonte
+
+
+class ServidorFontes:
+    """
+    Servidor HTTP local que faz o papel de todas as fontes
+
+    `/<fonte>/...` devolve fixtures/fontes/<fonte>.html e
+    `/google_shopping/search?q=` a página do corpus do benchmark para a
+    consulta. `atrasos` ({fonte: segundos}) simula fontes lentas.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_FIXTURES_FONTES, corpus=None, atrasos=None):
+        from benchmark import URL_BASE_ORIGINAL, carregar_corpus
+
+        paginas = {}
+        for arquivo in os.listdir(diretorio):
+            if arquivo.endswith(".html"):
+                with open(os.path.join(diretorio, arquivo), 'rb') as f:
+                    paginas[arquivo[:-len(".html")]] = f.read()
+        base = f'<head><base href="{URL_BASE_ORIGINAL}">'
+        google = {p["consulta"]: p["html"].replace("<head>", base, 1).encode("utf-8")
+                  for p in (corpus if corpus is not None else carregar_corpus())}
+        atrasos = dict(atrasos or {})
+
+        class Manipulador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                partes = urlsplit(self.path)
+                fonte = partes.path.strip("/").split("/")[0]
+                if fonte == "google_shopping":
+                    corpo = google.get(parse_qs(partes.query).get("q", [""])[0])
+                else:
+                    corpo = paginas.get(fonte)
+                if atrasos.get(fonte):
+                    time.sleep(atrasos[fonte])
+                if corpo is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manipulador)
+        self.servidor.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.servidor.server_address[1]}"
+        self._thread = None
+
+    def configuracao_local(self, configuracao):
+        """Cópia da configuração com as URLs de busca apontando para este servidor"""
+        local = {}
+        for nome, config in configuracao.items():
+            config = dict(config)
+            if config["tipo"] == "google_shopping":
+                config.update(url_busca=f"{self.url}/google_shopping/search?q={{consulta}}", modo="http")
+            else:
+                partes = urlsplit(config["url_busca"])
+                caminho = partes.path + ("?" + partes.query if partes.query else "")
+                config["url_busca"] = f"{self.url}/{nome}{caminho}"
+            # Cache próprio: a verificação não deve ler nem gravar o cache do processo
+            config["cache"] = CacheResultados(ttl=TTL_FONTES)
+            local[nome] = config
+        return local
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+def verificar(prazo=2.0, atraso_lento=4.0, fonte_lenta="pichau", consulta="notebook"):
+    """
+    Busca nas fontes locais com uma fonte lenta e confere o resultado
+
+    As fontes rápidas devem voltar dentro do prazo com as ofertas de
+    fixtures/fontes/esperado.json; a lenta deve ficar "pendente" e ser
+    entregue depois por `ao_concluir_tardio`. Retorna a lista de problemas.
+    """
+    from benchmark import conferir_extracao
+
+    with open(os.path.join(DIRETORIO_FIXTURES_FONTES, "esperado.json"), 'r', encoding='utf-8') as f:
+        esperado = json.load(f)
+    problemas = []
+    tardias = {}
+    chegou = threading.Event()
+
+    def ao_concluir_tardio(produto, nome, ofertas):
+        tardias[nome] = ofertas
+        chegou.set()
+
+    configuracao = carregar_configuracao(ativas=[])
+    with ServidorFontes(atrasos={fonte_lenta: atraso_lento}) as servidor:
+        fontes = [criar_fonte(nome, dict(c, timeout=max(c["timeout"], atraso_lento * 2)))
+                  for nome, c in servidor.configuracao_local(configuracao).items()]
+        busca = BuscaMultiFonte(fontes, prazo=prazo, ao_concluir_tardio=ao_concluir_tardio)
+        try:
+            resultado = busca.buscar(consulta)
+            if resultado["tempo_total_s"] > prazo + 0.5:
+                problemas.append(f"busca levou {resultado['tempo_total_s']}s com prazo de {prazo}s")
+            for nome, situacao in resultado["fontes"].items():
+                print(f" {nome}: {situacao['status']}, {situacao['ofertas']} ofertas em {situacao['tempo_s']}s")
+                if nome == fonte_lenta:
+                    if situacao["status"] != "pendente":
+                        problemas.append(f"{nome}: status {situacao['status']}, esperado pendente")
+                    continue
+                if situacao["status"] != "ok":
+                    problemas.append(f"{nome}: status {situacao['status']}")
+                    continue
+                obtidas = [o for o in resultado["produtos_patrocinados"] if o["fonte"] == nome]
+                conferencia = conferir_extracao(obtidas, esperado[nome])
+                if conferencia["divergencias"] or conferencia["obtidas"] != conferencia["esperadas"]:
+                    problemas.append(f"{nome}: {json.dumps(conferencia, ensure_ascii=False)}")
+
+            if not chegou.wait(atraso_lento * 2):
+                problemas.append(f"{fonte_lenta}: resultado tardio não chegou")
+            else:
+                conferencia = conferir_extracao(tardias[fonte_lenta], esperado[fonte_lenta])
+                if conferencia["divergencias"]:
+                    problemas.append(f"{fonte_lenta} (tardia): {json.dumps(conferencia, ensure_ascii=False)}")
+                # Com o resultado tardio no cache, a busca seguinte tem todas as fontes
+                seguinte = busca.buscar(consulta)
+                if any(s["status"] != "ok" for s in seguinte["fontes"].values()):
+                    problemas.append(f"busca seguinte incompleta: {seguinte['fontes']}")
+        finally:
+            busca.fechar()
+    return problemas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Busca em várias fontes de preço com prazo único")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+    p_verificar = subcomandos.add_parser("verificar", help="confere as fontes contra servidores locais")
+    p_verificar.add_argument("--prazo", type=float, default=2.0)
+    p_verificar.add_argument("--atraso-lento", type=float, default=4.0)
+    p_buscar = subcomandos.add_parser("buscar", help="busca um produto nas fontes configuradas")
+    p_buscar.add_argument("produto")
+    p_buscar.add_argument("--prazo", type=float, default=PRAZO_MULTIFONTE)
+    args = parser.parse_args()
+
+    if args.comando == "verificar":
+        problemas = verificar(prazo=args.prazo, atraso_lento=args.atraso_lento)
+        for problema in problemas:
+            print(f"❌ {problema}")
+        print("✅ Fontes conferidas" if not problemas else f" {len(problemas)} problema(s)")
+        sys.exit(1 if problemas else 0)
+
+    busca = obter_busca_multifonte()
+    resultado = busca.buscar(args.produto, prazo=args.prazo)
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    busca.fechar()
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Histórico de preços persistente em SQLite
+
+Substitui os arquivos JSON por busca: cada execução grava buscas, ofertas e
+lojas em tabelas normalizadas (modo WAL, inserções em lote dentro de uma
+transação) e os relatórios ficam consultáveis sem abrir arquivos.
+
+Uso para importar relatórios antigos:
+    python historico.py importar [diretorio]
+"""
+
+import glob
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from precos import converter_centavos
+from relatorio_incremental import carregar_relatorio_arquivo
+
+# Diretório de dados configurável (banco e demais arquivos gerados)
+DATA_DIR = os.environ.get(
+    "MEIU_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados")
+)
+ARQUIVO_BANCO = "historico_precos.db"
+PADROES_RELATORIOS = ("relatorio_buscas_*.json", "relatorio_buscas_*.jsonl", "relatorio_buscas_*.jsonl.gz")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS produtos (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS lojas (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS relatorios (
+    nome TEXT PRIMARY KEY,
+    inicio TEXT,
+    fim TEXT,
+    tempo_total_minutos REAL,
+    total_produtos_buscados INTEGER,
+    buscas_sucessos INTEGER,
+    total_produtos_encontrados INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS buscas (
+    id INTEGER PRIMARY KEY,
+    produto_id INTEGER NOT NULL REFERENCES produtos(id),
+    relatorio TEXT REFERENCES relatorios(nome),
+    timestamp TEXT NOT NULL,
+    backend TEXT,
+    extra TEXT
+);
+
+CREATE TABLE IF NOT EXISTS ofertas (
+    id INTEGER PRIMARY KEY,
+    busca_id INTEGER NOT NULL REFERENCES buscas(id) ON DELETE CASCADE,
+    produto_id INTEGER NOT NULL REFERENCES produtos(id),
+    loja_id INTEGER REFERENCES lojas(id),
+    posicao INTEGER NOT NULL,
+    nome TEXT,
+    preco TEXT,
+    link TEXT,
+    timestamp TEXT NOT NULL,
+    preco_centavos INTEGER,
+    parcelas INTEGER,
+    valor_parcela_centavos INTEGER,
+    preco_anterior_centavos INTEGER,
+    do_cache INTEGER
+);
+
+-- Contadores do banco; "remocoes" muda sempre que buscas gravadas são apagadas
+CREATE TABLE IF NOT EXISTS contadores (
+    nome TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_ofertas_produto_loja_data ON ofertas (produto_id, loja_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_ofertas_busca ON ofertas (busca_id);
+CREATE INDEX IF NOT EXISTS idx_buscas_relatorio ON buscas (relatorio);
+CREATE INDEX IF NOT EXISTS idx_buscas_produto_data ON buscas (produto_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_relatorios_inicio ON relatorios (inicio);
+"""
+
+# Colunas adicionadas depois da primeira versão do esquema
+COLUNAS_OFERTAS_NOVAS = {
+    "preco_centavos": "INTEGER",
+    "parcelas": "INTEGER",
+    "valor_parcela_centavos": "INTEGER",
+    "preco_anterior_centavos": "INTEGER",
+    "do_cache": "INTEGER",
+}
+
+# Chaves do resultado que já têm coluna própria; o restante vai para `extra`
+CHAVES_BUSCA = {"produto_buscado", "timestamp", "produtos_patrocinados", "backend"}
+CHAVES_OFERTA = ("nome", "preco", "loja", "link")
+CHAVES_NUMERICAS = ("preco_centavos", "parcelas", "valor_parcela_centavos", "preco_anterior_centavos")
+
+# Ordenações aceitas para as ofertas de um relatório (nulos sempre ao final)
+ORDENACOES_OFERTAS = {
+    "posicao": "o.posicao",
+    "preco": "o.preco_centavos",
+    "loja": "l.nome COLLATE NOCASE",
+    "nome": "o.nome COLLATE NOCASE",
+}
+
+
+def _limites_pagina(total, pagina, por_pagina):
+    """(pagina, paginas, deslocamento) com a página limitada ao intervalo válido"""
+    por_pagina = max(1, por_pagina)
+    paginas = max(1, -(-total // por_pagina))
+    pagina = min(max(1, pagina), paginas)
+    return pagina, paginas, (pagina - 1) * por_pagina
+
+
+class HistoricoPrecos:
+    """Acesso ao banco de histórico; seguro para uso entre threads"""
+
+    def __init__(self, caminho=None):
+        if caminho is None:
+            os.makedirs(DATA_DIR, exist_ok=True)
+            caminho = os.path.join(DATA_DIR, ARQUIVO_BANCO)
+        self.caminho = caminho
+        self._lock = threading.RLock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.row_factory = sqlite3.Row
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.execute("PRAGMA foreign_keys=ON")
+        self._migrar()
+        self._ids_produtos = {}
+        self._ids_lojas = {}
+
+    def _migrar(self):
+        """Cria o esquema e adiciona colunas novas em bancos antigos"""
+        existentes = {linha[1] for linha in self._conexao.execute("PRAGMA table_info(ofertas)")}
+        if existentes:
+            for coluna, tipo in COLUNAS_OFERTAS_NOVAS.items():
+                if coluna not in existentes:
+                    self._conexao.execute(f"ALTER TABLE ofertas ADD COLUMN {coluna} {tipo}")
+            if "do_cache" not in existentes:
+                # Acertos de cache gravados antes da coluna existir ficam com a marca no `extra`
+                self._conexao.execute(
+                    "UPDATE ofertas SET do_cache = 1 WHERE busca_id IN "
+                    "(SELECT id FROM buscas WHERE extra LIKE '%\"origem_cache\"%')"
+                )
+        self._conexao.executescript(ESQUEMA)
+
+    def fechar(self):
+        with self._lock:
+            self._conexao.close()
+
+    def _id(self, tabela, cache, nome):
+        if nome is None:
+            return None
+        if nome not in cache:
+            cursor = self._conexao.execute(f"SELECT id FROM {tabela} WHERE nome = ?", (nome,))
+            linha = cursor.fetchone()
+            if linha is None:
+                cursor = self._conexao.execute(f"INSERT INTO {tabela} (nome) VALUES (?)", (nome,))
+                cache[nome] = cursor.lastrowid
+            else:
+                cache[nome] = linha[0]
+        return cache[nome]
+
+    def _inserir_busca(self, resultado, relatorio=None):
+        produto_id = self._id("produtos", self._ids_produtos, resultado["produto_buscado"])
+        timestamp = resultado.get("timestamp") or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        extra = {k: v for k, v in resultado.items() if k not in CHAVES_BUSCA}
+        # Acerto de cache: as mesmas ofertas já foram gravadas pela busca original
+        do_cache = 1 if resultado.get("do_cache") or resultado.get("origem_cache") else None
+
+        cursor = self._conexao.execute(
+            "INSERT INTO buscas (produto_id, relatorio, timestamp, backend, extra) VALUES (?, ?, ?, ?, ?)",
+            (produto_id, relatorio, timestamp, resultado.get("backend"),
+             json.dumps(extra, ensure_ascii=False) if extra else None)
+        )
+        busca_id = cursor.lastrowid
+
+        linhas = []
+        for posicao, oferta in enumerate(resultado.get("produtos_patrocinados", [])):
+            # Relatórios antigos não têm o preço numérico; converte na gravação
+            preco_centavos = oferta.get("preco_centavos")
+            if preco_centavos is None:
+                preco_centavos = converter_centavos(oferta.get("preco"))
+            linhas.append((
+                busca_id, produto_id, self._id("lojas", self._ids_lojas, oferta.get("loja")),
+                posicao, oferta.get("nome"), oferta.get("preco"), oferta.get("link"), timestamp,
+                preco_centavos, oferta.get("parcelas"), oferta.get("valor_parcela_centavos"),
+                oferta.get("preco_anterior_centavos"), do_cache
+            ))
+        self._conexao.executemany(
+            "INSERT INTO ofertas (busca_id, produto_id, loja_id, posicao, nome, preco, link, timestamp, "
+            "preco_centavos, parcelas, valor_parcela_centavos, preco_anterior_centavos, do_cache) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            linhas
+        )
+        return busca_id
+
+    def _descartar_cache(self):
+        # Após um rollback os IDs em cache podem não existir mais no banco
+        self._ids_produtos.clear()
+        self._ids_lojas.clear()
+
+    def salvar_buscas(self, resultados, relatorio=None):
+        """Grava várias buscas (dicionários de buscar_produtos_patrocinados) em uma transação"""
+        with self._lock:
+            try:
+                with self._conexao:
+                    return [self._inserir_busca(r, relatorio) for r in resultados]
+            except Exception:
+                self._descartar_cache()
+                raise
+
+    def registrar_relatorio(self, nome, relatorio):
+        """Grava o resumo e todas as buscas de um relatório em uma única transação"""
+        resumo = relatorio.get("resumo", {})
+        with self._lock:
+            try:
+                with self._conexao:
+                    removidas = self._conexao.execute("DELETE FROM buscas WHERE relatorio = ?", (nome,)).rowcount
+                    if removidas:
+                        # Ofertas regravadas ganham IDs novos; quem lê por ID precisa recomeçar
+                        self._conexao.execute(
+                            "INSERT INTO contadores (nome, valor) VALUES ('remocoes', 1) "
+                            "ON CONFLICT(nome) DO UPDATE SET valor = valor + 1"
+                        )
+                    self._conexao.execute(
+                        "INSERT OR REPLACE INTO relatorios (nome, inicio, fim, tempo_total_minutos, "
+                        "total_produtos_buscados, buscas_sucessos, total_produtos_encontrados) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (nome, resumo.get("inicio"), resumo.get("fim"), resumo.get("tempo_total_minutos"),
+                         resumo.get("total_produtos_buscados"), resumo.get("buscas_sucessos"),
+                         resumo.get("total_produtos_encontrados"))
+                    )
+                    for resultado in relatorio.get("resultados_detalhados", {}).values():
+                        self._inserir_busca(resultado, nome)
+            except Exception:
+                self._descartar_cache()
+                raise
+
+    def remocoes(self):
+        """Quantas vezes buscas gravadas foram apagadas (muda quando um relatório é regravado)"""
+        with self._lock:
+            linha = self._conexao.execute("SELECT valor FROM contadores WHERE nome = 'remocoes'").fetchone()
+            return linha[0] if linha else 0
+
+    def listar_relatorios(self):
+        """Nomes dos relatórios, do mais recente para o mais antigo"""
+        with self._lock:
+            cursor = self._conexao.execute("SELECT nome FROM relatorios ORDER BY nome DESC")
+            return [linha["nome"] for linha in cursor]
+
+    def pagina_relatorios(self, pagina=1, por_pagina=20, desde=None, ate=None, produto=None):
+        """
+        Uma página do índice de relatórios, com os campos do resumo
+
+        `desde` e `ate` ("AAAA-MM-DD", inclusivos) filtram pela data de início;
+        `produto` filtra relatórios que contêm uma busca com esse termo.
+        Retorna {"relatorios", "total", "pagina", "paginas"}.
+        """
+        condicoes, parametros = [], []
+        if desde:
+            condicoes.append("r.inicio >= ?")
+            parametros.append(desde)
+        if ate:
+            condicoes.append("r.inicio < date(?, '+1 day')")
+            parametros.append(ate)
+        if produto:
+            condicoes.append(
+                "EXISTS (SELECT 1 FROM buscas b JOIN produtos p ON p.id = b.produto_id "
+                "WHERE b.relatorio = r.nome AND p.nome LIKE ?)"
+            )
+            parametros.append(f"%{produto}%")
+        filtro = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
+        with self._lock:
+            total = self._conexao.execute(f"SELECT COUNT(*) FROM relatorios r {filtro}", parametros).fetchone()[0]
+            pagina, paginas, deslocamento = _limites_pagina(total, pagina, por_pagina)
+            cursor = self._conexao.execute(
+                f"SELECT r.* FROM relatorios r {filtro} ORDER BY r.inicio DESC, r.nome DESC LIMIT ? OFFSET ?",
+                parametros + [max(1, por_pagina), deslocamento]
+            )
+            relatorios = [dict(linha) for linha in cursor]
+        return {"relatorios": relatorios, "total": total, "pagina": pagina, "paginas": paginas}
+
+    def _buscas_como_dict(self, linhas_buscas):
+        ids = [linha["id"] for linha in linhas_buscas]
+        ofertas = {busca_id: [] for busca_id in ids}
+        if ids:
+            marcadores = ",".join("?" * len(ids))
+            cursor = self._conexao.execute(
+                f"SELECT o.busca_id, o.nome, o.preco, l.nome AS loja, o.link, o.preco_centavos, o.parcelas, "
+                f"o.valor_parcela_centavos, o.preco_anterior_centavos FROM ofertas o "
+                f"LEFT JOIN lojas l ON l.id = o.loja_id WHERE o.busca_id IN ({marcadores}) "
+                f"ORDER BY o.busca_id, o.posicao",
+                ids
+            )
+            for linha in cursor:
+                oferta = {chave: linha[chave] for chave in CHAVES_OFERTA}
+                oferta.update({chave: linha[chave] for chave in CHAVES_NUMERICAS if linha[chave] is not None})
+                ofertas[linha["busca_id"]].append(oferta)
+
+        resultados = {}
+        for linha in linhas_buscas:
+            resultado = {
+                "produto_buscado": linha["produto"],
+                "timestamp": linha["timestamp"],
+                "produtos_patrocinados": ofertas[linha["id"]]
+            }
+            if linha["backend"]:
+                resultado["backend"] = linha["backend"]
+            if linha["extra"]:
+                resultado.update(json.loads(linha["extra"]))
+            resultados[linha["produto"]] = resultado
+        return resultados
+
+    def carregar_relatorio(self, nome):
+        """Reconstrói o relatório no mesmo formato de relatorio_buscas_*.json (None se não existir)"""
+        with self._lock:
+            linha = self._conexao.execute("SELECT * FROM relatorios WHERE nome = ?", (nome,)).fetchone()
+            if linha is None:
+                return None
+            buscas = self._conexao.execute(
+                "SELECT b.id, p.nome AS produto, b.timestamp, b.backend, b.extra FROM buscas b "
+                "JOIN produtos p ON p.id = b.produto_id WHERE b.relatorio = ? ORDER BY b.id",
+                (nome,)
+            ).fetchall()
+            resumo = {chave: linha[chave] for chave in linha.keys() if chave != "nome"}
+            return {"resumo": resumo, "resultados_detalhados": self._buscas_como_dict(buscas)}
+
+    def resumo_relatorio(self, nome):
+        """Campos do resumo de um relatório (None se não existir)"""
+        with self._lock:
+            linha = self._conexao.execute("SELECT * FROM relatorios WHERE nome = ?", (nome,)).fetchone()
+        return dict(linha) if linha else None
+
+    def produtos_relatorio(self, nome, pagina=1, por_pagina=20, produto=None):
+        """
+        Uma página das buscas de um relatório, sem as ofertas
+
+        Cada item traz busca_id, produto, timestamp, backend e o número de
+        ofertas. Retorna {"produtos", "total", "pagina", "paginas"}.
+        """
+        filtro, parametros = "WHERE b.relatorio = ?", [nome]
+        if produto:
+            filtro += " AND p.nome LIKE ?"
+            parametros.append(f"%{produto}%")
+        with self._lock:
+            total = self._conexao.execute(
+                f"SELECT COUNT(*) FROM buscas b JOIN produtos p ON p.id = b.produto_id {filtro}", parametros
+            ).fetchone()[0]
+            pagina, paginas, deslocamento = _limites_pagina(total, pagina, por_pagina)
+            cursor = self._conexao.execute(
+                f"SELECT b.id AS busca_id, p.nome AS produto, b.timestamp, b.backend, "
+                f"(SELECT COUNT(*) FROM ofertas o WHERE o.busca_id = b.id) AS ofertas "
+                f"FROM buscas b JOIN produtos p ON p.id = b.produto_id {filtro} "
+                f"ORDER BY b.id LIMIT ? OFFSET ?",
+                parametros + [max(1, por_pagina), deslocamento]
+            )
+            produtos = [dict(linha) for linha in cursor]
+        return {"produtos": produtos, "total": total, "pagina": pagina, "paginas": paginas}
+
+    def ofertas_busca(self, busca_id, ordenar="posicao", decrescente=False, loja=None, texto=None):
+        """
+        Ofertas de uma busca ordenadas e filtradas no banco
+
+        `ordenar` é uma chave de ORDENACOES_OFERTAS; `loja` filtra pelo nome
+        exato da loja e `texto` por parte do nome da oferta.
+        """
+        coluna = ORDENACOES_OFERTAS.get(ordenar, ORDENACOES_OFERTAS["posicao"])
+        direcao = "DESC" if decrescente else "ASC"
+        consulta = (
+            "SELECT o.posicao, o.nome, o.preco, l.nome AS loja, o.link, o.preco_centavos, o.parcelas, "
+            "o.valor_parcela_centavos, o.preco_anterior_centavos FROM ofertas o "
+            "LEFT JOIN lojas l ON l.id = o.loja_id WHERE o.busca_id = ?"
+        )
+        parametros = [busca_id]
+        if loja:
+            consulta += " AND l.nome = ?"
+            parametros.append(loja)
+        if texto:
+            consulta += " AND o.nome LIKE ?"
+            parametros.append(f"%{texto}%")
+        consulta += f" ORDER BY {coluna} IS NULL, {coluna} {direcao}, o.posicao"
+        with self._lock:
+            return [dict(linha) for linha in self._conexao.execute(consulta, parametros)]
+
+    def busca_do_relatorio(self, nome, busca_id):
+        """Produto de uma busca, se ela pertencer ao relatório"""
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT p.nome FROM buscas b JOIN produtos p ON p.id = b.produto_id WHERE b.id = ? AND b.relatorio = ?",
+                (busca_id, nome)
+            ).fetchone()
+        return linha[0] if linha else None
+
+    def consultar(self, sql, parametros=()):
+        """Executa uma consulta de leitura e retorna as linhas como dicionários"""
+        with self._lock:
+            return [dict(linha) for linha in self._conexao.execute(sql, parametros)]
+
+    @contextmanager
+    def transacao(self):
+        """Conexão com o lock adquirido dentro de uma transação (commit ao final, rollback em erro)"""
+        with self._lock:
+            try:
+                with self._conexao:
+                    yield self._conexao
+            except Exception:
+                self._descartar_cache()
+                raise
+
+    def historico_produto(self, produto, dias=90, loja=None):
+        """Ofertas de um produto nos últimos `dias`, opcionalmente filtradas por loja (sem acertos de cache)"""
+        desde = (datetime.now() - timedelta(days=dias)).strftime("%Y-%m-%d %H:%M:%S")
+        consulta = (
+            "SELECT o.timestamp, l.nome AS loja, o.nome, o.preco, o.preco_centavos, o.link FROM ofertas o "
+            "JOIN produtos p ON p.id = o.produto_id LEFT JOIN lojas l ON l.id = o.loja_id "
+            "WHERE p.nome = ? AND o.timestamp >= ? AND o.do_cache IS NULL"
+        )
+        parametros = [produto, desde]
+        if loja is not None:
+            consulta += " AND l.nome = ?"
+            parametros.append(loja)
+        consulta += " ORDER BY o.timestamp, o.id"
+        with self._lock:
+            return [dict(linha) for linha in self._conexao.execute(consulta, parametros)]
+
+    def ultimas_buscas(self):
+        """Horário da busca mais recente com ofertas de cada produto ({nome: "AAAA-MM-DD HH:MM:SS"})"""
+        # Buscas sem ofertas são falhas (todas as tentativas esgotadas) e não atualizam o produto
+        with self._lock:
+            cursor = self._conexao.execute(
+                "SELECT p.nome, MAX(b.timestamp) AS ultima FROM buscas b "
+                "JOIN produtos p ON p.id = b.produto_id "
+                "WHERE EXISTS (SELECT 1 FROM ofertas o WHERE o.busca_id = b.id) GROUP BY b.produto_id"
+            )
+            return {linha["nome"]: linha["ultima"] for linha in cursor}
+
+    def importar_relatorios_json(self, diretorio):
+        """Importa os relatorio_buscas_* existentes (.json ou incrementais); retorna quantos foram importados"""
+        with self._lock:
+            existentes = set(self.listar_relatorios())
+        importados = 0
+        caminhos = []
+        for padrao in PADROES_RELATORIOS:
+            caminhos.extend(glob.glob(os.path.join(diretorio, padrao)))
+        for caminho in sorted(caminhos):
+            nome = os.path.basename(caminho)
+            if nome in existentes:
+                continue
+            try:
+                self.registrar_relatorio(nome, carregar_relatorio_arquivo(caminho))
+                importados += 1
+            except (OSError, ValueError) as e:
+                print(f"Erro ao importar {nome}: {e}")
+        return importados
+
+
+_historico = None
+_lock_historico = threading.Lock()
+
+
+def obter_historico():
+    """Instância compartilhada do histórico no diretório de dados padrão"""
+    global _historico
+    with _lock_historico:
+        if _historico is None:
+            _historico = HistoricoPrecos()
+        return _historico
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "importar":
+        diretorio = sys.argv[2] if len(sys.argv) > 2 else os.path.dirname(os.path.abspath(__file__))
+        total = obter_historico().importar_relatorios_json(diretorio)
+        print(f"{total} relatórios importados para {obter_historico().caminho}")
+    else:
+        print("Uso: python historico.py importar [diretorio]")
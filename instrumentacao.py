@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Instrumentação por etapa da coleta
+
+Cada etapa (inicialização do driver, navegação, campo de busca, espera dos
+resultados, subetapas da extração, tentativas e gravações) é registrada como
+um span: a duração alimenta histogramas expostos no formato do Prometheus em
+`/metrics`. O log JSONL de rastros, com produto e tentativa de cada span, é
+opcional (MEIU_RASTROS=1 ou MEIU_ARQUIVO_RASTROS) e rotacionado ao passar de
+MEIU_RASTROS_MAX_MB; os spans por card (nome, preço e link de cada oferta)
+ficam só nos histogramas.
+
+A captura de HTML para depuração é opcional e amostrada: com
+MEIU_DEBUG_HTML_AMOSTRA=0.1, por exemplo, 10% das páginas têm o HTML salvo
+em dados/debug_html/.
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from historico import DATA_DIR
+
+ARQUIVO_RASTROS = os.environ.get(
+    "MEIU_ARQUIVO_RASTROS",
+    os.path.join(DATA_DIR, "rastros.jsonl") if os.environ.get("MEIU_RASTROS") == "1" else ""
+)
+RASTROS_MAX_BYTES = int(float(os.environ.get("MEIU_RASTROS_MAX_MB", "50")) * 1024 * 1024)
+DIRETORIO_DEBUG_HTML = os.path.join(DATA_DIR, "debug_html")
+TAXA_DEBUG_HTML = float(os.environ.get("MEIU_DEBUG_HTML_AMOSTRA", "0"))
+
+# Limites dos histogramas de duração, em segundos
+LIMITES_HISTOGRAMA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_contexto = threading.local()
+
+
+class Metricas:
+    """Histogramas de duração e contadores, com rótulos de baixa cardinalidade"""
+
+    def __init__(self, limites=LIMITES_HISTOGRAMA):
+        self.limites = limites
+        self._histogramas = {}
+        self._contadores = {}
+        self._lock = threading.Lock()
+
+    def observar(self, nome, valor, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = {"baldes": [0] * len(self.limites), "soma": 0.0, "total": 0}
+            for i, limite in enumerate(self.limites):
+                if valor <= limite:
+                    histograma["baldes"][i] += 1
+            histograma["soma"] += valor
+            histograma["total"] += 1
+
+    def incrementar(self, nome, quantidade=1, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + quantidade
+
+    @staticmethod
+    def _rotulos(pares):
+        if not pares:
+            return ""
+        return "{" + ",".join(f'{k}="{str(v).replace(chr(34), "")}"' for k, v in pares) + "}"
+
+    def exportar_prometheus(self):
+        """Texto no formato de exposição do Prometheus"""
+        linhas = []
+        with self._lock:
+            histogramas = sorted(self._histogramas.items())
+            contadores = sorted(self._contadores.items())
+
+        tipos_emitidos = set()
+        for (nome, pares), histograma in histogramas:
+            if nome not in tipos_emitidos:
+                linhas.append(f"# TYPE {nome} histogram")
+                tipos_emitidos.add(nome)
+            for limite, contagem in zip(self.limites, histograma["baldes"]):
+                linhas.append(f"{nome}_bucket{self._rotulos(pares + (('le', limite),))} {contagem}")
+            linhas.append(f"{nome}_bucket{self._rotulos(pares + (('le', '+Inf'),))} {histograma['total']}")
+            linhas.append(f"{nome}_sum{self._rotulos(pares)} {round(histograma['soma'], 6)}")
+            linhas.append(f"{nome}_count{self._rotulos(pares)} {histograma['total']}")
+
+        for (nome, pares), valor in contadores:
+            if nome not in tipos_emitidos:
+                linhas.append(f"# TYPE {nome} counter")
+                tipos_emitidos.add(nome)
+            linhas.append(f"{nome}{self._rotulos(pares)} {valor}")
+        return "\n".join(linhas) + "\n"
+
+
+class LogRastros:
+    """Log JSONL com um span por linha; ao passar de `max_bytes` vira <caminho>.1 e recomeça"""
+
+    def __init__(self, caminho=ARQUIVO_RASTROS, max_bytes=RASTROS_MAX_BYTES):
+        self.caminho = caminho
+        self.max_bytes = max_bytes
+        self._arquivo = None
+        self._lock = threading.Lock()
+
+    def _rotacionar(self):
+        # Chamado com o lock adquirido; mantém um único arquivo anterior
+        self._arquivo.close()
+        self._arquivo = None
+        os.replace(self.caminho, self.caminho + ".1")
+
+    def registrar(self, registro):
+        if not self.caminho:
+            return
+        linha = json.dumps(registro, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._arquivo is None:
+                os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+                self._arquivo = open(self.caminho, 'a', encoding='utf-8', buffering=1)
+            self._arquivo.write(linha)
+            if self.max_bytes and self._arquivo.tell() >= self.max_bytes:
+                self._rotacionar()
+
+    def fechar(self):
+        with self._lock:
+            if self._arquivo is not None:
+                self._arquivo.close()
+                self._arquivo = None
+
+
+_metricas = Metricas()
+_rastros = LogRastros()
+
+
+def obter_metricas():
+    """Métricas compartilhadas do processo"""
+    return _metricas
+
+
+def contexto_atual():
+    """Etiquetas (produto, tentativa, ...) da thread atual"""
+    return dict(getattr(_contexto, "etiquetas", {}))
+
+
+@contextmanager
+def contexto(**etiquetas):
+    """Acrescenta etiquetas aos spans registrados nesta thread dentro do bloco"""
+    anteriores = getattr(_contexto, "etiquetas", {})
+    _contexto.etiquetas = dict(anteriores, **etiquetas)
+    try:
+        yield
+    finally:
+        _contexto.etiquetas = anteriores
+
+
+def registrar_span(etapa, duracao, status="ok", rastrear=True, **rotulos):
+    """
+    Registra um span já medido (duração em segundos)
+
+    Com `rastrear=False` o span só alimenta o histograma; é o caso das
+    etapas executadas uma vez por card, que encheriam o log de rastros.
+    """
+    _metricas.observar("meiu_etapa_duracao_segundos", duracao, etapa=etapa, status=status, **rotulos)
+    if not rastrear:
+        return
+    registro = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "etapa": etapa,
+                "duracao_ms": round(duracao * 1000, 3), "status": status}
+    registro.update(contexto_atual())
+    registro.update(rotulos)
+    _rastros.registrar(registro)
+
+
+@contextmanager
+def span(etapa, **rotulos):
+    """
+    Mede o bloco como um span da etapa
+
+    `rotulos` viram rótulos do histograma e devem ter poucos valores
+    distintos (backend, estratégia); o produto e a tentativa vêm do contexto
+    e só vão para o log de rastros.
+    """
+    inicio = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "erro"
+        raise
+    finally:
+        registrar_span(etapa, time.perf_counter() - inicio, status, **rotulos)
+
+
+def contar(nome, quantidade=1, **rotulos):
+    """Incrementa um contador (ex.: meiu_tentativas_total)"""
+    _metricas.incrementar(nome, quantidade, **rotulos)
+
+
+def deve_capturar_html():
+    """Sorteia se esta página terá o HTML salvo para depuração"""
+    return TAXA_DEBUG_HTML > 0 and random.random() < TAXA_DEBUG_HTML
+
+
+def salvar_html_debug(html, rotulo="pagina"):
+    """Salva o HTML em dados/debug_html/ com o produto e a tentativa do contexto no nome"""
+    etiquetas = contexto_atual()
+    partes = [time.strftime("%Y%m%d_%H%M%S"), etiquetas.get("produto", ""), f"t{etiquetas.get('tentativa', 0)}", rotulo]
+    nome = re.sub(r'[^\w.-]+', '_', "_".join(p for p in partes if p))[:150] + ".html"
+    try:
+        os.makedirs(DIRETORIO_DEBUG_HTML, exist_ok=True)
+        caminho = os.path.join(DIRETORIO_DEBUG_HTML, nome)
+        with open(caminho, 'w', encoding='utf-8') as f:
+            f.write(html or "")
+        contar("meiu_debug_html_total")
+        return caminho
+    except OSError as e:
+        print(f"Erro ao salvar HTML de depuração: {e}")
+        return None
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Resolução de links de ofertas: redirecionamentos, URL canônica e loja
+
+Links de anúncio do Google (`/url?q=`, `/aclk?...&adurl=`) e de redes de
+afiliados são desembrulhados sem acessar a rede; parâmetros de rastreamento
+e de sessão são removidos para que a mesma oferta tenha sempre o mesmo link
+(de qualquer loja, só os rastreadores inequívocos como utm_* e gclid; os
+parâmetros próprios de cada loja ficam na regra dela, em `remover_parametros`
+ou `manter_parametros`);
+e o domínio é mapeado para a loja por um índice de sufixos montado a partir
+do registro de lojas (lojas.json, ou o arquivo em MEIU_REGISTRO_LOJAS).
+
+Uso para conferir o corpus de links:
+    python links.py verificar [fixtures/links_ofertas.json]
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, unquote
+
+ARQUIVO_REGISTRO = os.environ.get(
+    "MEIU_REGISTRO_LOJAS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "lojas.json")
+)
+ARQUIVO_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "links_ofertas.json")
+
+MAX_DESEMBRULHOS = 4
+
+# Rastreadores e sessões removidos de qualquer loja: só nomes que nenhuma loja usa
+# para identificar o produto (nomes genéricos como "sid" ou "type" ficam nas regras das lojas)
+PARAMETROS_RASTREAMENTO = {
+    "gclid", "gclsrc", "gbraid", "wbraid", "dclid", "fbclid", "msclkid", "yclid", "srsltid", "_ga", "_gl",
+    "mc_cid", "mc_eid", "_hsenc", "_hsmi", "jsessionid", "phpsessid", "aff_id", "affiliate_id",
+    "cm_mmc", "cm_mmca1", "s_cid",
+}
+PREFIXOS_RASTREAMENTO = ("utm_", "matt_", "hsa_")
+REGEX_SESSAO_CAMINHO = re.compile(r';(?:jsessionid|sessionid|sid)=[^/?#]*', re.IGNORECASE)
+
+# Sufixos públicos mais comuns, para o nome de lojas fora do registro
+SUFIXOS_PUBLICOS = {"com.br", "net.br", "org.br", "ind.br", "art.br", "com", "net", "org", "store", "shop",
+                    "online", "io", "br", "us", "co"}
+
+
+class RegistroLojas:
+    """Índice de sufixos de domínio -> loja e regras de URL canônica por loja"""
+
+    def __init__(self, dados):
+        self.lojas = {}
+        self.redirecionadores = {}
+        for dominio, parametros in dados.get("redirecionadores", {}).items():
+            self.redirecionadores[dominio.lower()] = tuple(parametros)
+        for loja in dados.get("lojas", []):
+            regra = {"nome": loja["nome"], "manter_parametros": None, "remover_parametros": (set(), ()),
+                     "caminho": None}
+            if "manter_parametros" in loja:
+                regra["manter_parametros"] = {p.lower() for p in loja["manter_parametros"]}
+            if "remover_parametros" in loja:
+                # "pd_rd_*" remove todos os parâmetros com o prefixo
+                nomes = [p.lower() for p in loja["remover_parametros"]]
+                regra["remover_parametros"] = ({p for p in nomes if not p.endswith("*")},
+                                               tuple(p[:-1] for p in nomes if p.endswith("*")))
+            if loja.get("caminho"):
+                regra["caminho"] = (re.compile(loja["caminho"]["padrao"]), loja["caminho"]["formato"])
+            for dominio in loja["dominios"]:
+                self.lojas[dominio.lower()] = regra
+
+    @classmethod
+    def carregar(cls, caminho=ARQUIVO_REGISTRO):
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _sufixos(host):
+        partes = host.split(".")
+        for i in range(len(partes) - 1):
+            yield ".".join(partes[i:])
+
+    def loja(self, host):
+        """Regra da loja cujo domínio é sufixo do host (o mais específico primeiro)"""
+        for sufixo in self._sufixos(host):
+            regra = self.lojas.get(sufixo)
+            if regra:
+                return regra
+        return None
+
+    def parametros_redirecionamento(self, host):
+        """Parâmetros com o destino se o host for um redirecionador conhecido (None caso contrário)"""
+        for sufixo in self._sufixos(host):
+            if sufixo in self.redirecionadores:
+                return self.redirecionadores[sufixo]
+        return None
+
+
+_registro = None
+_lock_registro = threading.Lock()
+
+
+def obter_registro():
+    """Registro de lojas do processo, carregado na primeira chamada"""
+    global _registro
+    with _lock_registro:
+        if _registro is None:
+            _registro = RegistroLojas.carregar()
+        return _registro
+
+
+def nome_loja_do_host(host):
+    """Nome para lojas fora do registro: o rótulo antes do sufixo público ("loja.exemplo.com.br" -> "Exemplo")"""
+    partes = [p for p in host.split(".") if p and p != "www"]
+    if len(partes) > 2 and ".".join(partes[-2:]) in SUFIXOS_PUBLICOS:
+        partes = partes[:-2]
+    elif len(partes) > 1 and partes[-1] in SUFIXOS_PUBLICOS:
+        partes = partes[:-1]
+    return partes[-1].capitalize() if partes else None
+
+
+def _destino_embutido(partes, parametros_destino):
+    """URL de destino carregada por um redirecionador, se houver"""
+    # DoubleClick e similares acrescentam o destino inteiro após o "?"
+    if partes.query.startswith(("http://", "https://", "http%3A", "https%3A")):
+        return unquote(partes.query)
+    consulta = {chave: valor for chave, valor in parse_qsl(partes.query, keep_blank_values=False)}
+    for parametro in parametros_destino:
+        valor = consulta.get(parametro)
+        if valor and valor.startswith(("http://", "https://", "//")):
+            return "https:" + valor if valor.startswith("//") else valor
+    return None
+
+
+def _parametro_rastreamento(chave):
+    chave = chave.lower()
+    return chave in PARAMETROS_RASTREAMENTO or chave.startswith(PREFIXOS_RASTREAMENTO)
+
+
+@lru_cache(maxsize=8192)
+def resolver_link(link, base="https://www.google.com"):
+    """
+    Resolve um link de oferta
+
+    Retorna {"link", "chave", "dominio", "loja"}: o link canônico, uma chave
+    para deduplicação (sem esquema e sem "www."), o domínio de destino e a
+    loja (None quando o destino não pode ser determinado, como em anúncios
+    `aclk` sem `adurl`).
+    """
+    registro = obter_registro()
+    atual = (link or "").strip()
+    if atual.startswith("//"):
+        atual = "https:" + atual
+    elif atual.startswith("/"):
+        atual = base.rstrip("/") + atual
+
+    partes = urlsplit(atual)
+    for _ in range(MAX_DESEMBRULHOS):
+        parametros_destino = registro.parametros_redirecionamento((partes.hostname or "").lower())
+        if parametros_destino is None:
+            break
+        destino = _destino_embutido(partes, parametros_destino)
+        if not destino:
+            break
+        partes = urlsplit(destino)
+
+    host = (partes.hostname or "").lower().rstrip(".")
+    if not host:
+        return {"link": link, "chave": link, "dominio": None, "loja": None}
+    if registro.parametros_redirecionamento(host) is not None:
+        # Redirecionador sem destino legível (ex.: aclk sem adurl): mantém o link original
+        return {"link": link, "chave": link, "dominio": host, "loja": None}
+
+    regra = registro.loja(host)
+    caminho = REGEX_SESSAO_CAMINHO.sub("", partes.path) or "/"
+    parametros = [(k, v) for k, v in parse_qsl(partes.query, keep_blank_values=True) if not _parametro_rastreamento(k)]
+    if regra:
+        if regra["caminho"]:
+            padrao, formato = regra["caminho"]
+            encontrado = padrao.search(caminho)
+            if encontrado:
+                caminho = formato.format(*encontrado.groups())
+                parametros = []
+        remover, prefixos = regra["remover_parametros"]
+        if remover or prefixos:
+            parametros = [(k, v) for k, v in parametros
+                          if k.lower() not in remover and not k.lower().startswith(prefixos)]
+        if regra["manter_parametros"] is not None:
+            parametros = [(k, v) for k, v in parametros if k.lower() in regra["manter_parametros"]]
+    parametros.sort()
+
+    netloc = host if partes.port in (None, 80, 443) else f"{host}:{partes.port}"
+    canonico = urlunsplit(("https", netloc, caminho, urlencode(parametros), ""))
+    chave = canonico.split("://", 1)[1]
+    if chave.startswith("www."):
+        chave = chave[4:]
+    return {
+        "link": canonico,
+        "chave": chave,
+        "dominio": host,
+        "loja": regra["nome"] if regra else nome_loja_do_host(host),
+    }
+
+
+def processar_links(links, base="https://www.google.com"):
+    """Resolve todos os links de uma página de uma vez (links repetidos são resolvidos uma única vez)"""
+    resolvidos = {}
+    for link in links:
+        if link and link not in resolvidos:
+            resolvidos[link] = resolver_link(link, base)
+    return [resolvidos.get(link) if link else None for link in links]
+
+
+def verificar_corpus(caminho=ARQUIVO_CORPUS):
+    """Confere o corpus de links rotulados; retorna a lista de divergências"""
+    with open(caminho, 'r', encoding='utf-8') as f:
+        casos = json.load(f)
+    divergencias = []
+    for caso, resolvido in zip(casos, processar_links([c["link"] for c in casos])):
+        for campo, esperado in (("link", caso["link_esperado"]), ("loja", caso["loja"])):
+            if resolvido[campo] != esperado:
+                divergencias.append({"link": caso["link"], "campo": campo,
+                                     "esperado": esperado, "obtido": resolvido[campo]})
+    return casos, divergencias
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "verificar":
+        print(__doc__)
+        sys.exit(1)
+
+    casos, divergencias = verificar_corpus(sys.argv[2] if len(sys.argv) > 2 else ARQUIVO_CORPUS)
+    for d in divergencias:
+        print(f"[{d['campo']}] {d['link']}\n  esperado: {d['esperado']}\n  obtido:   {d['obtido']}")
+    print(f"{len(casos) - len({d['link'] for d in divergencias})}/{len(casos)} links corretos")
+    sys.exit(1 if divergencias else 0)
@@ -5,19 +5,71 @@ import json
 import time
 import subprocess
 import os
+import queue
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+import threading
+
+from extracao import (
+    SELETOR_PRODUTOS_AMPLO, SELETORES_PRODUTOS_GENERICO, LIMITE_OFERTAS, LIMITE_PROFUNDO, PRAZO_PROFUNDO,
+    BUSCA_PROFUNDA, URL_GOOGLE_SHOPPING, nome_valido, extrair_preco_texto, finalizar_ofertas, chave_oferta
+)
+from extracao_lote import extrair_produtos_lote
+from precos import analisar_preco
+from extracao_offline import extrair_produtos_html
+from ofertas import ResultadoBusca
+from backends_busca import BuscadorBackends
+from historico import obter_historico
+from alertas import obter_detector
+from seletores import obter_registro_seletores
+from recursos_navegador import carregar_politica, configurar_opcoes, aplicar_politica
+from instrumentacao import (
+    contexto, span, registrar_span, contar, deve_capturar_html, salvar_html_debug
+)
+from tentativas import (
+    TRANSITORIA, MARCACAO, CONSENTIMENTO, MOTIVO_DISJUNTOR, FalhaBusca, BuscaAdiada, PoliticaTentativas,
+    classificar_falha, classificar_texto, aceitar_consentimento, obter_disjuntor
+)
+from espera import (
+    Prazo, CronometroFases, url_busca_direta, campo_busca_pronto,
+    valor_do_campo, aguardar_resultados, carregar_mais_resultados
+)
+
+# Caminho do chromedriver resolvido uma única vez por processo
+_caminho_chromedriver = None
+_lock_chromedriver = threading.Lock()
+
+def obter_caminho_chromedriver():
+    """Resolve o caminho do chromedriver com o WebDriver Manager apenas na primeira chamada"""
+    global _caminho_chromedriver
+    if _caminho_chromedriver is None:
+        with _lock_chromedriver:
+            if _caminho_chromedriver is None:
+                _caminho_chromedriver = ChromeDriverManager().install()
+    return _caminho_chromedriver
 
 def configurar_driver():
     """Configura e retorna o driver do Chrome com opções otimizadas - MODO INVISÍVEL"""
-    chrome_options = Options()
+    inicio = time.perf_counter()
+    driver = _iniciar_chrome()
+    registrar_span("inicializacao_driver", time.perf_counter() - inicio, "ok" if driver else "erro")
+    return driver
+
+def _iniciar_chrome(chrome_options=None, politica=None, perfil=None):
+    """
+    Inicia o Chrome headless com o WebDriver Manager ou, em último caso, direto
+
+    A política de recursos (bloqueio de imagens, fontes e rastreadores) e o
+    perfil persistente vêm de recursos_navegador; sem argumentos, valem as
+    variáveis de ambiente MEIU_POLITICA_RECURSOS e MEIU_PERFIL_CHROME.
+    """
+    chrome_options = chrome_options or Options()
+    politica = politica if politica is not None else carregar_politica()
     
     # CONFIGURAÇÕES PARA MODO INVISÍVEL (HEADLESS)
     chrome_options.add_argument("--headless=new")  # Modo invisível mais moderno
@@ -36,16 +88,19 @@ def configurar_driver():
     chrome_options.add_argument("--disable-features=VizDisplayCompositor")
     chrome_options.add_argument("--disable-logging")
     chrome_options.add_argument("--silent")
-    chrome_options.add_argument("--window-size=1920,1080")  # Define tamanho mesmo invisível
     chrome_options.add_argument("--disable-background-timer-throttling")
     chrome_options.add_argument("--disable-backgrounding-occluded-windows")
     chrome_options.add_argument("--disable-renderer-backgrounding")
     
+    # Tamanho da janela (mesmo invisível), bloqueio de imagens e perfil persistente
+    configurar_opcoes(chrome_options, politica, perfil)
+    
     # Método 1: Usar WebDriver Manager (recomendado para compatibilidade)
     try:
         print(" Configurando Chrome invisível com WebDriver Manager...")
-        service = Service(ChromeDriverManager().install())
+        service = Service(obter_caminho_chromedriver())
         driver = webdriver.Chrome(service=service, options=chrome_options)
+        aplicar_politica(driver, politica)
         return driver
     except Exception as e:
         print(f"Erro com WebDriver Manager: {e}")
@@ -54,112 +109,127 @@ def configurar_driver():
     try:
         print(" Última tentativa - Chrome invisível com configurações específicas...")
         driver = webdriver.Chrome(options=chrome_options)
+        aplicar_politica(driver, politica)
         return driver
     except Exception as e:
         print(f"Erro na configuração invisível: {e}")
         
     return None
 
-def buscar_produtos_patrocinados(produto, max_tentativas=2):
+def buscar_produtos_patrocinados(produto, max_tentativas=2, pool=None, estrategia="lote",
+                                 navegacao="digitar", prazo_consulta=30, atraso_digitacao=0.03,
+                                 politica_tentativas=None, profundo=BUSCA_PROFUNDA, limite=None,
+                                 prazo_profundo=PRAZO_PROFUNDO, ao_ofertar=None, prazo_tarefa=None):
     """
     Busca produto no Google Shopping com sistema de retry
+
+    Se um pool de drivers (pool_drivers.PoolDrivers) for informado, a sessão do
+    Chrome é emprestada do pool e devolvida ao final em vez de ser encerrada.
+
+    `estrategia` define a extração: "lote" usa um único execute_script para
+    todos os cards, "offline" analisa um snapshot de page_source sem novas
+    chamadas ao WebDriver (ambas com fallback automático) e "elemento" usa o
+    caminho original, um elemento por vez.
+
+    `navegacao="direto"` abre a URL de resultados com a consulta já codificada,
+    pulando a digitação. Todas as esperas compartilham `prazo_consulta`
+    segundos e a duração real de cada fase fica em `tempos_fases`.
+
+    Cada falha é classificada (tentativas.classificar_falha): falhas
+    transitórias, de marcação e de consentimento são repetidas na mesma sessão
+    após um backoff exponencial com jitter; uma sessão que não responde mais é
+    descartada e a tentativa seguinte usa outra; um bloqueio (captcha, /sorry/)
+    descarta a sessão, alimenta o disjuntor do processo e levanta BuscaAdiada
+    para a busca voltar à fila. Com o disjuntor aberto a busca nem começa.
+
+    `ao_ofertar(oferta)` é chamado para cada oferta assim que ela é extraída,
+    antes de a busca terminar (ofertas já entregues em uma tentativa anterior
+    não se repetem). Com `profundo=True` a página é rolada para carregar mais
+    cards até `limite` ofertas (padrão MEIU_LIMITE_PROFUNDO) ou
+    `prazo_profundo` segundos; cards vistos em mais de uma passada contam
+    uma vez só.
+
+    `prazo_tarefa` (segundos) limita a busca inteira: cada tentativa usa
+    no máximo o tempo restante, a espera entre tentativas é encurtada e, com
+    o prazo esgotado, a busca termina com TimeoutError.
     """
-    for tentativa in range(max_tentativas):
-        driver = None
-        try:
-            print(f" Tentativa {tentativa + 1} de {max_tentativas}")
-            driver = configurar_driver()
-            
-            resultados = {
-                "produto_buscado": produto,
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "produtos_patrocinados": []
-            }
-            
-            print(f" Acessando Google Shopping...")
-            driver.get("https://www.google.com/shopping?hl=pt-BR")
-            
-            # Aguarda a página carregar com timeout maior
-            wait = WebDriverWait(driver, 20)
-            
-            print(f" Procurando campo de busca...")
-            # Tenta diferentes seletores para o campo de busca
-            campo_busca = None
-            seletores_busca = ["#APjFqb", "input[name='q']", "input[type='search']"]
-            
-            for seletor in seletores_busca:
-                try:
-                    campo_busca = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, seletor)))
-                    break
-                except TimeoutException:
-                    continue
-            
-            if not campo_busca:
-                raise Exception("Campo de busca não encontrado")
-            
-            print(f" Digitando: {produto}")
-            campo_busca.clear()
-            time.sleep(1)
-            
-            # Digita o produto caractere por caractere para evitar detecção
-            for char in produto:
-                campo_busca.send_keys(char)
-                time.sleep(0.1)
-            
-            time.sleep(2)
-            campo_busca.send_keys(Keys.ENTER)
-            
-            print(" Aguardando resultados carregarem...")
-            time.sleep(8)  # Aumentado o tempo de espera
-            
-            print(" Procurando produtos patrocinados...")
-            
-            # Tenta diferentes padrões de produtos
-            produtos_encontrados = []
-            seletores_produtos = [
-                "[id^='vplahcl_']",
-                "[data-docid][jscontroller]", 
-                ".sh-dgr__content",
-                ".PLla-d",
-                "[role='listitem']"
-            ]
-            
-            for seletor in seletores_produtos:
-                elementos = driver.find_elements(By.CSS_SELECTOR, seletor)
-                if elementos:
-                    produtos_encontrados = elementos
-                    print(f" Encontrados {len(elementos)} elementos com seletor: {seletor}")
-                    break
-            
-            if not produtos_encontrados:
-                print(" Nenhum produto encontrado, tentando busca mais ampla...")
-                produtos_encontrados = driver.find_elements(By.CSS_SELECTOR, "div[data-hveid], div[data-ved]")
-            
-            print(f" Processando {len(produtos_encontrados)} elementos...")
-            
-            for i, produto_elem in enumerate(produtos_encontrados[:20]):
+    politica = politica_tentativas or PoliticaTentativas(max_tentativas)
+    if prazo_tarefa is not None:
+        prazo_tarefa = Prazo(prazo_tarefa)
+    if ao_ofertar:
+        entregues = set()
+        repassar = ao_ofertar
+
+        def ofertar_uma_vez(oferta):
+            chave = chave_oferta(oferta)
+            if chave not in entregues:
+                entregues.add(chave)
+                repassar(oferta)
+
+        ao_ofertar = ofertar_uma_vez
+
+    disjuntor = obter_disjuntor()
+    driver = None
+    sucesso = False
+    try:
+        for tentativa in range(politica.max_tentativas):
+            with contexto(tentativa=tentativa + 1):
+                if not disjuntor.permitir():
+                    raise BuscaAdiada(produto, MOTIVO_DISJUNTOR)
+                if prazo_tarefa is not None and prazo_tarefa.esgotado():
+                    raise TimeoutError(f"Prazo da busca por '{produto}' esgotado")
+                inicio_tentativa = time.perf_counter()
+                tipo_falha = None
                 try:
-                    produto_info = extrair_info_produto_melhorado(produto_elem, driver, i)
-                    if produto_info and any(produto_info.values()):
-                        resultados["produtos_patrocinados"].append(produto_info)
-                        print(f"✅ Produto {i+1}: {produto_info.get('nome', 'N/A')[:50]}...")
+                    print(f" Tentativa {tentativa + 1} de {politica.max_tentativas}")
+                    prazo_tentativa = prazo_consulta
+                    if prazo_tarefa is not None:
+                        prazo_tentativa = min(prazo_consulta, prazo_tarefa.restante())
+                    if driver is None:
+                        driver = pool.adquirir(timeout=prazo_tentativa if prazo_tarefa else None) \
+                            if pool else configurar_driver()
+                        if driver is None:
+                            raise FalhaBusca(TRANSITORIA, "Não foi possível iniciar o Chrome")
+                    resultados = _executar_consulta(driver, produto, estrategia, navegacao,
+                                                    prazo_tentativa, atraso_digitacao, profundo=profundo,
+                                                    limite=limite, prazo_profundo=prazo_profundo,
+                                                    ao_ofertar=ao_ofertar)
+                    sucesso = True
+                    disjuntor.registrar("sucesso")
+                    return resultados
+
                 except Exception as e:
-                    continue
-            
-            return resultados
-            
-        except Exception as e:
-            print(f" Erro na tentativa {tentativa + 1}: {e}")
-            if tentativa < max_tentativas - 1:
-                print(" Tentando novamente em 5 segundos...")
-                time.sleep(5)
-        finally:
-            if driver:
-                try:
-                    driver.quit()
-                except:
-                    pass
-    
+                    tipo_falha = classificar_falha(e, driver)
+                    print(f" Erro na tentativa {tentativa + 1} ({tipo_falha}): {e}")
+                    disjuntor.registrar(tipo_falha)
+                    if not politica.repetir(tipo_falha):
+                        raise BuscaAdiada(produto, tipo_falha) from e
+
+                    if tipo_falha == CONSENTIMENTO and aceitar_consentimento(driver):
+                        print(" Consentimento aceito, repetindo na mesma sessão")
+                    elif tipo_falha == MARCACAO and navegacao != "direto":
+                        # Campo de busca ou cards mudaram: a URL direta não depende deles
+                        print(" Marcação inesperada, repetindo pela URL de resultados")
+                        navegacao = "direto"
+                    if driver is not None and not politica.mesma_sessao(tipo_falha):
+                        _liberar_driver(driver, pool, descartar=True)
+                        driver = None
+
+                    if tentativa < politica.max_tentativas - 1:
+                        espera = politica.espera(tentativa)
+                        if prazo_tarefa is not None:
+                            espera = min(espera, prazo_tarefa.restante())
+                        print(f" Tentando novamente em {espera:.1f} segundos...")
+                        time.sleep(espera)
+                finally:
+                    registrar_span("tentativa", time.perf_counter() - inicio_tentativa, "ok" if sucesso else "erro")
+                    contar("meiu_tentativas_total", resultado="sucesso" if sucesso else "falha",
+                           tipo_falha=tipo_falha or "")
+    finally:
+        if driver is not None:
+            # Sessão com erro é descartada; sessão saudável volta para o pool
+            _liberar_driver(driver, pool, descartar=not sucesso)
+
     # Se chegou aqui, todas as tentativas falharam
     return {
         "produto_buscado": produto,
@@ -167,8 +237,214 @@ def buscar_produtos_patrocinados(produto, max_tentativas=2):
         "produtos_patrocinados": []
     }
 
-def extrair_info_produto_melhorado(elemento, driver, index):
-    """Versão melhorada da extração com mais fallbacks e debug"""
+def buscar_ofertas_em_fluxo(produto, buscar=None, **opcoes):
+    """
+    Gera ("oferta", oferta) para cada oferta assim que ela é extraída e, ao
+    final, ("fim", resultados)
+
+    A busca roda em uma thread própria com `buscar(produto, ao_ofertar=...,
+    **opcoes)`, por padrão buscar_produtos_patrocinados (BuscadorBackends.buscar
+    também serve). Erros da busca, inclusive BuscaAdiada, são levantados no
+    consumidor. Se o consumidor abandonar o gerador, a busca termina em
+    segundo plano e as ofertas restantes são descartadas.
+    """
+    buscar = buscar or buscar_produtos_patrocinados
+    eventos = queue.Queue()
+
+    def executar():
+        try:
+            resultados = buscar(produto, ao_ofertar=lambda oferta: eventos.put(("oferta", oferta)), **opcoes)
+            eventos.put(("fim", resultados))
+        except BaseException as e:
+            eventos.put(("erro", e))
+
+    threading.Thread(target=executar, name="fluxo-ofertas", daemon=True).start()
+    while True:
+        tipo, dados = eventos.get()
+        if tipo == "erro":
+            raise dados
+        yield tipo, dados
+        if tipo == "fim":
+            return
+
+def _liberar_driver(driver, pool, descartar):
+    if pool:
+        pool.devolver(driver, descartar=descartar)
+    else:
+        try:
+            driver.quit()
+        except:
+            pass
+
+def _executar_consulta(driver, produto, estrategia, navegacao, prazo_consulta, atraso_digitacao,
+                       profundo=False, limite=None, prazo_profundo=PRAZO_PROFUNDO, ao_ofertar=None):
+    """Uma tentativa de busca na sessão informada; falhas saem como exceção"""
+    resultados = {
+        "produto_buscado": produto,
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "produtos_patrocinados": []
+    }
+
+    # Um único prazo para toda a consulta; cada fase espera por condições reais
+    prazo = Prazo(prazo_consulta)
+    fases = CronometroFases()
+    resultados["tempos_fases"] = fases.tempos
+
+    if navegacao == "direto":
+        print(f" Acessando resultados diretamente: {produto}")
+        fases.iniciar("navegacao")
+        driver.get(url_busca_direta(produto))
+    else:
+        print(f" Acessando Google Shopping...")
+        fases.iniciar("navegacao")
+        driver.get(URL_GOOGLE_SHOPPING)
+
+        print(f" Procurando campo de busca...")
+        fases.iniciar("campo_busca")
+        try:
+            campo_busca = campo_busca_pronto(driver, prazo)
+        except TimeoutException:
+            raise FalhaBusca(MARCACAO, "Campo de busca não encontrado")
+
+        print(f" Digitando: {produto}")
+        fases.iniciar("digitacao")
+        campo_busca.clear()
+
+        # Digita o produto caractere por caractere para evitar detecção
+        for char in produto:
+            campo_busca.send_keys(char)
+            if atraso_digitacao:
+                time.sleep(atraso_digitacao)
+
+        valor_do_campo(campo_busca, produto, prazo)
+        campo_busca.send_keys(Keys.ENTER)
+
+    print(" Aguardando resultados carregarem...")
+    fases.iniciar("resultados")
+    try:
+        aguardar_resultados(driver, prazo)
+    except TimeoutException:
+        # Captcha ou consentimento no lugar dos resultados não é "busca sem anúncios"
+        tipo = classificar_texto(driver.current_url, driver.page_source)
+        if tipo:
+            raise FalhaBusca(tipo, f"Página de {tipo} no lugar dos resultados")
+        # Sem cards no prazo: a extração ainda tenta a busca ampla
+        print(" Nenhum card apareceu dentro do prazo")
+
+    print(" Procurando produtos patrocinados...")
+    fases.iniciar("extracao")
+
+    ofertas = resultados["produtos_patrocinados"]
+    vistas = set()
+    limite = limite or (LIMITE_PROFUNDO if profundo else LIMITE_OFERTAS)
+    prazo_rolagem = Prazo(prazo_profundo) if profundo else None
+    passadas = passadas_sem_novos = 0
+    while True:
+        passadas += 1
+        for produto_info in _extrair_passada(driver, estrategia, limite - len(ofertas), resultados):
+            chave = chave_oferta(produto_info)
+            if chave in vistas:
+                continue
+            vistas.add(chave)
+            ofertas.append(produto_info)
+            print(f"✅ Produto {len(ofertas)}: {(produto_info.get('nome') or 'N/A')[:50]}...")
+            if ao_ofertar:
+                ao_ofertar(produto_info)
+            if len(ofertas) >= limite:
+                break
+
+        if not profundo or len(ofertas) >= limite or prazo_rolagem.esgotado():
+            break
+        # Busca profunda: rola para carregar mais cards até o limite ou o prazo
+        fases.iniciar("rolagem")
+        if carregar_mais_resultados(driver, prazo_rolagem):
+            passadas_sem_novos = 0
+        else:
+            passadas_sem_novos += 1
+            if passadas_sem_novos >= 2:
+                break
+        fases.iniciar("extracao")
+    if profundo:
+        resultados["passadas_extracao"] = passadas
+
+    # HTML para depuração apenas quando habilitado e sorteado (MEIU_DEBUG_HTML_AMOSTRA)
+    if deve_capturar_html():
+        salvar_html_debug(driver.page_source)
+
+    fases.encerrar()
+    return resultados
+
+def _extrair_passada(driver, estrategia, limite, resultados):
+    """
+    Ofertas dos cards renderizados nesta passada
+
+    A extração em lote marca os cards já lidos e só devolve os novos; as
+    demais estratégias releem a página e as repetidas são descartadas por
+    quem chama.
+    """
+    if estrategia == "offline":
+        try:
+            with span("extracao_estrategia", estrategia="offline"):
+                produtos = extrair_produtos_html(driver.page_source, limite=limite + len(resultados["produtos_patrocinados"]))
+            resultados["estrategia_extracao"] = "offline"
+            if produtos:
+                return produtos
+        except Exception as e:
+            print(f" Extração offline falhou: {e}")
+    elif estrategia == "lote":
+        try:
+            with span("extracao_estrategia", estrategia="lote"):
+                produtos = extrair_produtos_lote(driver, limite=limite, apenas_novos=True)
+            if produtos or resultados.get("estrategia_extracao") == "lote":
+                resultados["estrategia_extracao"] = "lote"
+                return produtos
+        except Exception as e:
+            print(f" Extração em lote falhou: {e}")
+
+    # Caminho original, um elemento por vez
+    with span("extracao_estrategia", estrategia="elemento"):
+        produtos = extrair_produtos_por_elemento(driver, limite=limite + len(resultados["produtos_patrocinados"]))
+    resultados["estrategia_extracao"] = "elemento"
+    return produtos
+
+def extrair_produtos_por_elemento(driver, limite=20):
+    """Localiza os cards e extrai cada um com extrair_info_produto_melhorado"""
+    # Tenta diferentes padrões de produtos
+    registro = obter_registro_seletores()
+    produtos_encontrados = []
+    for seletor in registro.ordem("produtos"):
+        inicio = time.perf_counter()
+        elementos = driver.find_elements(By.CSS_SELECTOR, seletor)
+        registro.registrar("produtos", seletor, bool(elementos), time.perf_counter() - inicio)
+        if elementos:
+            produtos_encontrados = elementos
+            print(f" Encontrados {len(elementos)} elementos com seletor: {seletor}")
+            break
+    
+    if not produtos_encontrados:
+        print(" Nenhum produto encontrado, tentando busca mais ampla...")
+        produtos_encontrados = driver.find_elements(By.CSS_SELECTOR, SELETOR_PRODUTOS_AMPLO)
+    
+    print(f" Processando {len(produtos_encontrados)} elementos...")
+    
+    produtos = []
+    for i, produto_elem in enumerate(produtos_encontrados[:limite]):
+        try:
+            produto_info = extrair_info_produto_melhorado(produto_elem, driver, i, registro)
+            if produto_info and any(produto_info.values()):
+                produtos.append(produto_info)
+        except Exception as e:
+            continue
+    return finalizar_ofertas(produtos)
+
+def extrair_info_produto_melhorado(elemento, driver, index, registro=None):
+    """
+    Versão melhorada da extração com mais fallbacks; cada subetapa é registrada como span
+
+    As cascatas de nome e preço seguem a ordem do registro adaptativo de
+    seletores, que recebe o acerto ou a falha de cada seletor tentado.
+    """
+    registro = registro or obter_registro_seletores()
     produto_info = {
         "nome": None,
         "preco": None,
@@ -177,33 +453,10 @@ def extrair_info_produto_melhorado(elemento, driver, index):
     }
     
     try:
-        # Debug: imprimir o HTML do elemento para análise
-        if index < 3:  # Só para os primeiros elementos para não poluir
-            try:
-                html_snippet = elemento.get_attribute('outerHTML')[:500]
-                print(f"DEBUG - Elemento {index+1} HTML: {html_snippet}...")
-            except:
-                pass
-        
         # Extração do nome - baseado na estrutura real do Google Shopping
-        seletores_nome = [
-            "span.pymv4e",  # Classe específica vista na imagem
-            "span[class*='pymv4e']",
-            ".pymv4e",
-            "h3", "h4", "h2",
-            "[aria-label]",
-            "[title]",
-            ".sh-np__product-title",
-            ".PLla-d",
-            "a[href] span",
-            "a[href] div",
-            "span[role='link']",
-            "*[class*='title']",
-            "*[class*='name']",
-            "*[class*='product']"
-        ]
-        
-        for seletor in seletores_nome:
+        inicio = time.perf_counter()
+        for seletor in registro.ordem("nome"):
+            inicio_seletor = time.perf_counter()
             try:
                 elementos_nome = elemento.find_elements(By.CSS_SELECTOR, seletor)
                 for elem in elementos_nome:
@@ -217,27 +470,17 @@ def extrair_info_produto_melhorado(elemento, driver, index):
                     ]
                     
                     for texto in textos_possiveis:
-                        if texto and len(texto) > 5 and not texto.startswith('R$'):
-                            # Filtra textos que claramente não são nomes de produto
-                            texto_lower = texto.lower()
-                            filtros_invalidos = [
-                                'custava', 'reais', 'ver mais', 'comprar', 'classificado como',
-                                'estrelas', 'avaliação', 'nota', 'rating', 'review',
-                                'de 5', 'promoção', 'desconto', 'frete', 'de amazon',
-                                'de mercadolivre', 'de pichau', 'de kabum'
-                            ]
-                            
-                            if not any(filtro in texto_lower for filtro in filtros_invalidos):
-                                produto_info["nome"] = texto
-                                break
+                        if nome_valido(texto):
+                            produto_info["nome"] = texto
+                            break
                     
                     if produto_info["nome"]:
                         break
-                
-                if produto_info["nome"]:
-                    break
             except:
-                continue
+                pass
+            registro.registrar("nome", seletor, bool(produto_info["nome"]), time.perf_counter() - inicio_seletor)
+            if produto_info["nome"]:
+                break
         
         # Extração via JavaScript para casos difíceis
         if not produto_info["nome"]:
@@ -294,7 +537,11 @@ def extrair_info_produto_melhorado(elemento, driver, index):
             except:
                 pass
         
+        registrar_span("extracao_nome", time.perf_counter() - inicio, "ok" if produto_info["nome"] else "vazio",
+                       rastrear=False)
+        
         # Extração do preço - versão melhorada baseado na estrutura real
+        inicio = time.perf_counter()
         if not produto_info["preco"]:
             # Força o carregamento de conteúdo dinâmico
             try:
@@ -304,19 +551,8 @@ def extrair_info_produto_melhorado(elemento, driver, index):
                 pass
             
             # Seletores específicos para preços no Google Shopping
-            seletores_preco_especificos = [
-                "div[class*='qptdjc']",  # Classe comum para preços
-                "span[class*='qptdjc']",
-                ".qptdjc",
-                "div[style*='webkit-line-clamp']",  # Preços com truncamento
-                "[class*='13vB']",  # Padrão de classe para preços
-                "[class*='RRDx']",  # Outro padrão comum
-                "[class*='hdYIY']",  # Classe encontrada no debug
-                "div[data-offer-id] span",
-                "div[data-offer-id] div"
-            ]
-            
-            for seletor in seletores_preco_especificos:
+            for seletor in registro.ordem("preco"):
+                inicio_seletor = time.perf_counter()
                 try:
                     elementos_preco = elemento.find_elements(By.CSS_SELECTOR, seletor)
                     for elem_preco in elementos_preco:
@@ -330,21 +566,18 @@ def extrair_info_produto_melhorado(elemento, driver, index):
                         ]
                         
                         for texto_preco in textos_possiveis:
-                            if texto_preco and 'R$' in texto_preco:
-                                import re
-                                # Limpa e valida o preço
-                                match = re.search(r'R\$\s*[\d,.]+', texto_preco)
-                                if match:
-                                    produto_info["preco"] = match.group(0)
-                                    break
+                            preco = extrair_preco_texto(texto_preco)
+                            if preco:
+                                produto_info["preco"] = preco
+                                break
                         
                         if produto_info["preco"]:
                             break
-                    
-                    if produto_info["preco"]:
-                        break
                 except:
-                    continue
+                    pass
+                registro.registrar("preco", seletor, bool(produto_info["preco"]), time.perf_counter() - inicio_seletor)
+                if produto_info["preco"]:
+                    break
         
         # Extração via JavaScript como alternativa
         if not produto_info["preco"]:
@@ -371,24 +604,11 @@ def extrair_info_produto_melhorado(elemento, driver, index):
             except:
                 pass
         
-        # Debug adicional para preços (apenas primeiros elementos)
-        if index < 3:
-            try:
-                # Mostra todos os elementos que contêm R$ para debug
-                elementos_com_rs = elemento.find_elements(By.XPATH, ".//*[contains(text(), 'R$')]")
-                if elementos_com_rs:
-                    print(f"DEBUG - Elementos com R$ encontrados no produto {index+1}:")
-                    for i, elem in enumerate(elementos_com_rs[:3]):  # Mostra apenas os 3 primeiros
-                        try:
-                            texto = elem.text.strip()
-                            classe = elem.get_attribute("class")
-                            print(f"  - Elemento {i+1}: '{texto}' (classe: {classe})")
-                        except:
-                            pass
-            except:
-                pass
+        registrar_span("extracao_preco", time.perf_counter() - inicio, "ok" if produto_info["preco"] else "vazio",
+                       rastrear=False)
         
-        # Extração da loja do link se não encontrou por seletores
+        # Link do card (loja, link canônico e nome pela URL são resolvidos em finalizar_ofertas)
+        inicio = time.perf_counter()
         try:
             # Primeiro tenta encontrar um link
             link_elem = None
@@ -398,58 +618,20 @@ def extrair_info_produto_melhorado(elemento, driver, index):
                 link_elem = elemento.find_element(By.CSS_SELECTOR, "a[href]")
             
             if link_elem:
-                link = link_elem.get_attribute("href")
-                produto_info["link"] = link
-                
-                # Extrai loja do domínio
-                if link:
-                    import re
-                    match = re.search(r'https?://(?:www\.)?([^/]+)', link)
-                    if match:
-                        dominio = match.group(1)
-                        if 'amazon' in dominio:
-                            produto_info["loja"] = "Amazon"
-                        elif 'mercadolivre' in dominio:
-                            produto_info["loja"] = "Mercado Livre"
-                        elif 'pichau' in dominio:
-                            produto_info["loja"] = "Pichau"
-                        elif 'kabum' in dominio:
-                            produto_info["loja"] = "KaBuM!"
-                        else:
-                            # Pega o nome principal do domínio
-                            nome_loja = dominio.split('.')[0].replace('www', '').strip()
-                            if nome_loja:
-                                produto_info["loja"] = nome_loja.capitalize()
+                produto_info["link"] = link_elem.get_attribute("href")
         except:
             pass
+        registrar_span("extracao_link", time.perf_counter() - inicio, "ok" if produto_info["link"] else "vazio",
+                       rastrear=False)
         
-        # Se ainda não tem nome, tenta extrair do link
-        if not produto_info["nome"] and produto_info["link"]:
+        # Preço numérico, parcelamento e preço anterior ("Custava")
+        texto_card = None
+        if produto_info["preco"]:
             try:
-                from urllib.parse import unquote
-                link = unquote(produto_info["link"])
-                
-                # Tenta extrair nome do produto da URL
-                import re
-                patterns = [
-                    r'/([^/]+?)(?:-\d+|/dp/|/p/)',  # Amazon e Mercado Livre
-                    r'/([^/]+?)(?:\?|$)',           # Genérico
-                ]
-                
-                for pattern in patterns:
-                    match = re.search(pattern, link)
-                    if match:
-                        nome_url = match.group(1)
-                        # Limpa e formata o nome
-                        nome_url = nome_url.replace('-', ' ').replace('_', ' ')
-                        nome_url = re.sub(r'%[0-9A-F]{2}', ' ', nome_url)  # Remove códigos URL
-                        nome_url = ' '.join(nome_url.split())  # Remove espaços extras
-                        
-                        if len(nome_url) > 5:
-                            produto_info["nome"] = nome_url
-                            break
+                texto_card = elemento.text
             except:
                 pass
+        produto_info.update(analisar_preco(produto_info["preco"], texto_card))
         
         return produto_info
         
@@ -462,14 +644,7 @@ def extrair_produtos_generico(driver):
     produtos = []
     
     try:
-        seletores_produtos = [
-            ".sh-dgr__content",
-            "[data-docid]",
-            ".PLla-d",
-            ".sh-dlr__list-result"
-        ]
-        
-        for seletor in seletores_produtos:
+        for seletor in SELETORES_PRODUTOS_GENERICO:
             elementos = driver.find_elements(By.CSS_SELECTOR, seletor)
             if elementos:
                 print(f"Encontrados {len(elementos)} produtos com seletor: {seletor}")
@@ -512,6 +687,7 @@ def extrair_produtos_generico(driver):
                             pass
                         
                         if any(produto.values()):
+                            produto.update(analisar_preco(produto["preco"]))
                             produtos.append(produto)
                             
                     except Exception as e:
@@ -523,10 +699,12 @@ def extrair_produtos_generico(driver):
     except Exception as e:
         print(f"Erro na extração genérica: {e}")
     
-    return produtos
+    return finalizar_ofertas(produtos)
 
 def salvar_resultados(resultados, nome_arquivo="resultados_google_shopping.json"):
-    """Salva os resultados em um arquivo JSON"""
+    """Salva os resultados (dicionário ou ResultadoBusca) em um arquivo JSON"""
+    if isinstance(resultados, ResultadoBusca):
+        resultados = resultados.para_dict()
     try:
         with open(nome_arquivo, 'w', encoding='utf-8') as f:
             json.dump(resultados, f, indent=2, ensure_ascii=False)
@@ -536,8 +714,13 @@ def salvar_resultados(resultados, nome_arquivo="resultados_google_shopping.json"
         print(f"Erro ao salvar arquivo: {e}")
         return False
 
-def main(produto_busca):
-    """Função principal"""
+def main(produto_busca, backend=None):
+    """
+    Função principal
+
+    `backend` escolhe a coleta ("http", "selenium" ou "auto"); sem valor,
+    usa a variável de ambiente MEIU_BACKEND.
+    """
     print("=== Buscador de Produtos Google Shopping (Área Patrocinados) ===\n")
     
     #produto_busca = input("Digite o nome do produto que deseja buscar: ").strip()
@@ -550,13 +733,21 @@ def main(produto_busca):
     print("Focando na área de produtos patrocinados...")
     print("Isso pode levar alguns segundos...\n")
     
-    resultados = buscar_produtos_patrocinados(produto_busca)
+    buscador = BuscadorBackends(modo=backend)
+    try:
+        resultados = buscador.buscar(produto_busca)
+    except BuscaAdiada as e:
+        print(f"\n {e}. O Google está bloqueando as buscas; tente novamente mais tarde.")
+        return
+    finally:
+        buscador.fechar()
     
     print(f"\n" + "="*50)
     print(f"RESULTADOS DA BUSCA")
     print(f"="*50)
     print(f"Produto buscado: {resultados['produto_buscado']}")
     print(f"Produtos encontrados: {len(resultados['produtos_patrocinados'])}")
+    print(f"Backend: {resultados.get('backend', 'N/A')}")
     print(f"Timestamp: {resultados['timestamp']}")
     
     if resultados['produtos_patrocinados']:
@@ -578,9 +769,21 @@ def main(produto_busca):
         print("- O Google mudou a estrutura da página")
         print("- Há bloqueios anti-bot ativos")
     
-    nome_arquivo = f"C:\\Users\\amand\\meiu\\monitoramento-inteligente-precos\\resultados\\resultado_{produto_busca.replace(' ', '_').lower().replace('/', '_')}.json"
-    if salvar_resultados(resultados, nome_arquivo):
-        print(f"\n Busca concluída! Verifique o arquivo '{nome_arquivo}' para todos os resultados.")
+    try:
+        historico = obter_historico()
+        with span("salvar_historico"):
+            historico.salvar_buscas([resultados])
+        print(f"\n Busca concluída! Resultados gravados no histórico '{historico.caminho}'.")
+    except Exception as e:
+        print(f"Erro ao gravar histórico: {e}")
+    
+    if "origem_cache" not in resultados:
+        try:
+            for mudanca in obter_detector().processar(resultados):
+                alertas = f" [{', '.join(mudanca['alertas'])}]" if mudanca["alertas"] else ""
+                print(f"Mudança: {mudanca['loja'] or 'Desconhecida'} - {mudanca['tipo']}{alertas}")
+        except Exception as e:
+            print(f"Erro na detecção de mudanças: {e}")
     
     return resultados
 
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Execução concorrente de buscas para listas grandes de produtos
+
+Usado pelo bloco `__main__` de main.py e pelo app Flask. Cada busca roda em
+uma thread com o driver emprestado de um pool compartilhado; cada resultado
+é acrescentado ao relatório `relatorio_buscas_*.jsonl.gz` assim que a busca
+termina (ou, com MEIU_FORMATO_RELATORIO=json, gravado ao final em
+`relatorio_buscas_*.json`).
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+from backends_busca import BuscadorBackends, BackendSelenium
+from historico import obter_historico
+from cache_resultados import obter_cache
+from alertas import obter_detector
+from relatorio_incremental import EscritorRelatorio, EXTENSAO, EXTENSAO_COMPRIMIDA
+from instrumentacao import span, contar
+from tentativas import BuscaAdiada, obter_disjuntor
+
+# Formato dos relatórios gravados: "jsonl.gz" (padrão), "jsonl" ou "json"
+FORMATO_RELATORIO = os.environ.get("MEIU_FORMATO_RELATORIO", "jsonl.gz")
+
+# Vezes que uma busca bloqueada volta para a fila antes de ser registrada com erro
+MAX_ADIAMENTOS = int(os.environ.get("MEIU_MAX_ADIAMENTOS", "3"))
+
+# Folga além do prazo da tarefa antes de abandoná-la (um driver.get em curso não é interrompido)
+FOLGA_TIMEOUT_S = 30
+
+# Mesmo diretório lido por app.py
+RELATORIOS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def resultado_vazio(produto, erro=None):
+    """Resultado de uma busca que não chegou a produzir dados"""
+    resultado = {
+        "produto_buscado": produto,
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "produtos_patrocinados": []
+    }
+    if erro:
+        resultado["erro"] = erro
+    return resultado
+
+
+class MultiBuscador:
+    """
+    Executor de buscas com concorrência limitada
+
+    - `max_threads` buscas simultâneas, reaproveitando navegadores de um
+      PoolDrivers compartilhado;
+    - no máximo `max_pendentes` tarefas enviadas ao executor por vez
+      (backpressure: novas tarefas só entram quando outras terminam);
+    - `timeout_tarefa` segundos por busca, repassados como prazo à própria
+      busca (que encurta tentativas e esperas e termina com TimeoutError);
+      uma busca presa além do prazo mais FOLGA_TIMEOUT_S é abandonada e
+      registrada com erro, e a execução segue;
+    - `cancelar()` interrompe o envio de novas tarefas;
+    - com o disjuntor de bloqueio aberto (tentativas.obter_disjuntor) as
+      tarefas esperam a pausa antes de começar, e uma busca adiada por
+      bloqueio volta para a fila até MAX_ADIAMENTOS vezes.
+
+    Um `buscador` (BuscadorBackends) já aquecido pode ser compartilhado entre
+    execuções; nesse caso ele não é fechado ao final.
+    """
+
+    def __init__(self, backend=None, timeout_tarefa=180, max_pendentes=None, diretorio=None, buscador=None,
+                 historico=None, forcar_atualizacao=False, detector=None):
+        self.backend = backend
+        self.detector = detector
+        self.forcar_atualizacao = forcar_atualizacao
+        self.buscador = buscador
+        self.historico = historico
+        self.timeout_tarefa = timeout_tarefa
+        self.max_pendentes = max_pendentes
+        self.diretorio = diretorio or RELATORIOS_DIR
+        self._cancelado = threading.Event()
+        self.ultimo_relatorio = None
+        self.ultimas_mudancas = []
+
+    def cancelar(self):
+        """Solicita o cancelamento das buscas ainda não iniciadas"""
+        self._cancelado.set()
+
+    def _criar_buscador(self, max_threads):
+        from pool_drivers import PoolDrivers
+
+        pool = PoolDrivers(tamanho=max_threads, aquecer=False)
+        buscador = BuscadorBackends(modo=self.backend, selenium=BackendSelenium(pool_drivers=pool),
+                                    cache=obter_cache())
+        return buscador, pool
+
+    def _fechar_buscador(self, buscador, pool):
+        buscador.fechar()
+        pool.fechar()
+
+    def buscar_em_fluxo(self, produtos, max_threads=3, ordenado=False, ao_ofertar=None):
+        """
+        Gera tuplas (produto, resultado) à medida que as buscas terminam
+
+        Com `ordenado=True` os resultados saem na ordem da lista de entrada.
+        `ao_ofertar(produto, oferta)` é chamado, na thread da busca, para cada
+        oferta assim que ela é extraída.
+        """
+        self._cancelado.clear()
+        max_pendentes = self.max_pendentes or max_threads * 2
+        if self.buscador:
+            buscador, pool = self.buscador, None
+        else:
+            buscador, pool = self._criar_buscador(max_threads)
+        produtos = iter(enumerate(produtos))
+        devolvidos = deque()
+        adiamentos = {}
+        em_andamento = {}
+        inicio_tarefa = {}
+        concluidos = {}
+        proximo_indice = 0
+        disjuntor = obter_disjuntor()
+
+        def executar(indice, produto):
+            # A pausa do disjuntor não conta no prazo da tarefa
+            if not disjuntor.aguardar_liberacao(self._cancelado) or self._cancelado.is_set():
+                return resultado_vazio(produto, erro="cancelado")
+            inicio_tarefa[indice] = time.monotonic()
+            repassar = (lambda oferta: ao_ofertar(produto, oferta)) if ao_ofertar else None
+            return buscador.buscar(produto, forcar=self.forcar_atualizacao, ao_ofertar=repassar,
+                                   prazo=self.timeout_tarefa)
+
+        def enviar(executor):
+            while len(em_andamento) < max_pendentes and not self._cancelado.is_set():
+                if devolvidos:
+                    indice, produto = devolvidos.popleft()
+                else:
+                    try:
+                        indice, produto = next(produtos)
+                    except StopIteration:
+                        return
+                futuro = executor.submit(executar, indice, produto)
+                em_andamento[futuro] = (indice, produto)
+
+        executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="busca")
+        try:
+            enviar(executor)
+            while em_andamento:
+                prontos, _ = wait(list(em_andamento), timeout=1, return_when=FIRST_COMPLETED)
+
+                finalizados = []
+                for futuro in prontos:
+                    indice, produto = em_andamento.pop(futuro)
+                    inicio_tarefa.pop(indice, None)
+                    try:
+                        resultado = futuro.result()
+                    except BuscaAdiada as e:
+                        if not e.recusada:
+                            adiamentos[indice] = adiamentos.get(indice, 0) + 1
+                        if adiamentos.get(indice, 0) <= MAX_ADIAMENTOS:
+                            print(f" {e}; '{produto}' volta para a fila")
+                            contar("meiu_buscas_adiadas_total")
+                            devolvidos.append((indice, produto))
+                            continue
+                        resultado = resultado_vazio(produto, erro="bloqueio")
+                    except Exception as e:
+                        resultado = resultado_vazio(produto, erro=str(e))
+                    finalizados.append((indice, produto, resultado))
+
+                # A busca respeita o próprio prazo; só uma chamada presa passa da folga
+                agora = time.monotonic()
+                for futuro, (indice, produto) in list(em_andamento.items()):
+                    iniciado = inicio_tarefa.get(indice)
+                    if iniciado is not None and agora - iniciado > self.timeout_tarefa + FOLGA_TIMEOUT_S:
+                        em_andamento.pop(futuro)
+                        print(f" Tempo esgotado para '{produto}'")
+                        finalizados.append((indice, produto, resultado_vazio(produto, erro="timeout")))
+
+                for indice, produto, resultado in finalizados:
+                    if ordenado:
+                        concluidos[indice] = (produto, resultado)
+                    else:
+                        yield produto, resultado
+
+                if ordenado:
+                    while proximo_indice in concluidos:
+                        yield concluidos.pop(proximo_indice)
+                        proximo_indice += 1
+
+                enviar(executor)
+        finally:
+            self._cancelado.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            if pool is not None:
+                self._fechar_buscador(buscador, pool)
+
+    def executar_buscas_simultaneas(self, produtos, max_threads=3, ao_concluir=None, ao_ofertar=None):
+        """
+        Busca todos os produtos e grava o relatório agregado
+
+        `ao_concluir(produto, resultado)` é chamado a cada busca finalizada e
+        `ao_ofertar(produto, oferta)` a cada oferta extraída. Produtos
+        repetidos na lista são buscados uma vez só (o relatório tem uma
+        entrada por produto).
+        """
+        inicio = datetime.now()
+        unicos = list(dict.fromkeys(produtos))
+        if len(unicos) < len(produtos):
+            print(f"{len(produtos) - len(unicos)} produtos repetidos ignorados")
+        produtos = unicos
+        print(f"Executando {len(produtos)} buscas com até {max_threads} threads...")
+
+        escritor = None
+        if FORMATO_RELATORIO != "json":
+            escritor = abrir_relatorio_incremental(self.diretorio, inicio, produtos,
+                                                   comprimir=FORMATO_RELATORIO == "jsonl.gz")
+            self.ultimo_relatorio = escritor.caminho
+
+        concluidos = {}
+        try:
+            for produto, resultado in self.buscar_em_fluxo(produtos, max_threads=max_threads,
+                                                            ao_ofertar=ao_ofertar):
+                concluidos[produto] = resultado
+                if escritor:
+                    with span("salvar_relatorio_busca"):
+                        escritor.adicionar(resultado)
+                print(f" Concluído: {produto} ({len(resultado['produtos_patrocinados'])} produtos)")
+                if ao_concluir:
+                    ao_concluir(produto, resultado)
+        except BaseException:
+            # O arquivo incremental fica com as buscas já concluídas
+            if escritor:
+                escritor.fechar()
+            raise
+
+        # O relatório mantém a ordem da lista de entrada
+        resultados_detalhados = {p: concluidos[p] for p in produtos if p in concluidos}
+        fim = datetime.now()
+        relatorio = montar_relatorio(produtos, resultados_detalhados, inicio, fim)
+        with span("salvar_relatorio", formato=FORMATO_RELATORIO):
+            if escritor:
+                escritor.finalizar(relatorio["resumo"])
+                print(f"\nRelatório salvo em: {escritor.caminho}")
+            else:
+                self.ultimo_relatorio = salvar_relatorio(relatorio, self.diretorio, inicio)
+
+        # Todas as buscas do lote entram no histórico em uma única transação
+        try:
+            historico = self.historico or obter_historico()
+            with span("salvar_historico"):
+                historico.registrar_relatorio(os.path.basename(self.ultimo_relatorio), relatorio)
+        except Exception as e:
+            print(f"Erro ao gravar histórico: {e}")
+
+        # Detecção de mudanças apenas para buscas novas (resultados do cache já foram comparados)
+        self.ultimas_mudancas = []
+        try:
+            detector = self.detector or obter_detector()
+            for resultado in resultados_detalhados.values():
+                if "origem_cache" not in resultado:
+                    self.ultimas_mudancas.extend(detector.processar(resultado))
+            alertas = sum(1 for m in self.ultimas_mudancas if m["alertas"])
+            print(f"{len(self.ultimas_mudancas)} mudanças de preço detectadas ({alertas} com alerta)")
+        except Exception as e:
+            print(f"Erro na detecção de mudanças: {e}")
+        return relatorio
+
+
+def montar_relatorio(produtos, resultados_detalhados, inicio, fim):
+    """Monta o relatório no formato lido por app.py"""
+    return {
+        "resumo": {
+            "inicio": inicio.strftime("%Y-%m-%d %H:%M:%S"),
+            "fim": fim.strftime("%Y-%m-%d %H:%M:%S"),
+            "tempo_total_minutos": (fim - inicio).total_seconds() / 60,
+            "total_produtos_buscados": len(produtos),
+            "buscas_sucessos": sum(1 for r in resultados_detalhados.values() if r["produtos_patrocinados"]),
+            "total_produtos_encontrados": sum(len(r["produtos_patrocinados"]) for r in resultados_detalhados.values())
+        },
+        "resultados_detalhados": resultados_detalhados
+    }
+
+
+def _caminhos_relatorio(diretorio, inicio, extensao):
+    """Caminhos candidatos relatorio_buscas_AAAAMMDD_HHMMSS[_N]<extensao>"""
+    base = f"relatorio_buscas_{inicio.strftime('%Y%m%d_%H%M%S')}"
+    sufixo = 0
+    while True:
+        nome = f"{base}{extensao}" if not sufixo else f"{base}_{sufixo}{extensao}"
+        yield os.path.join(diretorio, nome)
+        sufixo += 1
+
+
+def salvar_relatorio(relatorio, diretorio, inicio):
+    """Grava o relatório como relatorio_buscas_AAAAMMDD_HHMMSS.json e retorna o caminho"""
+    for caminho in _caminhos_relatorio(diretorio, inicio, ".json"):
+        try:
+            # Modo 'x' garante que jobs simultâneos nunca gravem no mesmo arquivo
+            with open(caminho, 'x', encoding='utf-8') as f:
+                json.dump(relatorio, f, indent=2, ensure_ascii=False)
+            break
+        except FileExistsError:
+            continue
+    print(f"\nRelatório salvo em: {caminho}")
+    return caminho
+
+
+def abrir_relatorio_incremental(diretorio, inicio, produtos, comprimir=True):
+    """Cria o arquivo do relatório incremental no início do lote e retorna o escritor"""
+    extensao = EXTENSAO_COMPRIMIDA if comprimir else EXTENSAO
+    for caminho in _caminhos_relatorio(diretorio, inicio, extensao):
+        try:
+            return EscritorRelatorio(caminho, produtos=produtos, inicio=inicio.strftime("%Y-%m-%d %H:%M:%S"),
+                                     comprimir=comprimir)
+        except FileExistsError:
+            continue
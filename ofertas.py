@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Modelo compacto de ofertas e resultados de busca
+
+As ofertas circulam como dicionários (nome, preco, loja, link e campos
+numéricos). Em lotes grandes e históricos, cada dicionário repete as chaves e
+cópias dos mesmos textos (lojas, títulos repetidos entre buscas). Aqui:
+
+- Oferta guarda os campos em __slots__, com loja e fonte internadas;
+- LoteOfertas guarda um lote em colunas (array): textos viram índices de uma
+  tabela sem repetição e preços ficam em inteiros de 64 bits. O texto do
+  preço só é guardado quando difere de formatar_centavos(preco_centavos);
+- ResultadoBusca guarda o produto, o timestamp em segundos e o lote.
+
+A serialização binária (serializar/desserializar) grava as colunas como
+estão na memória, para passar resultados entre processos e para disco.
+A conversão para o formato de dicionário/JSON atual (para_dict) não perde
+nada: campos com tipos fora do previsto e chaves desconhecidas seguem em
+`extras`, que precisa ser compatível com JSON.
+
+Comparação de memória e tempo de serialização com um lote sintético:
+    python ofertas.py medir [--ofertas 1000000] [--saida medidas_ofertas.json]
+"""
+
+import argparse
+import calendar
+import json
+import pickle
+import random
+import struct
+import sys
+import time
+from array import array
+from itertools import accumulate
+
+from precos import formatar_centavos
+
+MAGICO = b"MEIU"
+VERSAO_FORMATO = 1
+FORMATO_TIMESTAMP = "%Y-%m-%d %H:%M:%S"
+
+CAMPOS_TEXTO = ("nome", "preco", "loja", "link", "fonte")
+CAMPOS_INTEIROS = ("preco_centavos", "parcelas", "valor_parcela_centavos", "preco_anterior_centavos")
+# Ordem das chaves em para_dict: a mesma da extração
+ORDEM_CAMPOS = ("nome", "preco", "loja", "link", "preco_centavos", "parcelas", "valor_parcela_centavos",
+                "preco_anterior_centavos", "fonte")
+CAMPOS_INTERNADOS = ("loja", "fonte")
+INDICE_CAMPO = {campo: i for i, campo in enumerate(CAMPOS_TEXTO + CAMPOS_INTEIROS)}
+N_TEXTO = len(CAMPOS_TEXTO)
+N_INTEIROS = len(CAMPOS_INTEIROS)
+
+# Marcadores nas colunas: campo ausente do dicionário, valor None e preço derivado dos centavos
+TEXTO_AUSENTE = -1
+TEXTO_NULO = -2
+PRECO_DERIVADO = -3
+INTEIRO_AUSENTE = -2 ** 63
+INTEIRO_NULO = -2 ** 63 + 1
+INTEIRO_MAXIMO = 2 ** 63 - 1
+
+
+class _Ausente:
+    """Marca um campo que não existe no dicionário de origem (diferente de None)"""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return "AUSENTE"
+
+    def __bool__(self):
+        return False
+
+
+AUSENTE = _Ausente()
+
+
+def _inteiro_valido(valor):
+    return type(valor) is int and INTEIRO_AUSENTE + 1 < valor <= INTEIRO_MAXIMO
+
+
+def timestamp_para_segundos(texto):
+    """'2024-05-01 10:00:00' em segundos (lido como UTC); None se o texto não voltar igual"""
+    if not isinstance(texto, str):
+        return None
+    try:
+        segundos = calendar.timegm(time.strptime(texto, FORMATO_TIMESTAMP))
+    except ValueError:
+        return None
+    return segundos if segundos_para_timestamp(segundos) == texto else None
+
+
+def segundos_para_timestamp(segundos):
+    return time.strftime(FORMATO_TIMESTAMP, time.gmtime(segundos))
+
+
+class Oferta:
+    """Uma oferta com campos fixos; `extras` guarda chaves fora do modelo"""
+
+    __slots__ = ORDEM_CAMPOS + ("extras",)
+
+    def __init__(self, extras=None, **campos):
+        for campo in ORDEM_CAMPOS:
+            valor = campos.pop(campo, AUSENTE)
+            if campo in CAMPOS_INTERNADOS and isinstance(valor, str):
+                valor = sys.intern(valor)
+            setattr(self, campo, valor)
+        if campos:
+            raise TypeError(f"Campos desconhecidos: {', '.join(campos)}")
+        self.extras = extras
+
+    @classmethod
+    def de_dict(cls, dados):
+        campos, extras = {}, None
+        for chave, valor in dados.items():
+            if chave in CAMPOS_TEXTO and (valor is None or isinstance(valor, str)):
+                campos[chave] = valor
+            elif chave in CAMPOS_INTEIROS and (valor is None or _inteiro_valido(valor)):
+                campos[chave] = valor
+            else:
+                if extras is None:
+                    extras = {}
+                extras[chave] = valor
+        return cls(extras=extras, **campos)
+
+    def para_dict(self):
+        dados = {}
+        for campo in ORDEM_CAMPOS:
+            valor = getattr(self, campo)
+            if valor is not AUSENTE:
+                dados[campo] = valor
+        if self.extras:
+            dados.update(self.extras)
+        return dados
+
+    def __eq__(self, outra):
+        return isinstance(outra, Oferta) and self.para_dict() == outra.para_dict()
+
+    def __repr__(self):
+        return f"Oferta({self.para_dict()!r})"
+
+
+class LoteOfertas:
+    """
+    Lote de ofertas em arrays
+
+    `indices` tem, para cada oferta, um índice em `textos` por campo de texto
+    (cada texto distinto aparece uma vez no lote) e `inteiros` os campos
+    numéricos em 64 bits, oferta após oferta. `extras` é esparso:
+    {posição: {chave: valor}}. Com `compartilhados` (um dicionário usado por
+    vários lotes), textos iguais em lotes diferentes são o mesmo objeto.
+    """
+
+    __slots__ = ("textos", "indices", "inteiros", "extras", "_indices_textos", "_compartilhados")
+
+    def __init__(self, compartilhados=None):
+        self.textos = []
+        self.indices = array("i")
+        self.inteiros = array("q")
+        self.extras = None
+        self._indices_textos = None
+        self._compartilhados = compartilhados
+
+    def __len__(self):
+        return len(self.indices) // N_TEXTO
+
+    def _indice_texto(self, texto):
+        if self._indices_textos is None:
+            self._indices_textos = {t: i for i, t in enumerate(self.textos)}
+        indice = self._indices_textos.get(texto)
+        if indice is None:
+            if self._compartilhados is not None:
+                texto = self._compartilhados.setdefault(texto, texto)
+            indice = self._indices_textos[texto] = len(self.textos)
+            self.textos.append(texto)
+        return indice
+
+    def adicionar(self, dados):
+        """Acrescenta uma oferta a partir do dicionário"""
+        extras = None
+        for chave in dados:
+            if chave not in INDICE_CAMPO:
+                if extras is None:
+                    extras = {}
+                extras[chave] = dados[chave]
+
+        centavos = dados.get("preco_centavos", AUSENTE)
+        for campo in CAMPOS_INTEIROS:
+            valor = dados.get(campo, AUSENTE)
+            if valor is AUSENTE:
+                self.inteiros.append(INTEIRO_AUSENTE)
+            elif valor is None:
+                self.inteiros.append(INTEIRO_NULO)
+            elif _inteiro_valido(valor):
+                self.inteiros.append(valor)
+            else:
+                self.inteiros.append(INTEIRO_AUSENTE)
+                extras = extras or {}
+                extras[campo] = valor
+
+        for campo in CAMPOS_TEXTO:
+            valor = dados.get(campo, AUSENTE)
+            if valor is AUSENTE:
+                self.indices.append(TEXTO_AUSENTE)
+            elif valor is None:
+                self.indices.append(TEXTO_NULO)
+            elif not isinstance(valor, str):
+                self.indices.append(TEXTO_AUSENTE)
+                extras = extras or {}
+                extras[campo] = valor
+            elif campo == "preco" and _inteiro_valido(centavos) and valor == formatar_centavos(centavos):
+                self.indices.append(PRECO_DERIVADO)
+            else:
+                if campo in CAMPOS_INTERNADOS:
+                    valor = sys.intern(valor)
+                self.indices.append(self._indice_texto(valor))
+
+        if extras:
+            if self.extras is None:
+                self.extras = {}
+            self.extras[len(self) - 1] = extras
+
+    @classmethod
+    def de_dicts(cls, ofertas, compartilhados=None):
+        lote = cls(compartilhados)
+        for oferta in ofertas:
+            lote.adicionar(oferta)
+        # O índice dos textos só serve para montar o lote
+        lote._indices_textos = None
+        return lote
+
+    def campos(self, posicao):
+        """Campos da oferta na posição, na ordem da extração (sem os ausentes)"""
+        textos = self.textos
+        indices = self.indices[posicao * N_TEXTO:(posicao + 1) * N_TEXTO]
+        inteiros = self.inteiros[posicao * N_INTEIROS:(posicao + 1) * N_INTEIROS]
+        valores = {}
+        for campo, indice in zip(CAMPOS_TEXTO, indices):
+            if indice >= 0:
+                valores[campo] = textos[indice]
+            elif indice == TEXTO_NULO:
+                valores[campo] = None
+            elif indice == PRECO_DERIVADO:
+                valores[campo] = formatar_centavos(inteiros[0])
+        for campo, bruto in zip(CAMPOS_INTEIROS, inteiros):
+            if bruto != INTEIRO_AUSENTE:
+                valores[campo] = None if bruto == INTEIRO_NULO else bruto
+        dados = {campo: valores[campo] for campo in ORDEM_CAMPOS if campo in valores}
+        if self.extras and posicao in self.extras:
+            dados.update(self.extras[posicao])
+        return dados
+
+    def __getitem__(self, posicao):
+        if posicao < 0:
+            posicao += len(self)
+        if not 0 <= posicao < len(self):
+            raise IndexError(posicao)
+        return Oferta.de_dict(self.campos(posicao))
+
+    def __iter__(self):
+        for posicao in range(len(self)):
+            yield Oferta.de_dict(self.campos(posicao))
+
+    def para_dicts(self):
+        return [self.campos(posicao) for posicao in range(len(self))]
+
+    def serializar(self):
+        """Bytes do lote: tabela de textos, arrays e extras em JSON"""
+        # Tamanhos em caracteres: a tabela inteira é decodificada de uma vez na leitura
+        tamanhos = array("I", map(len, self.textos))
+        bloco = "".join(self.textos).encode("utf-8", "surrogatepass")
+        indices, inteiros = self.indices, self.inteiros
+        if sys.byteorder == "big":
+            # O formato é little-endian
+            tamanhos.byteswap()
+            indices, inteiros = array("i", indices), array("q", inteiros)
+            indices.byteswap()
+            inteiros.byteswap()
+        extras = json.dumps({str(p): e for p, e in self.extras.items()}, ensure_ascii=False,
+                            separators=(",", ":")).encode("utf-8") if self.extras else b""
+        return b"".join((struct.pack("<IIII", len(self), len(self.textos), len(bloco), len(extras)),
+                         tamanhos.tobytes(), bloco, indices.tobytes(), inteiros.tobytes(), extras))
+
+    @classmethod
+    def desserializar(cls, dados, inicio=0, compartilhados=None):
+        """Lote a partir de `dados[inicio:]`; retorna (lote, posição depois do lote)"""
+        lote = cls(compartilhados)
+        quantidade, n_textos, tamanho_bloco, tamanho_extras = struct.unpack_from("<IIII", dados, inicio)
+        posicao = inicio + 16
+        tamanhos = array("I")
+        tamanhos.frombytes(dados[posicao:posicao + 4 * n_textos])
+        posicao += 4 * n_textos
+        bloco = bytes(dados[posicao:posicao + tamanho_bloco]).decode("utf-8", "surrogatepass")
+        posicao += tamanho_bloco
+        if sys.byteorder == "big":
+            tamanhos.byteswap()
+        fins = list(accumulate(tamanhos))
+        textos = [bloco[i:j] for i, j in zip([0] + fins, fins)]
+        if compartilhados is not None:
+            textos = [compartilhados.setdefault(texto, texto) for texto in textos]
+        lote.textos = textos
+
+        for coluna, n in ((lote.indices, N_TEXTO), (lote.inteiros, N_INTEIROS)):
+            fim = posicao + coluna.itemsize * n * quantidade
+            coluna.frombytes(dados[posicao:fim])
+            if sys.byteorder == "big":
+                coluna.byteswap()
+            posicao = fim
+        if tamanho_extras:
+            extras = json.loads(bytes(dados[posicao:posicao + tamanho_extras]).decode("utf-8"))
+            lote.extras = {int(p): e for p, e in extras.items()}
+            posicao += tamanho_extras
+        return lote, posicao
+
+
+class ResultadoBusca:
+    """Resultado de uma busca: produto, timestamp em segundos e lote de ofertas"""
+
+    __slots__ = ("produto", "timestamp", "ofertas", "extras")
+
+    def __init__(self, produto, timestamp=None, ofertas=None, extras=None):
+        self.produto = produto
+        self.timestamp = timestamp
+        self.ofertas = ofertas
+        self.extras = extras or None
+
+    @classmethod
+    def de_dict(cls, resultados, compartilhados=None):
+        extras = {}
+        produto, timestamp, ofertas = None, None, None
+        for chave, valor in resultados.items():
+            if chave == "produto_buscado" and isinstance(valor, str):
+                produto = valor
+            elif chave == "timestamp" and timestamp_para_segundos(valor) is not None:
+                # Só vira número quando o texto volta idêntico; senão segue em extras
+                timestamp = timestamp_para_segundos(valor)
+            elif chave == "produtos_patrocinados" and isinstance(valor, list):
+                ofertas = LoteOfertas.de_dicts(valor, compartilhados)
+            else:
+                extras[chave] = valor
+        return cls(produto, timestamp, ofertas, extras)
+
+    def para_dict(self):
+        """Dicionário no formato de salvar_resultados e dos templates"""
+        dados = {}
+        if self.produto is not None:
+            dados["produto_buscado"] = self.produto
+        if self.timestamp is not None:
+            dados["timestamp"] = segundos_para_timestamp(self.timestamp)
+        if self.ofertas is not None:
+            dados["produtos_patrocinados"] = self.ofertas.para_dicts()
+        if self.extras:
+            dados.update(self.extras)
+        return dados
+
+    def serializar(self):
+        produto = b"" if self.produto is None else self.produto.encode("utf-8", "surrogatepass")
+        extras = json.dumps(self.extras, ensure_ascii=False, separators=(",", ":")).encode("utf-8") \
+            if self.extras else b""
+        sinalizadores = (self.produto is not None) | (self.timestamp is not None) << 1 | (self.ofertas is not None) << 2
+        partes = [MAGICO, struct.pack("<BBqII", VERSAO_FORMATO, sinalizadores, self.timestamp or 0,
+                                      len(produto), len(extras)), produto, extras]
+        if self.ofertas is not None:
+            partes.append(self.ofertas.serializar())
+        return b"".join(partes)
+
+    @classmethod
+    def desserializar(cls, dados, inicio=0, compartilhados=None):
+        """Resultado a partir de `dados[inicio:]`; retorna (resultado, posição depois dele)"""
+        if dados[inicio:inicio + 4] != MAGICO:
+            raise ValueError("Dados não estão no formato binário de resultados")
+        versao, sinalizadores, timestamp, tamanho_produto, tamanho_extras = struct.unpack_from("<BBqII", dados, inicio + 4)
+        if versao != VERSAO_FORMATO:
+            raise ValueError(f"Versão do formato binário não suportada: {versao}")
+        posicao = inicio + 4 + struct.calcsize("<BBqII")
+        produto = bytes(dados[posicao:posicao + tamanho_produto]).decode("utf-8", "surrogatepass")
+        posicao += tamanho_produto
+        extras = json.loads(bytes(dados[posicao:posicao + tamanho_extras]).decode("utf-8")) if tamanho_extras else None
+        posicao += tamanho_extras
+        ofertas = None
+        if sinalizadores & 4:
+            ofertas, posicao = LoteOfertas.desserializar(dados, posicao, compartilhados)
+        resultado = cls(produto if sinalizadores & 1 else None, timestamp if sinalizadores & 2 else None,
+                        ofertas, extras)
+        return resultado, posicao
+
+
+def serializar_resultado(resultados):
+    """Bytes de um dicionário de resultados (produto_buscado, timestamp, produtos_patrocinados...)"""
+    return ResultadoBusca.de_dict(resultados).serializar()
+
+
+def desserializar_resultado(dados):
+    """Dicionário de resultados a partir dos bytes de serializar_resultado"""
+    return ResultadoBusca.desserializar(dados)[0].para_dict()
+
+
+def serializar_resultados(lista_resultados):
+    """Bytes de vários resultados em sequência (dicionários ou ResultadoBusca)"""
+    return struct.pack("<I", len(lista_resultados)) + b"".join(
+        (r if isinstance(r, ResultadoBusca) else ResultadoBusca.de_dict(r)).serializar() for r in lista_resultados)
+
+
+def ler_resultados(dados, compartilhados=None):
+    """
+    Lista de ResultadoBusca a partir dos bytes de serializar_resultados
+
+    Com `compartilhados` (um dicionário), textos repetidos entre as buscas
+    viram um objeto só, ao custo de uma consulta por texto.
+    """
+    quantidade, = struct.unpack_from("<I", dados, 0)
+    posicao, lista = 4, []
+    for _ in range(quantidade):
+        resultado, posicao = ResultadoBusca.desserializar(dados, posicao, compartilhados)
+        lista.append(resultado)
+    return lista
+
+
+def desserializar_resultados(dados):
+    """Lista de dicionários de resultados a partir dos bytes de serializar_resultados"""
+    return [resultado.para_dict() for resultado in ler_resultados(dados)]
+
+
+# Lote sintético para as medições
+
+LOJAS_SINTETICAS = ["Amazon", "Mercado Livre", "KaBuM!", "Pichau", "Magazine Luiza", "Casas Bahia",
+                    "Americanas", "Carrefour", "Fast Shop", "Shopee", "Terabyte", "Ponto"]
+MARCAS_SINTETICAS = ["Samsung", "Lenovo", "Dell", "Acer", "Asus", "LG", "Philips", "JBL", "Xiaomi", "Motorola"]
+TIPOS_SINTETICOS = ["Notebook", "Smartphone", "Monitor", "Fone Bluetooth", "Smart TV", "Geladeira", "Air Fryer"]
+DETALHES_SINTETICOS = ["8GB 256GB", "16GB 512GB SSD", "4K 55\"", "Frost Free 375L", "Preto", "Inox", "Bivolt",
+                       "Wi-Fi 6", "128GB 5G", "com Cancelamento de Ruído"]
+
+
+def ofertas_sinteticas(quantidade, semente=42, ofertas_por_busca=20):
+    """
+    Gera `quantidade` ofertas em dicionários, como a extração produz
+
+    Os títulos se repetem entre buscas (há cerca de 7 mil combinações), mas
+    cada oferta recebe objetos de texto novos, como acontece ao analisar
+    páginas diferentes. Retorna a lista de resultados de busca.
+    """
+    aleatorio = random.Random(semente)
+    resultados = []
+    for inicio in range(0, quantidade, ofertas_por_busca):
+        ofertas = []
+        for _ in range(min(ofertas_por_busca, quantidade - inicio)):
+            loja = aleatorio.choice(LOJAS_SINTETICAS)
+            centavos = aleatorio.randrange(2_000, 900_000)
+            nome = " ".join((aleatorio.choice(TIPOS_SINTETICOS), aleatorio.choice(MARCAS_SINTETICAS),
+                             aleatorio.choice(DETALHES_SINTETICOS), str(aleatorio.randrange(10))))
+            oferta = {
+                "nome": nome,
+                "preco": formatar_centavos(centavos),
+                # Cópia nova do nome da loja, como sai da análise de cada página
+                "loja": "".join(loja),
+                "link": f"https://www.{loja.lower().replace(' ', '').replace('!', '')}.com.br/p/{aleatorio.randrange(10**8)}",
+                "preco_centavos": centavos,
+            }
+            if aleatorio.random() < 0.4:
+                parcelas = aleatorio.choice((3, 6, 10, 12))
+                oferta["parcelas"] = parcelas
+                oferta["valor_parcela_centavos"] = centavos // parcelas
+            if aleatorio.random() < 0.2:
+                oferta["preco_anterior_centavos"] = centavos + aleatorio.randrange(1_000, 50_000)
+            ofertas.append(oferta)
+        resultados.append({
+            "produto_buscado": f"busca {inicio // ofertas_por_busca}",
+            "timestamp": segundos_para_timestamp(1_700_000_000 + inicio),
+            "produtos_patrocinados": ofertas,
+        })
+    return resultados
+
+
+def _medir_memoria(construir):
+    """Bytes alocados por `construir()` que continuam vivos no retorno"""
+    import gc
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    objeto = construir()
+    depois = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return objeto, depois - antes
+
+
+def _cronometrar(funcao, repeticoes=3):
+    melhor, retorno = None, None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        retorno = funcao()
+        duracao = time.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    return round(melhor, 3), retorno
+
+
+def medir(quantidade=1_000_000, repeticoes=3):
+    """
+    Memória e tempo de serialização de um lote sintético em cada representação
+
+    Memória medida com tracemalloc ao construir cada representação a partir
+    de um lote recém-gerado; tempos são o melhor de `repeticoes` execuções.
+    """
+    medidas = {"ofertas": quantidade}
+
+    resultados, memoria = _medir_memoria(lambda: ofertas_sinteticas(quantidade))
+    medidas["memoria_mb"] = {"dicts": round(memoria / 2 ** 20, 1)}
+    objetos, memoria = _medir_memoria(
+        lambda: [[Oferta.de_dict(o) for o in r["produtos_patrocinados"]] for r in ofertas_sinteticas(quantidade)])
+    medidas["memoria_mb"]["ofertas_slots"] = round(memoria / 2 ** 20, 1)
+    del objetos
+    objetos, memoria = _medir_memoria(lambda: [ResultadoBusca.de_dict(r) for r in ofertas_sinteticas(quantidade)])
+    medidas["memoria_mb"]["lotes_arrays"] = round(memoria / 2 ** 20, 1)
+    del objetos
+
+    def lotes_compartilhados():
+        compartilhados = {}
+        return [ResultadoBusca.de_dict(r, compartilhados) for r in ofertas_sinteticas(quantidade)]
+
+    modelos, memoria = _medir_memoria(lotes_compartilhados)
+    medidas["memoria_mb"]["lotes_arrays_textos_compartilhados"] = round(memoria / 2 ** 20, 1)
+
+    tempos, tamanhos = {}, {}
+    tempos["json_indentado_s"], texto = _cronometrar(
+        lambda: json.dumps(resultados, indent=2, ensure_ascii=False), repeticoes)
+    tempos["json_indentado_leitura_s"], _ = _cronometrar(lambda: json.loads(texto), repeticoes)
+    tamanhos["json_indentado_mb"] = round(len(texto.encode("utf-8")) / 2 ** 20, 1)
+    del texto
+    tempos["json_compacto_s"], texto = _cronometrar(
+        lambda: json.dumps(resultados, ensure_ascii=False, separators=(",", ":")), repeticoes)
+    tempos["json_compacto_leitura_s"], _ = _cronometrar(lambda: json.loads(texto), repeticoes)
+    tamanhos["json_compacto_mb"] = round(len(texto.encode("utf-8")) / 2 ** 20, 1)
+    del texto
+    tempos["pickle_dicts_s"], dados = _cronometrar(lambda: pickle.dumps(resultados, protocol=5), repeticoes)
+    tempos["pickle_dicts_leitura_s"], _ = _cronometrar(lambda: pickle.loads(dados), repeticoes)
+    tamanhos["pickle_dicts_mb"] = round(len(dados) / 2 ** 20, 1)
+    del dados
+
+    tempos["conversao_dicts_para_modelo_s"], _ = _cronometrar(
+        lambda: [ResultadoBusca.de_dict(r) for r in resultados], 1)
+    tempos["binario_s"], dados = _cronometrar(lambda: serializar_resultados(modelos), repeticoes)
+    tempos["binario_leitura_s"], _ = _cronometrar(lambda: ler_resultados(dados), repeticoes)
+    tamanhos["binario_mb"] = round(len(dados) / 2 ** 20, 1)
+    tempos["conversao_modelo_para_dicts_s"], convertidos = _cronometrar(
+        lambda: [m.para_dict() for m in modelos], 1)
+    medidas["tempos"] = tempos
+    medidas["tamanhos"] = tamanhos
+    medidas["sem_perdas"] = convertidos == resultados and desserializar_resultados(dados) == resultados
+    return medidas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Modelo compacto de ofertas e serialização binária")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+    p_medir = subcomandos.add_parser("medir", help="memória e tempo de serialização de um lote sintético")
+    p_medir.add_argument("--ofertas", type=int, default=1_000_000)
+    p_medir.add_argument("--repeticoes", type=int, default=3)
+    p_medir.add_argument("--saida")
+    args = parser.parse_args()
+
+    medidas = medir(args.ofertas, args.repeticoes)
+    print(json.dumps(medidas, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(medidas, f, indent=2, ensure_ascii=False)
+    sys.exit(0 if medidas["sem_perdas"] else 1)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from collections import deque
+
+from recursos_navegador import perfil_persistente_ativo
+from tentativas import TRANSITORIA, FalhaBusca
+
+
+class SessaoDriver:
+    """Sessão do Chrome mantida pelo pool, com contagem de usos"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.usos = 0
+        self.criado_em = time.time()
+
+
+class PoolDrivers:
+    """
+    Pool de sessões headless do Chrome reaproveitadas entre buscas
+
+    Mantém `tamanho` navegadores já iniciados, limpa cookies e abas entre as
+    consultas e recicla o navegador após `max_usos` buscas ou quando o heap
+    JavaScript passa de `max_memoria_mb`. Com perfil persistente
+    (MEIU_PERFIL_CHROME) os cookies são mantidos por padrão, para preservar o
+    estado de consentimento.
+
+    Quem pede um driver com o pool cheio espera até uma sessão ser devolvida
+    ou uma vaga abrir (descarte, reciclagem ou falha ao iniciar o Chrome).
+    Esgotado o `timeout`, levanta FalhaBusca transitória.
+    """
+
+    def __init__(self, tamanho=2, max_usos=50, max_memoria_mb=512, aquecer=True, fabrica=None,
+                 manter_cookies=None):
+        self.tamanho = tamanho
+        self.max_usos = max_usos
+        self.max_memoria_mb = max_memoria_mb
+        if fabrica is None:
+            # Importado aqui para o pool não exigir o Selenium quando recebe outra fábrica
+            from main import configurar_driver
+            fabrica = configurar_driver
+        self.fabrica = fabrica
+        self.manter_cookies = perfil_persistente_ativo() if manter_cookies is None else manter_cookies
+
+        self._livres = deque()
+        self._sessoes = {}
+        # Protege vagas e sessões livres; avisa quem espera quando uma delas muda
+        self._lock = threading.Condition()
+        self._criadas = 0
+        self._fechado = False
+
+        self.estatisticas = {
+            "sessoes_iniciadas": 0,
+            "reusos": 0,
+            "reciclagens": 0,
+            "falhas_saude": 0,
+            "tempo_inicializacao_s": 0.0,
+        }
+
+        if aquecer:
+            self.aquecer()
+
+    def aquecer(self):
+        """Inicia os navegadores até completar o tamanho do pool"""
+        while True:
+            with self._lock:
+                if self._criadas >= self.tamanho:
+                    return
+                self._criadas += 1
+            sessao = self._nova_sessao()
+            if not sessao:
+                # Sem Chrome disponível agora; as vagas serão preenchidas sob demanda
+                return
+            with self._lock:
+                self._livres.append(sessao)
+                self._lock.notify()
+
+    def _nova_sessao(self):
+        """Inicia um novo Chrome e registra o tempo gasto"""
+        inicio = time.time()
+        try:
+            driver = self.fabrica()
+        except Exception:
+            # A vaga reservada por quem chamou precisa voltar ao pool
+            with self._lock:
+                self._criadas -= 1
+                self._lock.notify()
+            raise
+        duracao = time.time() - inicio
+
+        with self._lock:
+            if not driver:
+                self._criadas -= 1
+                self._lock.notify()
+                return None
+            self.estatisticas["sessoes_iniciadas"] += 1
+            self.estatisticas["tempo_inicializacao_s"] += duracao
+            sessao = SessaoDriver(driver)
+            self._sessoes[id(driver)] = sessao
+        print(f" Pool: navegador iniciado em {duracao:.1f}s")
+        return sessao
+
+    def _encerrar(self, sessao):
+        """Fecha o navegador e libera a vaga no pool"""
+        with self._lock:
+            self._sessoes.pop(id(sessao.driver), None)
+            self._criadas -= 1
+            self._lock.notify()
+        try:
+            sessao.driver.quit()
+        except:
+            pass
+
+    def _saudavel(self, sessao):
+        """Verifica se o navegador ainda responde"""
+        try:
+            sessao.driver.current_url
+            return True
+        except:
+            with self._lock:
+                self.estatisticas["falhas_saude"] += 1
+            return False
+
+    def _memoria_mb(self, driver):
+        """Retorna o heap JavaScript usado pela aba em MB (None se indisponível)"""
+        try:
+            usado = driver.execute_script(
+                "return window.performance && performance.memory ? performance.memory.usedJSHeapSize : null;"
+            )
+            return usado / (1024 * 1024) if usado else None
+        except:
+            return None
+
+    def _resetar(self, sessao):
+        """Fecha abas extras, apaga cookies (sem perfil persistente) e volta para uma página em branco"""
+        driver = sessao.driver
+        abas = driver.window_handles
+        for aba in abas[1:]:
+            driver.switch_to.window(aba)
+            driver.close()
+        driver.switch_to.window(abas[0])
+        if not self.manter_cookies:
+            driver.delete_all_cookies()
+        driver.get("about:blank")
+
+    def _precisa_reciclar(self, sessao):
+        if sessao.usos >= self.max_usos:
+            return True
+        memoria = self._memoria_mb(sessao.driver)
+        return memoria is not None and memoria > self.max_memoria_mb
+
+    def adquirir(self, timeout=None):
+        """Empresta um driver do pool, iniciando um novo se houver vaga"""
+        limite = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                while True:
+                    if self._fechado:
+                        raise RuntimeError("Pool de drivers encerrado")
+                    if self._livres:
+                        sessao = self._livres.popleft()
+                        criar = False
+                        break
+                    if self._criadas < self.tamanho:
+                        self._criadas += 1
+                        criar = True
+                        break
+                    restante = None if limite is None else limite - time.monotonic()
+                    if restante is not None and restante <= 0:
+                        raise FalhaBusca(TRANSITORIA, f"Nenhuma sessão do Chrome livre em {timeout:.1f}s")
+                    self._lock.wait(restante)
+
+            if criar:
+                sessao = self._nova_sessao()
+                if not sessao:
+                    raise FalhaBusca(TRANSITORIA, "Não foi possível iniciar o Chrome")
+
+            if not self._saudavel(sessao):
+                self._encerrar(sessao)
+                continue
+
+            if sessao.usos > 0:
+                with self._lock:
+                    self.estatisticas["reusos"] += 1
+            sessao.usos += 1
+            return sessao.driver
+
+    def devolver(self, driver, descartar=False):
+        """Devolve o driver ao pool, reciclando-o se necessário"""
+        sessao = self._sessoes.get(id(driver))
+        if sessao is None:
+            try:
+                driver.quit()
+            except:
+                pass
+            return
+
+        if not descartar and not self._fechado:
+            try:
+                if self._precisa_reciclar(sessao):
+                    with self._lock:
+                        self.estatisticas["reciclagens"] += 1
+                    descartar = True
+                else:
+                    self._resetar(sessao)
+            except:
+                descartar = True
+
+        if descartar or self._fechado:
+            self._encerrar(sessao)
+            return
+
+        with self._lock:
+            self._livres.append(sessao)
+            self._lock.notify()
+
+    def relatorio(self):
+        """Resumo de inicializações e reusos, com estimativa de tempo economizado"""
+        with self._lock:
+            stats = dict(self.estatisticas)
+        iniciadas = stats["sessoes_iniciadas"]
+        media = stats["tempo_inicializacao_s"] / iniciadas if iniciadas else 0.0
+        stats["tempo_medio_inicializacao_s"] = round(media, 3)
+        stats["tempo_economizado_estimado_s"] = round(media * stats["reusos"], 3)
+        return stats
+
+    def fechar(self):
+        """Encerra todos os navegadores do pool"""
+        with self._lock:
+            self._fechado = True
+            livres = list(self._livres)
+            self._livres.clear()
+            # Quem ainda espera por um driver recebe o erro de pool encerrado
+            self._lock.notify_all()
+        for sessao in livres:
+            self._encerrar(sessao)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
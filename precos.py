@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Conversão de preços em texto (pt-BR) para centavos inteiros"""
+
+import re
+
+REGEX_VALOR = re.compile(r'R\$\s*([\d.,]+)')
+REGEX_PARCELAS = re.compile(r'(\d{1,2})\s*x\s*(?:de\s*)?R\$\s*([\d.,]+)', re.IGNORECASE)
+REGEX_PRECO_ANTERIOR = re.compile(r'(?:custava|(?<!x )(?<!x)\bde)\s*:?\s*R\$\s*([\d.,]+)', re.IGNORECASE)
+
+
+def converter_centavos(valor):
+    """
+    Converte '1.234,56', 'R$ 1.234,56' ou '1234' em centavos (123456)
+
+    Vírgula é o separador decimal e ponto o de milhar. Sem vírgula, um ponto
+    seguido de exatamente dois dígitos no final é tratado como decimal.
+    Retorna None quando não há número válido.
+    """
+    if valor is None:
+        return None
+    match = REGEX_VALOR.search(valor)
+    numero = (match.group(1) if match else valor).strip().strip('.,')
+    if not numero or not re.fullmatch(r'[\d.,]+', numero):
+        return None
+
+    if ',' in numero:
+        inteiro, _, decimal = numero.rpartition(',')
+        inteiro = inteiro.replace('.', '').replace(',', '')
+    elif re.search(r'\.\d{2}$', numero) and numero.count('.') == 1:
+        inteiro, _, decimal = numero.partition('.')
+    else:
+        inteiro, decimal = numero.replace('.', ''), ''
+
+    if not inteiro and not decimal:
+        return None
+    decimal = (decimal + '00')[:2]
+    return int(inteiro or '0') * 100 + int(decimal)
+
+
+def centavos_da_oferta(oferta):
+    """Preço em centavos de uma oferta, convertendo o texto quando o campo numérico não existe"""
+    centavos = oferta.get("preco_centavos")
+    return centavos if centavos is not None else converter_centavos(oferta.get("preco"))
+
+
+def formatar_centavos(centavos):
+    """Formata centavos no padrão 'R$ 1.234,56'"""
+    if centavos is None:
+        return None
+    reais, resto = divmod(int(centavos), 100)
+    return f"R$ {reais:,}".replace(',', '.') + f",{resto:02d}"
+
+
+def analisar_preco(preco, texto_card=None):
+    """
+    Campos numéricos de uma oferta
+
+    Retorna `preco_centavos` e, quando o texto do card traz essas
+    informações, `parcelas`, `valor_parcela_centavos` e
+    `preco_anterior_centavos` (o "Custava"/"De R$").
+    """
+    campos = {"preco_centavos": converter_centavos(preco)}
+    if not texto_card:
+        return campos
+
+    match = REGEX_PARCELAS.search(texto_card)
+    if match:
+        campos["parcelas"] = int(match.group(1))
+        campos["valor_parcela_centavos"] = converter_centavos(match.group(2))
+
+    match = REGEX_PRECO_ANTERIOR.search(texto_card)
+    if match:
+        anterior = converter_centavos(match.group(1))
+        if anterior and anterior != campos["preco_centavos"]:
+            campos["preco_anterior_centavos"] = anterior
+    return campos
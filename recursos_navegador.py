@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Política de recursos do Chrome e perfil persistente
+
+A coleta só precisa do texto e dos links do DOM. A política de recursos
+bloqueia, pelo protocolo DevTools (Network.setBlockedURLs), os pedidos de
+imagens, fontes, mídia e scripts de rastreamento/anúncios. A política vem de
+MEIU_POLITICA_RECURSOS: "padrao", "nenhuma" ou o caminho de um JSON no
+formato {"tipos": ["imagem", "fonte", ...], "padroes_url": ["*dominio*", ...]}.
+
+Com MEIU_PERFIL_CHROME apontando para um diretório, cada sessão do Chrome usa
+um user-data-dir persistente (um por sessão simultânea), de modo que recursos
+estáticos em cache e o estado de consentimento são reaproveitados entre
+execuções. O cache em disco é limitado por MEIU_PERFIL_CHROME_MB.
+
+Comparação de bytes transferidos e tempo de carga com e sem bloqueio, contra
+o servidor local de fixtures:
+    python recursos_navegador.py comparar [--repeticoes 3]
+"""
+
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+TAMANHO_JANELA = os.environ.get("MEIU_TAMANHO_JANELA", "1920,1080")
+POLITICA_RECURSOS = os.environ.get("MEIU_POLITICA_RECURSOS", "padrao")
+DIRETORIO_PERFIL = os.environ.get("MEIU_PERFIL_CHROME", "")
+LIMITE_PERFIL_MB = int(os.environ.get("MEIU_PERFIL_CHROME_MB", "200"))
+MAX_PERFIS = 16
+
+# Network.setBlockedURLs só aceita padrões de URL; cada tipo vira as extensões correspondentes
+PADROES_POR_TIPO = {
+    "imagem": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*",
+               "*encrypted-tbn*.gstatic.com*"],
+    "fonte": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*", "*fonts.gstatic.com*"],
+    "midia": ["*.mp4*", "*.webm*", "*.mp3*", "*.m3u8*"],
+    "estilo": ["*.css*"],
+}
+
+PADROES_RASTREAMENTO = [
+    "*googlesyndication.com*", "*doubleclick.net*", "*googleadservices.com*",
+    "*google-analytics.com*", "*googletagmanager.com*", "*/gen_204*", "*/client_204*",
+    "*/log?format=json*", "*facebook.net*", "*hotjar.com*",
+]
+
+POLITICAS = {
+    "nenhuma": {"tipos": [], "padroes_url": []},
+    "padrao": {"tipos": ["imagem", "fonte", "midia"], "padroes_url": PADROES_RASTREAMENTO},
+}
+
+# Subdiretórios descartáveis de um perfil (cache) quando ele passa do limite
+DIRETORIOS_CACHE = ["Default/Cache", "Default/Code Cache", "Default/GPUCache",
+                    "Default/Service Worker/CacheStorage", "Cache"]
+
+_perfis_reservados = {}
+_lock_perfis = threading.Lock()
+
+
+def carregar_politica(nome=None):
+    """Política de recursos pelo nome ("padrao", "nenhuma") ou caminho de um JSON"""
+    nome = nome or POLITICA_RECURSOS
+    if nome in POLITICAS:
+        return POLITICAS[nome]
+    with open(nome, 'r', encoding='utf-8') as f:
+        politica = json.load(f)
+    for tipo in politica.get("tipos", []):
+        if tipo not in PADROES_POR_TIPO:
+            raise ValueError(f"Tipo de recurso desconhecido: {tipo}")
+    return politica
+
+
+def padroes_bloqueados(politica):
+    """Lista de padrões de URL para Network.setBlockedURLs"""
+    padroes = []
+    for tipo in politica.get("tipos", []):
+        padroes.extend(PADROES_POR_TIPO[tipo])
+    padroes.extend(politica.get("padroes_url", []))
+    return padroes
+
+
+def configurar_opcoes(chrome_options, politica=None, perfil=None):
+    """
+    Acrescenta às opções do Chrome o tamanho da janela, o bloqueio de imagens
+    no renderizador e o perfil persistente
+
+    Retorna o diretório de perfil usado (None sem perfil persistente).
+    """
+    politica = politica if politica is not None else carregar_politica()
+    chrome_options.add_argument(f"--window-size={TAMANHO_JANELA}")
+    if "imagem" in politica.get("tipos", []):
+        # Evita até a decodificação de imagens embutidas (data:) que o bloqueio por URL não alcança
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+
+    perfil = perfil if perfil is not None else reservar_perfil()
+    if perfil:
+        chrome_options.add_argument(f"--user-data-dir={perfil}")
+        chrome_options.add_argument(f"--disk-cache-size={LIMITE_PERFIL_MB * 1024 * 1024}")
+    return perfil
+
+
+def aplicar_politica(driver, politica=None):
+    """Ativa o bloqueio de URLs da política na sessão pelo protocolo DevTools"""
+    politica = politica if politica is not None else carregar_politica()
+    padroes = padroes_bloqueados(politica)
+    if not padroes:
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": padroes})
+    except Exception as e:
+        print(f" Bloqueio de recursos indisponível: {e}")
+
+
+def _tamanho_diretorio(caminho):
+    total = 0
+    for raiz, _, arquivos in os.walk(caminho):
+        for arquivo in arquivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, arquivo))
+            except OSError:
+                pass
+    return total
+
+
+def _em_uso(perfil):
+    # O Chrome mantém o link SingletonLock no user-data-dir enquanto está aberto
+    return os.path.lexists(os.path.join(perfil, "SingletonLock"))
+
+
+def limitar_perfil(perfil, limite_mb=LIMITE_PERFIL_MB):
+    """Apaga o cache de um perfil fechado que passou do limite de tamanho"""
+    if _tamanho_diretorio(perfil) <= limite_mb * 1024 * 1024:
+        return False
+    for subdiretorio in DIRETORIOS_CACHE:
+        shutil.rmtree(os.path.join(perfil, subdiretorio), ignore_errors=True)
+    print(f" Perfil {perfil} acima de {limite_mb} MB: cache descartado")
+    return True
+
+
+def reservar_perfil(diretorio=DIRETORIO_PERFIL):
+    """
+    Escolhe um perfil persistente livre para uma nova sessão
+
+    Cada sessão simultânea precisa do próprio user-data-dir; um perfil é
+    considerado livre quando não tem o SingletonLock do Chrome e não foi
+    reservado há pouco por outra thread deste processo.
+    """
+    if not diretorio:
+        return None
+    agora = time.monotonic()
+    with _lock_perfis:
+        for i in range(MAX_PERFIS):
+            perfil = os.path.abspath(os.path.join(diretorio, f"sessao_{i}"))
+            reservado = _perfis_reservados.get(perfil)
+            if reservado and agora - reservado < 60 and not _em_uso(perfil):
+                continue  # reservado por outra thread, Chrome ainda iniciando
+            if _em_uso(perfil):
+                continue
+            os.makedirs(perfil, exist_ok=True)
+            _perfis_reservados[perfil] = agora
+            break
+        else:
+            print(" Todos os perfis persistentes estão em uso; usando perfil temporário")
+            return None
+    limitar_perfil(perfil)
+    return perfil
+
+
+def perfil_persistente_ativo():
+    return bool(DIRETORIO_PERFIL)
+
+
+# Métricas de carga lidas da própria página
+SCRIPT_METRICAS_CARGA = """
+const nav = performance.getEntriesByType('navigation')[0] || {};
+const recursos = performance.getEntriesByType('resource');
+let bytes = nav.transferSize || 0;
+for (const r of recursos) { bytes += r.transferSize || 0; }
+return {
+    bytes_transferidos: bytes,
+    recursos: recursos.length,
+    carga_ms: nav.loadEventEnd ? Math.round(nav.loadEventEnd - nav.startTime) : null,
+    dom_ms: nav.domContentLoadedEventEnd ? Math.round(nav.domContentLoadedEventEnd - nav.startTime) : null
+};
+"""
+
+
+def comparar_politicas(repeticoes=3, politicas=("nenhuma", "padrao")):
+    """
+    Mede bytes transferidos e tempo de carga das páginas do corpus com cada
+    política, com perfil temporário e com perfil persistente (segunda visita)
+    """
+    import tempfile
+    from selenium.webdriver.chrome.options import Options
+    from benchmark import ServidorCorpus, carregar_corpus
+    from main import _iniciar_chrome
+
+    corpus = carregar_corpus()
+    relatorio = {}
+    with ServidorCorpus(corpus, com_recursos=True) as servidor:
+        for nome_politica in politicas:
+            politica = carregar_politica(nome_politica)
+            for modo_perfil in ("temporario", "persistente"):
+                perfil = tempfile.mkdtemp(prefix="meiu_perfil_") if modo_perfil == "persistente" else ""
+                medidas = []
+                for _ in range(repeticoes):
+                    opcoes = Options()
+                    driver = _iniciar_chrome(opcoes, politica=politica, perfil=perfil)
+                    if driver is None:
+                        return {"erro": "Não foi possível iniciar o Chrome"}
+                    try:
+                        for pagina in corpus:
+                            driver.get(servidor.url_busca.format(consulta=pagina["consulta"].replace(" ", "+")))
+                            medidas.append(driver.execute_script(SCRIPT_METRICAS_CARGA))
+                    finally:
+                        driver.quit()
+                if perfil:
+                    shutil.rmtree(perfil, ignore_errors=True)
+                cargas = [m["carga_ms"] for m in medidas if m["carga_ms"] is not None]
+                relatorio[f"{nome_politica}/{modo_perfil}"] = {
+                    "paginas": len(medidas),
+                    "bytes_medios": round(sum(m["bytes_transferidos"] for m in medidas) / len(medidas)),
+                    "recursos_medios": round(sum(m["recursos"] for m in medidas) / len(medidas), 1),
+                    "carga_media_ms": round(sum(cargas) / len(cargas), 1) if cargas else None,
+                }
+    return relatorio
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "comparar":
+        print(__doc__)
+        sys.exit(1)
+    repeticoes = int(sys.argv[sys.argv.index("--repeticoes") + 1]) if "--repeticoes" in sys.argv else 3
+    resultado = comparar_politicas(repeticoes=repeticoes)
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
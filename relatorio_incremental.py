@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Formato de relatório incremental (JSON por linha, com índice de deslocamentos)
+
+O relatório é gravado uma busca por vez, à medida que cada produto termina:
+um cabeçalho, um registro por produto e o resumo ao final. Com compressão,
+cada registro é um membro gzip independente; o arquivo inteiro continua
+sendo um .gz válido de JSON por linha, e cada registro pode ser lido
+isoladamente. Um índice ao lado (`.idx`) guarda o deslocamento e o tamanho
+de cada registro, para ler um produto via mmap sem analisar o restante.
+Um lote interrompido deixa o cabeçalho e os produtos já concluídos.
+
+Uso:
+    python relatorio_incremental.py converter relatorio.json [--sem-compressao]
+    python relatorio_incremental.py exportar relatorio.jsonl.gz [saida.json]
+    python relatorio_incremental.py comparar relatorio.json
+"""
+
+import gzip
+import json
+import mmap
+import os
+import sys
+import threading
+import time
+import zlib
+
+VERSAO_FORMATO = 1
+EXTENSAO = ".jsonl"
+EXTENSAO_COMPRIMIDA = ".jsonl.gz"
+EXTENSAO_INDICE = ".idx"
+
+
+def e_relatorio_incremental(caminho):
+    return caminho.endswith((EXTENSAO, EXTENSAO_COMPRIMIDA))
+
+
+def resumo_dos_resultados(resultados_detalhados, inicio=None, fim=None, total_buscados=None):
+    """Resumo no formato de relatorio_buscas_*.json, calculado a partir das buscas"""
+    resumo = {
+        "inicio": inicio,
+        "fim": fim,
+        "tempo_total_minutos": None,
+        "total_produtos_buscados": total_buscados if total_buscados is not None else len(resultados_detalhados),
+        "buscas_sucessos": sum(1 for r in resultados_detalhados.values() if r.get("produtos_patrocinados")),
+        "total_produtos_encontrados": sum(len(r.get("produtos_patrocinados", [])) for r in resultados_detalhados.values())
+    }
+    if inicio and fim:
+        formato = "%Y-%m-%d %H:%M:%S"
+        try:
+            duracao = time.mktime(time.strptime(fim, formato)) - time.mktime(time.strptime(inicio, formato))
+            resumo["tempo_total_minutos"] = duracao / 60
+        except ValueError:
+            pass
+    return resumo
+
+
+class EscritorRelatorio:
+    """
+    Grava um relatório incremental, um registro por vez
+
+    O arquivo é criado em modo exclusivo; cada registro é gravado e
+    descarregado antes de sua entrada no índice.
+    """
+
+    def __init__(self, caminho, produtos=None, inicio=None, comprimir=True):
+        self.caminho = caminho
+        self.comprimir = comprimir
+        self._arquivo = open(caminho, 'xb')
+        self._indice = open(caminho + EXTENSAO_INDICE, 'w', encoding='utf-8')
+        self._lock = threading.Lock()
+        self.finalizado = False
+        self._gravar({
+            "tipo": "cabecalho",
+            "versao": VERSAO_FORMATO,
+            "inicio": inicio or time.strftime("%Y-%m-%d %H:%M:%S"),
+            "produtos": list(produtos or []),
+        })
+
+    def _codificar(self, registro):
+        dados = (json.dumps(registro, ensure_ascii=False) + "\n").encode('utf-8')
+        return gzip.compress(dados, compresslevel=6, mtime=0) if self.comprimir else dados
+
+    def _gravar(self, registro, chave=None):
+        dados = self._codificar(registro)
+        with self._lock:
+            deslocamento = self._arquivo.tell()
+            self._arquivo.write(dados)
+            self._arquivo.flush()
+            entrada = [registro["tipo"], deslocamento, len(dados)]
+            if chave is not None:
+                entrada.append(chave)
+            self._indice.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+            self._indice.flush()
+
+    def adicionar(self, resultado):
+        """Acrescenta o resultado de uma busca"""
+        self._gravar({"tipo": "busca", "resultado": resultado}, chave=resultado["produto_buscado"])
+
+    def finalizar(self, resumo):
+        """Grava o resumo e fecha o arquivo"""
+        if not self.finalizado:
+            self._gravar({"tipo": "resumo", "resumo": resumo})
+            self.fechar()
+
+    def fechar(self):
+        with self._lock:
+            if not self._arquivo.closed:
+                os.fsync(self._arquivo.fileno())
+                self._arquivo.close()
+                self._indice.close()
+        self.finalizado = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+def _reconstruir_indice(dados, comprimido):
+    """Índice obtido varrendo o arquivo (quando o .idx não existe ou está incompleto)"""
+    entradas = []
+    deslocamento = 0
+    while deslocamento < len(dados):
+        if comprimido:
+            descompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            try:
+                linha = descompressor.decompress(dados[deslocamento:])
+            except zlib.error:
+                break
+            if not descompressor.eof:
+                break  # último registro truncado
+            tamanho = len(dados) - deslocamento - len(descompressor.unused_data)
+        else:
+            fim = dados.find(b"\n", deslocamento)
+            if fim < 0:
+                break
+            linha = dados[deslocamento:fim + 1]
+            tamanho = len(linha)
+        try:
+            registro = json.loads(linha)
+        except ValueError:
+            break
+        entrada = [registro["tipo"], deslocamento, tamanho]
+        if registro["tipo"] == "busca":
+            entrada.append(registro["resultado"]["produto_buscado"])
+        entradas.append(entrada)
+        deslocamento += tamanho
+    return entradas
+
+
+class LeitorRelatorio:
+    """Acesso aleatório a um relatório incremental via mmap e índice"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.comprimido = caminho.endswith(".gz")
+        with open(caminho, 'rb') as f:
+            tamanho = os.fstat(f.fileno()).st_size
+            self._dados = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if tamanho else b""
+        self._entradas = self._carregar_indice()
+        self._por_produto = {e[3]: e for e in self._entradas if e[0] == "busca"}
+        self._cabecalho = self._ler(self._entradas[0]) if self._entradas else {}
+
+    def _carregar_indice(self):
+        entradas = []
+        try:
+            with open(self.caminho + EXTENSAO_INDICE, 'r', encoding='utf-8') as f:
+                for linha in f:
+                    entradas.append(json.loads(linha))
+        except (OSError, ValueError):
+            return _reconstruir_indice(self._dados, self.comprimido)
+        # O índice precisa cobrir exatamente o arquivo (um registro pode ter sido
+        # gravado sem a sua entrada se o processo caiu entre as duas escritas)
+        fim = entradas[-1][1] + entradas[-1][2] if entradas else 0
+        if fim != len(self._dados):
+            return _reconstruir_indice(self._dados, self.comprimido)
+        return entradas
+
+    def _ler(self, entrada):
+        dados = self._dados[entrada[1]:entrada[1] + entrada[2]]
+        if self.comprimido:
+            dados = gzip.decompress(dados)
+        return json.loads(dados)
+
+    def fechar(self):
+        if isinstance(self._dados, mmap.mmap):
+            self._dados.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    @property
+    def completo(self):
+        """False quando o lote foi interrompido antes do resumo"""
+        return bool(self._entradas) and self._entradas[-1][0] == "resumo"
+
+    def produtos(self):
+        """Produtos na ordem da lista de entrada (os concluídos de fato)"""
+        ordem = [p for p in self._cabecalho.get("produtos", []) if p in self._por_produto]
+        vistos = set(ordem)
+        return ordem + [p for p in self._por_produto if p not in vistos]
+
+    def resultado(self, produto):
+        """Resultado de um produto, lendo apenas o seu registro (None se ausente)"""
+        entrada = self._por_produto.get(produto)
+        return self._ler(entrada)["resultado"] if entrada else None
+
+    def resumo(self):
+        """Resumo gravado ao final, ou recalculado quando o lote foi interrompido"""
+        if self.completo:
+            return self._ler(self._entradas[-1])["resumo"]
+        resultados = {p: self.resultado(p) for p in self.produtos()}
+        return resumo_dos_resultados(resultados, inicio=self._cabecalho.get("inicio"),
+                                     total_buscados=len(self._cabecalho.get("produtos", [])) or None)
+
+    def como_dict(self):
+        """Relatório completo no formato de relatorio_buscas_*.json"""
+        resultados = {p: self.resultado(p) for p in self.produtos()}
+        return {"resumo": self.resumo(), "resultados_detalhados": resultados}
+
+
+def carregar_relatorio_arquivo(caminho):
+    """Relatório no formato de relatorio_buscas_*.json a partir de qualquer um dos dois formatos"""
+    if e_relatorio_incremental(caminho):
+        with LeitorRelatorio(caminho) as leitor:
+            return leitor.como_dict()
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def json_para_incremental(caminho_json, caminho_saida=None, comprimir=True):
+    """Converte relatorio_buscas_*.json para o formato incremental; retorna o caminho gerado"""
+    with open(caminho_json, 'r', encoding='utf-8') as f:
+        relatorio = json.load(f)
+    if caminho_saida is None:
+        caminho_saida = os.path.splitext(caminho_json)[0] + (EXTENSAO_COMPRIMIDA if comprimir else EXTENSAO)
+    resultados = relatorio.get("resultados_detalhados", {})
+    with EscritorRelatorio(caminho_saida, produtos=resultados, inicio=relatorio.get("resumo", {}).get("inicio"),
+                           comprimir=comprimir) as escritor:
+        for resultado in resultados.values():
+            escritor.adicionar(resultado)
+        escritor.finalizar(relatorio.get("resumo", {}))
+    return caminho_saida
+
+
+def incremental_para_json(caminho, caminho_saida=None):
+    """Converte um relatório incremental para o layout de relatorio_buscas_*.json"""
+    if caminho_saida is None:
+        base = caminho[:-len(EXTENSAO_COMPRIMIDA)] if caminho.endswith(EXTENSAO_COMPRIMIDA) else os.path.splitext(caminho)[0]
+        caminho_saida = base + ".json"
+    relatorio = carregar_relatorio_arquivo(caminho)
+    with open(caminho_saida, 'x', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    return caminho_saida
+
+
+def _cronometrar(funcao, repeticoes=5):
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        decorrido = time.perf_counter() - inicio
+        melhor = decorrido if melhor is None else min(melhor, decorrido)
+    return melhor
+
+
+def comparar_formatos(caminho_json, diretorio_temporario=None):
+    """
+    Compara tamanho e tempo de leitura entre o JSON indentado e o formato incremental
+
+    Mede o carregamento completo e a leitura de um único produto (o do meio).
+    """
+    import tempfile
+
+    with tempfile.TemporaryDirectory(dir=diretorio_temporario) as temporario:
+        base = os.path.join(temporario, os.path.splitext(os.path.basename(caminho_json))[0])
+        gerados = {
+            "jsonl": json_para_incremental(caminho_json, base + EXTENSAO, comprimir=False),
+            "jsonl.gz": json_para_incremental(caminho_json, base + EXTENSAO_COMPRIMIDA, comprimir=True),
+        }
+        with open(caminho_json, 'r', encoding='utf-8') as f:
+            produtos = list(json.load(f).get("resultados_detalhados", {}))
+        alvo = produtos[len(produtos) // 2] if produtos else None
+
+        def um_produto_json():
+            with open(caminho_json, 'r', encoding='utf-8') as f:
+                return json.load(f)["resultados_detalhados"].get(alvo)
+
+        def um_produto_incremental(caminho):
+            with LeitorRelatorio(caminho) as leitor:
+                return leitor.resultado(alvo)
+
+        linhas = [{
+            "formato": "json",
+            "bytes": os.path.getsize(caminho_json),
+            "carregar_tudo_ms": 1000 * _cronometrar(lambda: carregar_relatorio_arquivo(caminho_json)),
+            "um_produto_ms": 1000 * _cronometrar(um_produto_json),
+        }]
+        for formato, caminho in gerados.items():
+            linhas.append({
+                "formato": formato,
+                "bytes": os.path.getsize(caminho) + os.path.getsize(caminho + EXTENSAO_INDICE),
+                "carregar_tudo_ms": 1000 * _cronometrar(lambda: carregar_relatorio_arquivo(caminho)),
+                "um_produto_ms": 1000 * _cronometrar(lambda: um_produto_incremental(caminho)),
+            })
+    return linhas
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("converter", "exportar", "comparar"):
+        print(__doc__)
+        sys.exit(1)
+
+    comando, caminho = sys.argv[1], sys.argv[2]
+    if comando == "converter":
+        print(f"Gerado: {json_para_incremental(caminho, comprimir='--sem-compressao' not in sys.argv)}")
+    elif comando == "exportar":
+        print(f"Gerado: {incremental_para_json(caminho, sys.argv[3] if len(sys.argv) > 3 else None)}")
+    else:
+        print(f"{'formato':<10} {'bytes':>12} {'tudo (ms)':>12} {'1 produto (ms)':>16}")
+        for linha in comparar_formatos(caminho):
+            print(f"{linha['formato']:<10} {linha['bytes']:>12} {linha['carregar_tudo_ms']:>12.2f} "
+                  f"{linha['um_produto_ms']:>16.2f}")
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registro adaptativo de seletores
+
+As cascatas de localização (campo de busca e cards) são tentadas na ordem
+do melhor desempenho observado: acertos, falhas e latência de cada seletor
+são registrados e persistidos em dados/seletores_estatisticas.json. Quando o
+Google muda a marcação, o seletor que passou a funcionar sobe para o início
+da lista em poucas consultas. A cada `intervalo_sondagem` usos de uma dessas
+cascatas, o seletor rebaixado menos testado é colocado na frente uma vez,
+para que um seletor que volte a funcionar seja redescoberto.
+
+As cascatas de valores (nome e preço) mantêm a ordem curada: ali um "acerto"
+só quer dizer que algum texto casou (uma parcela "10x de R$ 249,99" também
+tem "R$"), e promover um seletor genérico trocaria o valor extraído. Os
+acertos delas continuam registrados, apenas para o relatório.
+
+As cascatas podem ser substituídas sem mudar o código em um arquivo JSON
+(MEIU_ARQUIVO_SELETORES, padrão dados/seletores.json) no formato
+{"produtos": ["seletor", ...], "nome": [...]}; o arquivo é relido quando muda.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+
+from extracao import SELETORES_BUSCA, SELETORES_PRODUTOS, SELETORES_NOME, SELETORES_PRECO
+from historico import DATA_DIR
+
+ARQUIVO_ESTATISTICAS = os.path.join(DATA_DIR, "seletores_estatisticas.json")
+ARQUIVO_SELETORES = os.environ.get("MEIU_ARQUIVO_SELETORES", os.path.join(DATA_DIR, "seletores.json"))
+
+CASCATAS_PADRAO = {
+    "busca": SELETORES_BUSCA,
+    "produtos": SELETORES_PRODUTOS,
+    "nome": SELETORES_NOME,
+    "preco": SELETORES_PRECO,
+}
+
+# Cascatas em que qualquer seletor que casa é equivalente; só estas são reordenadas
+CASCATAS_ADAPTATIVAS = ("busca", "produtos")
+
+INTERVALO_SONDAGEM = 25
+INTERVALO_GRAVACAO = 30        # segundos entre gravações das estatísticas
+INTERVALO_RELEITURA = 5        # segundos entre verificações do arquivo de seletores
+
+
+class RegistroSeletores:
+    """Ordena cada cascata pelo desempenho observado e registra acertos e falhas"""
+
+    def __init__(self, arquivo_estatisticas=ARQUIVO_ESTATISTICAS, arquivo_seletores=ARQUIVO_SELETORES,
+                 intervalo_sondagem=INTERVALO_SONDAGEM):
+        self.arquivo_estatisticas = arquivo_estatisticas
+        self.arquivo_seletores = arquivo_seletores
+        self.intervalo_sondagem = intervalo_sondagem
+        self.cascatas = {nome: list(seletores) for nome, seletores in CASCATAS_PADRAO.items()}
+        self.estatisticas = {}
+        self._usos = {}
+        self._lock = threading.Lock()
+        self._alterado = False
+        self._ultima_gravacao = time.monotonic()
+        self._ultima_verificacao = 0.0
+        self._mtime_seletores = None
+        self._carregar_estatisticas()
+        self._recarregar_seletores()
+
+    def _carregar_estatisticas(self):
+        try:
+            with open(self.arquivo_estatisticas, 'r', encoding='utf-8') as f:
+                self.estatisticas = json.load(f)
+        except (OSError, ValueError):
+            self.estatisticas = {}
+
+    def _recarregar_seletores(self):
+        """Relê o arquivo de seletores se ele mudou desde a última leitura"""
+        self._ultima_verificacao = time.monotonic()
+        try:
+            mtime = os.path.getmtime(self.arquivo_seletores)
+        except OSError:
+            return
+        if mtime == self._mtime_seletores:
+            return
+        try:
+            with open(self.arquivo_seletores, 'r', encoding='utf-8') as f:
+                configuradas = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Erro ao ler seletores de {self.arquivo_seletores}: {e}")
+            return
+        self._mtime_seletores = mtime
+        for nome, seletores in configuradas.items():
+            if isinstance(seletores, list) and seletores:
+                self.cascatas[nome] = [str(s) for s in seletores]
+        print(f" Seletores recarregados de {self.arquivo_seletores}")
+
+    def _pontuacao(self, cascata, seletor, posicao):
+        stats = self.estatisticas.get(cascata, {}).get(seletor)
+        if not stats:
+            return (-0.5, 0.0, posicao)
+        tentativas = stats["acertos"] + stats["falhas"]
+        taxa = (stats["acertos"] + 1) / (tentativas + 2)
+        latencia = stats["tempo_total_s"] / tentativas if tentativas else 0.0
+        return (-taxa, latencia, posicao)
+
+    def _ordenar(self, cascata):
+        # Chamado com o lock adquirido
+        seletores = self.cascatas.get(cascata, [])
+        if cascata not in CASCATAS_ADAPTATIVAS:
+            return list(seletores)
+        return [s for _, s in sorted((self._pontuacao(cascata, s, i), s) for i, s in enumerate(seletores))]
+
+    def ordem(self, cascata):
+        """Seletores da cascata: por desempenho em busca/produtos, na ordem curada em nome/preço"""
+        with self._lock:
+            if time.monotonic() - self._ultima_verificacao >= INTERVALO_RELEITURA:
+                self._recarregar_seletores()
+            ordenados = self._ordenar(cascata)
+            if cascata not in CASCATAS_ADAPTATIVAS:
+                return ordenados
+
+            usos = self._usos[cascata] = self._usos.get(cascata, 0) + 1
+            if self.intervalo_sondagem and usos % self.intervalo_sondagem == 0 and len(ordenados) > 1:
+                # Sondagem: o seletor rebaixado menos testado vai para a frente uma vez
+                stats = self.estatisticas.get(cascata, {})
+                sondado = min(ordenados[1:], key=lambda s: sum(stats.get(s, {}).get(c, 0) for c in ("acertos", "falhas")))
+                ordenados.remove(sondado)
+                ordenados.insert(0, sondado)
+            return ordenados
+
+    def registrar(self, cascata, seletor, acertou, duracao=0.0):
+        """Registra o resultado de uma tentativa com o seletor"""
+        with self._lock:
+            stats = self.estatisticas.setdefault(cascata, {}).setdefault(
+                seletor, {"acertos": 0, "falhas": 0, "tempo_total_s": 0.0})
+            stats["acertos" if acertou else "falhas"] += 1
+            stats["tempo_total_s"] = round(stats["tempo_total_s"] + duracao, 6)
+            self._alterado = True
+            gravar = time.monotonic() - self._ultima_gravacao >= INTERVALO_GRAVACAO
+        if gravar:
+            self.salvar()
+
+    def registrar_cascata(self, cascata, tentados, vencedor):
+        """Registra uma passada pela cascata: falha para os tentados antes do vencedor (None = nenhum)"""
+        for seletor in tentados:
+            if seletor == vencedor:
+                self.registrar(cascata, seletor, True)
+                return
+            self.registrar(cascata, seletor, False)
+
+    def relatorio(self):
+        """Taxa de acerto e latência média de cada seletor, na ordem atual de cada cascata"""
+        relatorio = {}
+        for cascata in list(self.cascatas):
+            with self._lock:
+                stats = self.estatisticas.get(cascata, {})
+                seletores = self._ordenar(cascata)
+                relatorio[cascata] = []
+                for seletor in seletores:
+                    dados = stats.get(seletor, {"acertos": 0, "falhas": 0, "tempo_total_s": 0.0})
+                    tentativas = dados["acertos"] + dados["falhas"]
+                    relatorio[cascata].append({
+                        "seletor": seletor,
+                        "acertos": dados["acertos"],
+                        "falhas": dados["falhas"],
+                        "taxa_acerto": round(dados["acertos"] / tentativas, 3) if tentativas else None,
+                        "latencia_media_ms": round(1000 * dados["tempo_total_s"] / tentativas, 2) if tentativas else None,
+                    })
+        return relatorio
+
+    def salvar(self):
+        """Grava as estatísticas se houve mudança desde a última gravação"""
+        with self._lock:
+            if not self._alterado:
+                return
+            conteudo = json.dumps(self.estatisticas, ensure_ascii=False, indent=1)
+            self._alterado = False
+            self._ultima_gravacao = time.monotonic()
+        try:
+            os.makedirs(os.path.dirname(self.arquivo_estatisticas), exist_ok=True)
+            temporario = self.arquivo_estatisticas + ".tmp"
+            with open(temporario, 'w', encoding='utf-8') as f:
+                f.write(conteudo)
+            os.replace(temporario, self.arquivo_estatisticas)
+        except OSError as e:
+            print(f"Erro ao gravar estatísticas de seletores: {e}")
+
+
+_registro = None
+_lock_registro = threading.Lock()
+
+
+def obter_registro_seletores():
+    """Registro de seletores compartilhado do processo (gravado também ao sair)"""
+    global _registro
+    with _lock_registro:
+        if _registro is None:
+            _registro = RegistroSeletores()
+            atexit.register(_registro.salvar)
+        return _registro
@@ -2,62 +2,129 @@
 
 document.addEventListener('DOMContentLoaded', function() {
     // Exibir modal de carregamento durante submissão de formulários
-    const forms = document.querySelectorAll('form');
+    const modal = document.getElementById('loadingModal');
+    const forms = modal ? document.querySelectorAll('form[method="post"]') : [];
     forms.forEach(form => {
         form.addEventListener('submit', function() {
-            const loadingModal = new bootstrap.Modal(document.getElementById('loadingModal'));
+            const loadingModal = new bootstrap.Modal(modal);
             loadingModal.show();
         });
     });
     
-    // Ordenar tabelas de produtos
-    const sortTables = () => {
-        document.querySelectorAll('.sort-header').forEach(header => {
-            header.addEventListener('click', function() {
-                const tableBody = this.closest('table').querySelector('tbody');
-                const rows = Array.from(tableBody.querySelectorAll('tr'));
-                const index = Array.from(this.parentNode.children).indexOf(this);
-                const direction = this.classList.contains('sort-asc') ? -1 : 1;
-                
-                // Alternar classes para indicar direção da ordenação
-                if (this.classList.contains('sort-asc')) {
-                    this.classList.remove('sort-asc');
-                    this.classList.add('sort-desc');
-                } else {
-                    document.querySelectorAll('.sort-header').forEach(el => {
-                        el.classList.remove('sort-asc', 'sort-desc');
-                    });
-                    this.classList.add('sort-asc');
-                }
-                
-                // Ordenar linhas
-                const sortedRows = rows.sort((a, b) => {
-                    const cellA = a.querySelectorAll('td')[index].textContent.trim();
-                    const cellB = b.querySelectorAll('td')[index].textContent.trim();
-                    
-                    // Verificar se é um preço
-                    if (cellA.startsWith('R$') && cellB.startsWith('R$')) {
-                        const priceA = parseFloat(cellA.replace('R$', '').replace('.', '').replace(',', '.').trim());
-                        const priceB = parseFloat(cellB.replace('R$', '').replace('.', '').replace(',', '.').trim());
-                        return direction * (priceA - priceB);
-                    }
-                    
-                    // Ordenação de texto comum
-                    return direction * cellA.localeCompare(cellB);
+    // Carregar as ofertas de cada produto do relatório ao abrir o acordeão
+    // (ordenação e filtros já vêm aplicados pelo servidor)
+    const linhaOferta = oferta => {
+        const linha = document.createElement('tr');
+        const celula = (conteudo) => {
+            const td = document.createElement('td');
+            if (conteudo instanceof Node) {
+                td.appendChild(conteudo);
+            } else {
+                td.textContent = conteudo ?? '';
+            }
+            linha.appendChild(td);
+            return td;
+        };
+        
+        celula(oferta.posicao + 1);
+        celula(oferta.nome);
+        const preco = celula(oferta.preco);
+        preco.classList.add('text-nowrap');
+        if (oferta.parcelas) {
+            const parcelas = document.createElement('small');
+            parcelas.className = 'text-muted d-block';
+            parcelas.textContent = `${oferta.parcelas}x de ${oferta.valor_parcela_formatado || '-'}`;
+            preco.appendChild(parcelas);
+        }
+        if (oferta.preco_anterior_formatado) {
+            const anterior = document.createElement('small');
+            anterior.className = 'text-muted text-decoration-line-through d-block';
+            anterior.textContent = oferta.preco_anterior_formatado;
+            preco.appendChild(anterior);
+        }
+        celula(oferta.loja);
+        const link = document.createElement('a');
+        link.href = oferta.link || '#';
+        link.target = '_blank';
+        link.className = 'btn btn-sm btn-outline-primary';
+        link.textContent = 'Ver Produto';
+        celula(link);
+        return linha;
+    };
+    
+    document.querySelectorAll('[data-ofertas-url]').forEach(painel => {
+        painel.addEventListener('show.bs.collapse', function() {
+            if (this.dataset.carregado) {
+                return;
+            }
+            this.dataset.carregado = '1';
+            const corpo = this.querySelector('tbody');
+            fetch(this.dataset.ofertasUrl)
+                .then(resposta => resposta.json())
+                .then(dados => {
+                    corpo.innerHTML = '';
+                    dados.ofertas.forEach(oferta => corpo.appendChild(linhaOferta(oferta)));
+                })
+                .catch(err => {
+                    delete this.dataset.carregado;
+                    corpo.innerHTML = '<tr><td colspan="5" class="text-center text-danger">Erro ao carregar ofertas</td></tr>';
+                    console.error('Erro ao carregar ofertas: ', err);
                 });
-                
-                // Reordenar a tabela
-                tableBody.innerHTML = '';
-                sortedRows.forEach(row => tableBody.appendChild(row));
-            });
         });
-    };
+    });
     
-    // Inicializar funções se as elementos existirem
-    if (document.querySelector('.sort-header')) {
-        sortTables();
+    // Acompanhar o progresso de um job de busca via Server-Sent Events
+    const jobProgresso = document.getElementById('job-progresso');
+    if (jobProgresso && window.EventSource) {
+        const barra = document.getElementById('job-barra');
+        const total = parseInt(barra.dataset.total, 10) || 1;
+        const fonte = new EventSource(jobProgresso.dataset.eventosUrl);
+
+        fonte.addEventListener('iniciado', () => {
+            document.getElementById('job-status').textContent = 'executando';
+        });
+
+        fonte.addEventListener('progresso', event => {
+            const dados = JSON.parse(event.data);
+            barra.style.width = `${Math.round(100 * dados.concluidos / total)}%`;
+            document.getElementById('job-contagem').textContent = dados.concluidos;
+
+            document.querySelectorAll('#job-produtos [data-produto]').forEach(item => {
+                if (item.dataset.produto === dados.produto) {
+                    const badge = item.querySelector('.badge');
+                    badge.textContent = `${dados.encontrados} produtos encontrados`;
+                    badge.classList.remove('bg-secondary', 'bg-info');
+                    badge.classList.add('bg-success');
+                }
+            });
+        });
+
+        // Ofertas parciais, enquanto a página do produto ainda está sendo processada
+        fonte.addEventListener('oferta', event => {
+            const dados = JSON.parse(event.data);
+            document.querySelectorAll('#job-produtos [data-produto]').forEach(item => {
+                const badge = item.querySelector('.badge');
+                if (item.dataset.produto === dados.produto && !badge.classList.contains('bg-success')) {
+                    badge.textContent = `${dados.encontradas} produtos até agora...`;
+                    badge.classList.remove('bg-secondary');
+                    badge.classList.add('bg-info');
+                }
+            });
+        });
+
+        fonte.addEventListener('fim', event => {
+            fonte.close();
+            const dados = JSON.parse(event.data);
+            window.location = jobProgresso.dataset.relatorioUrl.replace('__nome__', encodeURIComponent(dados.relatorio));
+        });
+
+        fonte.addEventListener('erro', event => {
+            fonte.close();
+            const dados = JSON.parse(event.data);
+            document.getElementById('job-status').textContent = `erro: ${dados.erro}`;
+        });
     }
-    
+
     // Adicionar funcionalidade de copiar links
     document.querySelectorAll('.copy-link').forEach(button => {
         button.addEventListener('click', function(e) {
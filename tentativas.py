@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Política de novas tentativas e disjuntor de bloqueio
+
+As falhas de uma busca são classificadas em:
+
+- transitoria: timeout ou conexão instável; nova tentativa na mesma sessão
+  do Chrome após uma espera exponencial com jitter;
+- sessao_perdida: o Chrome não responde mais (sessão inválida, janela
+  fechada); a sessão é descartada e a nova tentativa usa outra;
+- marcacao: a página carregou, mas o campo de busca ou os cards não foram
+  encontrados (mudança de layout); nova tentativa na mesma sessão abrindo a
+  URL de resultados direto;
+- consentimento: tela de cookies/consentimento; o aceite é clicado e a busca
+  continua na mesma sessão;
+- bloqueio: captcha, /sorry/ ou HTTP 429; nada de novas tentativas, a sessão
+  é descartada e o disjuntor é informado.
+
+O disjuntor é único no processo. Quando a fração de bloqueios entre as
+últimas buscas passa de MEIU_LIMIAR_BLOQUEIO, ele abre e pausa todas as
+buscas por um tempo crescente; depois deixa passar uma busca de teste por
+vez até uma delas ter sucesso. Buscas recusadas ou bloqueadas levantam
+BuscaAdiada e voltam para a fila em vez de falhar.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from instrumentacao import contar
+
+TRANSITORIA = "transitoria"
+MARCACAO = "marcacao"
+CONSENTIMENTO = "consentimento"
+BLOQUEIO = "bloqueio"
+SESSAO_PERDIDA = "sessao_perdida"
+
+LIMIAR_BLOQUEIO = float(os.environ.get("MEIU_LIMIAR_BLOQUEIO", "0.3"))
+JANELA_DISJUNTOR = 20
+MINIMO_AMOSTRAS = 5
+PAUSA_INICIAL = float(os.environ.get("MEIU_PAUSA_BLOQUEIO", "120"))
+PAUSA_MAXIMA = 1800
+
+# Motivo de BuscaAdiada quando a busca nem começou (não conta como adiamento)
+MOTIVO_DISJUNTOR = "disjuntor de bloqueio aberto"
+
+MARCADORES_BLOQUEIO = (
+    "/sorry/", "unusual traffic", "tráfego incomum", "trafego incomum", "g-recaptcha",
+    "recaptcha/api", "captcha-form", "our systems have detected",
+)
+MARCADORES_CONSENTIMENTO = (
+    "consent.google", "before you continue", "antes de ir para o google", "antes de continuar",
+)
+SELETORES_ACEITE = [
+    "button#L2AGLb",
+    "form[action*='consent'] button[aria-label*='Aceitar']",
+    "button[aria-label*='Aceitar tudo']",
+    "button[aria-label*='Accept all']",
+    "form[action*='consent'] button",
+]
+
+# Nomes das exceções do Selenium/rede tratadas como transitórias
+EXCECOES_TRANSITORIAS = {
+    "TimeoutException", "WebDriverException", "StaleElementReferenceException", "RemoteDisconnected",
+    "ConnectionResetError", "ConnectionRefusedError", "TimeoutError", "IncompleteRead",
+}
+
+# Exceções que indicam que a sessão do Chrome não serve mais
+EXCECOES_SESSAO_PERDIDA = {"NoSuchWindowException", "InvalidSessionIdException"}
+
+
+class FalhaBusca(Exception):
+    """Falha de busca já classificada (`tipo` é uma das constantes do módulo)"""
+
+    def __init__(self, tipo, mensagem):
+        super().__init__(mensagem)
+        self.tipo = tipo
+
+
+class BuscaAdiada(Exception):
+    """A busca não foi feita (bloqueio ou disjuntor aberto) e deve voltar para a fila"""
+
+    def __init__(self, produto, motivo):
+        super().__init__(f"Busca por '{produto}' adiada: {motivo}")
+        self.produto = produto
+        self.motivo = motivo
+
+    @property
+    def recusada(self):
+        """True quando o disjuntor recusou a busca antes de qualquer requisição"""
+        return self.motivo == MOTIVO_DISJUNTOR
+
+
+def classificar_texto(url, html):
+    """Bloqueio ou consentimento a partir da URL e do HTML da página (None se nenhum)"""
+    url = (url or "").lower()
+    trecho = (html or "")[:200_000].lower()
+    if any(m in url or m in trecho for m in MARCADORES_BLOQUEIO):
+        return BLOQUEIO
+    if any(m in url for m in MARCADORES_CONSENTIMENTO) or any(m in trecho for m in MARCADORES_CONSENTIMENTO):
+        return CONSENTIMENTO
+    return None
+
+
+def classificar_falha(erro, driver=None):
+    """Tipo da falha a partir da exceção e, se houver sessão, da página atual"""
+    if isinstance(erro, FalhaBusca) and erro.tipo in (BLOQUEIO, CONSENTIMENTO):
+        return erro.tipo
+    if type(erro).__name__ in EXCECOES_SESSAO_PERDIDA:
+        return SESSAO_PERDIDA
+    if driver is not None:
+        try:
+            tipo = classificar_texto(driver.current_url, driver.page_source)
+            if tipo:
+                return tipo
+        except Exception:
+            # A sessão não responde: recomeçar com outra é a única saída
+            return SESSAO_PERDIDA
+    if isinstance(erro, FalhaBusca):
+        return erro.tipo
+    if type(erro).__name__ in EXCECOES_TRANSITORIAS or isinstance(erro, (OSError, TimeoutError)):
+        return TRANSITORIA
+    return MARCACAO
+
+
+def aceitar_consentimento(driver):
+    """Clica no botão de aceite da tela de consentimento; retorna True se clicou"""
+    from selenium.webdriver.common.by import By
+    for seletor in SELETORES_ACEITE:
+        try:
+            for botao in driver.find_elements(By.CSS_SELECTOR, seletor):
+                if botao.is_displayed():
+                    botao.click()
+                    return True
+        except Exception:
+            continue
+    return False
+
+
+class PoliticaTentativas:
+    """Quantas tentativas, quanto esperar entre elas e quando manter a sessão"""
+
+    def __init__(self, max_tentativas=3, espera_base=1.0, espera_maxima=20.0, fator=2.0):
+        self.max_tentativas = max_tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.fator = fator
+
+    def espera(self, tentativa):
+        """Backoff exponencial com jitter completo (tentativa a partir de 0)"""
+        teto = min(self.espera_maxima, self.espera_base * self.fator ** tentativa)
+        return random.uniform(0, teto)
+
+    def repetir(self, tipo):
+        return tipo != BLOQUEIO
+
+    def mesma_sessao(self, tipo):
+        """Transitórias, marcação e consentimento seguem na sessão atual; bloqueio e sessão perdida descartam"""
+        return tipo in (TRANSITORIA, MARCACAO, CONSENTIMENTO)
+
+
+class DisjuntorBloqueio:
+    """
+    Disjuntor do processo para bloqueios do Google
+
+    Estados: "fechado" (buscas normais), "aberto" (todas as buscas pausadas
+    até `liberado_em`) e "meio_aberto" (uma busca de teste por vez).
+    """
+
+    def __init__(self, limiar=LIMIAR_BLOQUEIO, janela=JANELA_DISJUNTOR, minimo=MINIMO_AMOSTRAS,
+                 pausa_inicial=PAUSA_INICIAL, pausa_maxima=PAUSA_MAXIMA):
+        self.limiar = limiar
+        self.minimo = minimo
+        self.pausa_inicial = pausa_inicial
+        self.pausa_maxima = pausa_maxima
+        self.resultados = deque(maxlen=janela)
+        self.estado = "fechado"
+        self.liberado_em = 0.0
+        self.pausa_atual = pausa_inicial
+        self._teste_em_andamento = False
+        self._lock = threading.Condition()
+        self.estatisticas = {"aberturas": 0, "recusadas": 0, "bloqueios": 0}
+
+    def _abrir(self):
+        self.estado = "aberto"
+        self.liberado_em = time.monotonic() + self.pausa_atual
+        self.estatisticas["aberturas"] += 1
+        contar("meiu_disjuntor_aberturas_total")
+        print(f" Disjuntor aberto: bloqueios em {self.taxa_bloqueio():.0%} das buscas; "
+              f"pausa de {self.pausa_atual:.0f}s")
+        self.pausa_atual = min(self.pausa_maxima, self.pausa_atual * 2)
+
+    def taxa_bloqueio(self):
+        if not self.resultados:
+            return 0.0
+        return sum(1 for r in self.resultados if r == BLOQUEIO) / len(self.resultados)
+
+    def permitir(self):
+        """Indica se uma busca pode começar agora (no meio-aberto, só a de teste)"""
+        with self._lock:
+            if self.estado == "aberto" and time.monotonic() >= self.liberado_em:
+                self.estado = "meio_aberto"
+                self._teste_em_andamento = False
+            if self.estado == "fechado":
+                return True
+            if self.estado == "meio_aberto" and not self._teste_em_andamento:
+                self._teste_em_andamento = True
+                return True
+            self.estatisticas["recusadas"] += 1
+            return False
+
+    def aguardar_liberacao(self, cancelado=None, intervalo=1.0):
+        """Bloqueia a thread enquanto o disjuntor estiver aberto (ou até `cancelado` ser sinalizado)"""
+        while True:
+            with self._lock:
+                if self.estado == "fechado" or (self.estado == "aberto" and time.monotonic() >= self.liberado_em) \
+                        or (self.estado == "meio_aberto" and not self._teste_em_andamento):
+                    return True
+                restante = max(0.0, self.liberado_em - time.monotonic()) if self.estado == "aberto" else intervalo
+            if cancelado is not None and cancelado.wait(min(intervalo, restante) or intervalo):
+                return False
+            if cancelado is None:
+                time.sleep(min(intervalo, restante) or intervalo)
+
+    def registrar(self, resultado):
+        """Registra o desfecho de uma busca: "sucesso" ou um tipo de falha"""
+        with self._lock:
+            self.resultados.append(resultado)
+            if resultado == BLOQUEIO:
+                self.estatisticas["bloqueios"] += 1
+            if self.estado == "meio_aberto":
+                self._teste_em_andamento = False
+                if resultado == BLOQUEIO:
+                    self._abrir()
+                elif resultado == "sucesso":
+                    self.estado = "fechado"
+                    self.pausa_atual = self.pausa_inicial
+                    self.resultados.clear()
+                    print(" Disjuntor fechado: buscas retomadas")
+            elif self.estado == "fechado" and len(self.resultados) >= self.minimo \
+                    and self.taxa_bloqueio() >= self.limiar:
+                self._abrir()
+            self._lock.notify_all()
+
+    def relatorio(self):
+        with self._lock:
+            restante = max(0.0, self.liberado_em - time.monotonic()) if self.estado == "aberto" else 0.0
+            return dict(self.estatisticas, estado=self.estado, taxa_bloqueio=round(self.taxa_bloqueio(), 3),
+                        pausa_restante_s=round(restante, 1))
+
+
+_disjuntor = None
+_lock_disjuntor = threading.Lock()
+
+
+def obter_disjuntor():
+    """Disjuntor compartilhado do processo"""
+    global _disjuntor
+    with _lock_disjuntor:
+        if _disjuntor is None:
+            _disjuntor = DisjuntorBloqueio()
+        return _disjuntor
@@ -0,0 +1,81 @@
+import agendador
+from agendador import Agendador, ENVELHECIMENTO_S
+
+
+def _item(produto, prioridade, intervalo_min=60):
+    return {"produto": produto, "intervalo_min": intervalo_min, "prioridade": prioridade,
+            "fonte": agendador.FONTE_PADRAO}
+
+
+def _vencidos(itens, agora):
+    estado = {item["produto"]: {"proxima": agora - 1} for item in itens}
+    return Agendador(itens, {}, agora, estado=estado)
+
+
+def test_vencidos_saem_por_prioridade():
+    agora = 1_000_000.0
+    itens = [_item("c", 8), _item("a", 1), _item("b", 5)]
+    ag = _vencidos(itens, agora)
+    assert ag.proximas_tarefas(agora, 3) == ["a", "b", "c"]
+
+
+def test_atraso_envelhece_prioridade():
+    agora = 1_000_000.0
+    itens = [_item("urgente", 1), _item("antigo", 3)]
+    estado = {"urgente": {"proxima": agora - 1},
+              "antigo": {"proxima": agora - 3 * ENVELHECIMENTO_S}}
+    ag = Agendador(itens, {}, agora, estado=estado)
+    # Dois níveis de diferença e quase três de atraso: o antigo passa na frente
+    assert ag.proximas_tarefas(agora, 1) == ["antigo"]
+
+
+def test_orcamento_apertado_nao_deixa_produto_sem_execucao():
+    itens = [_item(f"alta {i}", 1, 60) for i in range(40)] + [_item("baixa", 8, 60)]
+    relatorio = agendador.simular(itens, {"global": 30}, horas=12, taxa_falha=0.0)
+    assert relatorio["atrasos"]["por_produto"]["baixa"]["execucoes"] > 0
+    assert relatorio["atrasos"]["famintos"] > 0
+
+
+class _Buscador:
+    def __init__(self, resultado):
+        self.resultado = resultado
+
+    def buscar(self, produto, forcar=False):
+        if isinstance(self.resultado, Exception):
+            raise self.resultado
+        return dict(self.resultado, produto_buscado=produto)
+
+
+class _Historico:
+    def __init__(self):
+        self.salvos = []
+
+    def salvar_buscas(self, resultados):
+        self.salvos.extend(resultados)
+
+
+def _executar_busca(resultado):
+    agora = 1_000_000.0
+    ag = _vencidos([_item("x", 1)], agora)
+    assert ag.proximas_tarefas(agora, 1) == ["x"]
+    servico = agendador.ServicoAgendador(ag, buscador=_Buscador(resultado), historico=_Historico())
+    servico._em_execucao = 1
+    servico._buscar("x")
+    return ag
+
+
+def test_busca_com_ofertas_conta_como_sucesso():
+    ag = _executar_busca({"produtos_patrocinados": [{"nome": "a", "preco": "R$ 1,00"}]})
+    assert ag.contadores["sucessos"] == 1
+    assert ag.estado["x"]["falhas"] == 0
+
+
+def test_busca_vazia_ou_com_erro_conta_como_falha():
+    for resultado, tipo in (({"produtos_patrocinados": []}, agendador.MARCACAO),
+                            ({"produtos_patrocinados": [], "erro": "timeout"}, agendador.TRANSITORIA),
+                            (TimeoutError("sem resposta"), agendador.TRANSITORIA)):
+        ag = _executar_busca(resultado)
+        assert ag.contadores["sucessos"] == 0
+        assert ag.falhas_por_tipo == {tipo: 1}
+        assert ag.estado["x"]["ultima_execucao"] is None
+        assert ag.estado["x"]["falhas"] == 1
@@ -0,0 +1,37 @@
+import agrupamento
+from agrupamento import agrupador_historico
+from historico import HistoricoPrecos
+
+
+def _relatorio(*nomes):
+    ofertas = [{"nome": nome, "preco": "R$ 100,00", "loja": f"Loja {i}", "link": f"https://loja{i}.com.br/p"}
+               for i, nome in enumerate(nomes)]
+    return {"resultados_detalhados": {"fone": {"produto_buscado": "fone", "timestamp": "2099-01-01 10:00:00",
+                                               "produtos_patrocinados": ofertas}}}
+
+
+def _total(agrupador):
+    return sum(len(grupo.ofertas) for grupo in agrupador.grupos)
+
+
+def test_relatorio_regravado_nao_duplica_nem_mantem_ofertas_apagadas(tmp_path, monkeypatch):
+    monkeypatch.setattr(agrupamento, "_agrupador", None)
+    monkeypatch.setattr(agrupamento, "_ultimo_id", 0)
+    monkeypatch.setattr(agrupamento, "_remocoes", 0)
+    historico = HistoricoPrecos(str(tmp_path / "historico.db"))
+
+    # Importado pela página enquanto o lote ainda escrevia, depois regravado ao final do lote
+    historico.registrar_relatorio("relatorio_a.json", _relatorio("Fone JBL Tune 520BT", "Fone JBL Tune 520 BT"))
+    assert _total(agrupador_historico(historico)) == 2
+    historico.registrar_relatorio("relatorio_a.json", _relatorio("Fone JBL Tune 520BT", "Fone JBL Tune 520 BT",
+                                                                 "Fone Sony WH-CH520"))
+    assert _total(agrupador_historico(historico)) == 3
+
+    historico.registrar_relatorio("relatorio_a.json", _relatorio("Fone Sony WH-CH520"))
+    agrupador = agrupador_historico(historico)
+    assert _total(agrupador) == 1
+    assert agrupador.grupos[0].nome() == "Fone Sony WH-CH520"
+
+    historico.registrar_relatorio("relatorio_b.json", _relatorio("Fone JBL Tune 520BT"))
+    assert _total(agrupador_historico(historico)) == 2
+    assert historico.remocoes() == 2
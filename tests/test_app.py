@@ -0,0 +1,41 @@
+import app as aplicacao
+
+
+class _Detector:
+    def __init__(self, arquivo_feed):
+        self.arquivo_feed = arquivo_feed
+
+
+class _Historico:
+    def __init__(self):
+        self.chamadas = []
+
+    def pagina_relatorios(self, pagina, por_pagina, **filtros):
+        self.chamadas.append((pagina, por_pagina))
+        return {"relatorios": [], "total": 0, "pagina": 1, "paginas": 1}
+
+
+def test_feed_limita_desde_e_recusa_valor_invalido(tmp_path, monkeypatch):
+    feed = tmp_path / "feed.jsonl"
+    feed.write_bytes(b'{"a": 1}\n{"b": 2}\n')
+    monkeypatch.setattr(aplicacao, "obter_detector", lambda: _Detector(str(feed)))
+    cliente = aplicacao.app.test_client()
+
+    resposta = cliente.get("/alertas/feed.jsonl?desde=-5")
+    assert resposta.status_code == 200
+    assert resposta.get_data() == feed.read_bytes()
+    assert resposta.headers["X-Feed-Offset"] == str(len(feed.read_bytes()))
+
+    resposta = cliente.get("/alertas/feed.jsonl?desde=9")
+    assert resposta.get_data() == b'{"b": 2}\n'
+    assert cliente.get("/alertas/feed.jsonl?desde=abc").status_code == 400
+
+
+def test_por_pagina_e_limitado(monkeypatch):
+    historico = _Historico()
+    monkeypatch.setattr(aplicacao, "obter_historico", lambda: historico)
+    cliente = aplicacao.app.test_client()
+    assert cliente.get("/?pagina=-3&por_pagina=100000").status_code == 200
+    assert cliente.get("/?por_pagina=0").status_code == 200
+    assert historico.chamadas == [(1, aplicacao.MAX_POR_PAGINA), (1, 1)]
+    assert cliente.get("/?por_pagina=muitos").status_code == 400
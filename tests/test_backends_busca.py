@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import backends_busca
+from backends_busca import BackendHTTP, BuscadorBackends, PoolConexoes
+from benchmark import ServidorCorpus, carregar_corpus
+from tentativas import DisjuntorBloqueio
+
+PAGINAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "paginas")
+
+
+class _Pool:
+    def __init__(self, status, html):
+        self.resposta = (status, html)
+
+    def get(self, url, prazo=None):
+        return self.resposta
+
+
+def _meio_aberto(monkeypatch):
+    disjuntor = DisjuntorBloqueio()
+    disjuntor.estado = "meio_aberto"
+    monkeypatch.setattr(backends_busca, "obter_disjuntor", lambda: disjuntor)
+    return disjuntor
+
+
+def test_resposta_200_sem_cards_nao_fecha_o_disjuntor(monkeypatch):
+    disjuntor = _meio_aberto(monkeypatch)
+    resultado = BackendHTTP(pool=_Pool(200, "<html><body>Nada aqui</body></html>")).buscar("tv")
+    assert resultado["produtos_patrocinados"] == []
+    assert disjuntor.estado == "meio_aberto"
+    # A vaga de teste foi liberada para a próxima busca
+    assert disjuntor.permitir()
+
+
+def test_resposta_200_com_cards_fecha_o_disjuntor(monkeypatch):
+    disjuntor = _meio_aberto(monkeypatch)
+    with open(os.path.join(PAGINAS, "geladeira.html"), encoding="utf-8") as f:
+        resultado = BackendHTTP(pool=_Pool(200, f.read())).buscar("geladeira")
+    assert resultado["produtos_patrocinados"]
+    assert disjuntor.estado == "fechado"
+
+
+class _Lento(BaseHTTPRequestHandler):
+    """Responde depois de `atraso` segundos; /volta redireciona para si mesma"""
+
+    protocol_version = "HTTP/1.1"
+    atraso = 0.0
+
+    def do_GET(self):
+        time.sleep(self.atraso)
+        if self.path.startswith("/volta"):
+            self.send_response(302)
+            self.send_header("Location", "/volta")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor_lento():
+    def iniciar(atraso):
+        manipulador = type("Manipulador", (_Lento,), {"atraso": atraso})
+        servidor = ThreadingHTTPServer(("127.0.0.1", 0), manipulador)
+        servidor.daemon_threads = True
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        servidores.append(servidor)
+        return f"http://127.0.0.1:{servidor.server_address[1]}"
+
+    servidores = []
+    yield iniciar
+    for servidor in servidores:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def test_prazo_menor_que_o_timeout_do_pool_vale_no_download(servidor_lento, monkeypatch):
+    disjuntor = _meio_aberto(monkeypatch)
+    url = servidor_lento(2.0)
+    backend = BackendHTTP(url_busca=url + "/search?q={consulta}", timeout=15)
+    inicio = time.monotonic()
+    with pytest.raises(TimeoutError):
+        backend.buscar("tv", prazo=0.3)
+    assert time.monotonic() - inicio < 1.5
+    # O timeout libera a busca de teste do disjuntor meio-aberto
+    assert disjuntor.permitir()
+
+
+def test_prazo_e_conferido_entre_redirecionamentos(servidor_lento):
+    pool = PoolConexoes(timeout=15, max_redirecionamentos=20)
+    url = servidor_lento(0.15)
+    inicio = time.monotonic()
+    with pytest.raises(TimeoutError):
+        pool.get(url + "/volta", prazo=0.5)
+    assert time.monotonic() - inicio < 1.5
+
+
+class _Selenium:
+    nome = "selenium"
+
+    def __init__(self):
+        self.buscados = []
+
+    def buscar(self, produto, ao_ofertar=None, prazo=None):
+        self.buscados.append(produto)
+        return {"produto_buscado": produto, "timestamp": "2026-01-01 00:00:00",
+                "produtos_patrocinados": [{"nome": produto, "preco": "R$ 10,00"}]}
+
+    def fechar(self):
+        pass
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return carregar_corpus()
+
+
+@pytest.fixture
+def servidor(corpus):
+    with ServidorCorpus(corpus) as servidor:
+        yield servidor
+
+
+def test_backend_http_no_servidor_local(servidor, corpus, monkeypatch):
+    disjuntor = DisjuntorBloqueio()
+    monkeypatch.setattr(backends_busca, "obter_disjuntor", lambda: disjuntor)
+    backend = BackendHTTP(url_busca=servidor.url_busca)
+    for pagina in corpus:
+        resultado = backend.buscar(pagina["consulta"])
+        assert [o["nome"] for o in resultado["produtos_patrocinados"]] == [o["nome"] for o in pagina["ofertas"]]
+    # Uma conexão keep-alive para todas as consultas
+    assert backend.pool.estatisticas["conexoes_abertas"] == 1
+    assert backend.pool.estatisticas["reusos"] == len(corpus) - 1
+    assert list(disjuntor.resultados) == ["sucesso"] * len(corpus)
+
+
+def test_backend_http_recebe_gzip(servidor, corpus):
+    pool = PoolConexoes()
+    url = servidor.url_busca.format(consulta="notebook")
+    resposta, corpo = pool._requisitar_uma_vez(url, backends_busca.CABECALHOS_PADRAO, pool.timeout)
+    assert resposta.getheader("Content-Encoding") == "gzip"
+    status, html = pool.get(url)
+    assert status == 200 and len(html) > len(corpo)
+    pagina = next(p for p in corpus if p["consulta"] == "notebook")
+    assert pagina["ofertas"][0]["nome"] in html
+
+
+def test_backend_http_404_conta_como_falha_transitoria(servidor, monkeypatch):
+    disjuntor = DisjuntorBloqueio()
+    monkeypatch.setattr(backends_busca, "obter_disjuntor", lambda: disjuntor)
+    resultado = BackendHTTP(url_busca=servidor.url_busca).buscar("consulta fora do corpus")
+    assert resultado["produtos_patrocinados"] == []
+    assert list(disjuntor.resultados) == ["transitoria"]
+
+
+def test_modo_auto_recorre_ao_selenium_quando_o_200_nao_tem_cards(servidor, monkeypatch):
+    monkeypatch.setattr(backends_busca, "obter_disjuntor", DisjuntorBloqueio)
+    selenium = _Selenium()
+    # A página inicial responde 200 sem nenhum card
+    buscador = BuscadorBackends(modo="auto", http=BackendHTTP(url_busca=servidor.url + "/shopping?q={consulta}"),
+                                selenium=selenium)
+    resultado = buscador.buscar("notebook")
+    assert resultado["backend"] == "selenium" and selenium.buscados == ["notebook"]
+    assert buscador.estatisticas["http"]["tentativas"] == 1
+
+
+def test_backend_http_respeita_o_limite_de_ofertas(servidor, monkeypatch):
+    monkeypatch.setattr(backends_busca, "LIMITE_OFERTAS", 2)
+    monkeypatch.setattr(backends_busca, "obter_disjuntor", DisjuntorBloqueio)
+    resultado = BackendHTTP(url_busca=servidor.url_busca).buscar("notebook")
+    assert len(resultado["produtos_patrocinados"]) == 2
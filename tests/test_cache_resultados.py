@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+
+import pytest
+
+import cache_resultados
+from cache_resultados import CacheResultados
+from tentativas import BuscaAdiada
+
+
+def _resultado(produto):
+    return {"produto_buscado": produto, "timestamp": "2026-01-01 00:00:00",
+            "produtos_patrocinados": [{"nome": produto, "preco": "R$ 10,00"}]}
+
+
+def test_seguidores_recebem_copia_do_erro_do_lider():
+    cache = CacheResultados()
+    liberar = threading.Event()
+    lider_entrou = threading.Event()
+    original = BuscaAdiada("tv", "bloqueio (HTTP 429)")
+
+    def buscar(produto):
+        lider_entrou.set()
+        liberar.wait(5)
+        raise original
+
+    erros = []
+
+    def chamar():
+        try:
+            cache.obter_ou_buscar("tv", buscar)
+        except BuscaAdiada as e:
+            erros.append(e)
+
+    lider = threading.Thread(target=chamar)
+    lider.start()
+    lider_entrou.wait(5)
+    seguidores = [threading.Thread(target=chamar) for _ in range(3)]
+    for t in seguidores:
+        t.start()
+    while cache.contadores["coalescidas"] < 3:
+        time.sleep(0.001)
+    liberar.set()
+    for t in [lider] + seguidores:
+        t.join(5)
+
+    assert len(erros) == 4
+    assert sum(e is original for e in erros) == 1
+    copias = [e for e in erros if e is not original]
+    assert all(e.motivo == original.motivo and str(e) == str(original) for e in copias)
+    assert all(e.__cause__ is original for e in copias)
+
+
+def test_itens_vencidos_saem_do_disco(tmp_path, monkeypatch):
+    cache = CacheResultados(ttl=60, diretorio_disco=str(tmp_path))
+    cache.guardar("geladeira", _resultado("geladeira"))
+    cache.guardar("fogao", _resultado("fogao"))
+    (tmp_path / "abandonado.json.tmp").write_text("{")
+    os.utime(tmp_path / "abandonado.json.tmp", (0, 0))
+    assert len(os.listdir(tmp_path)) == 3
+
+    futuro = time.time() + cache_resultados.INTERVALO_LIMPEZA_DISCO_S + 1
+    monkeypatch.setattr(cache_resultados.time, "time", lambda: futuro)
+    cache.guardar("micro-ondas", _resultado("micro-ondas"))
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(cache._arquivo_disco("micro-ondas"))]
+    assert cache.contadores["removidos_disco"] == 3
+
+
+def test_leitura_de_item_vencido_remove_o_arquivo(tmp_path, monkeypatch):
+    cache = CacheResultados(ttl=60, diretorio_disco=str(tmp_path))
+    cache.guardar("tv", _resultado("tv"))
+    cache._memoria.clear()
+    futuro = time.time() + 120
+    monkeypatch.setattr(cache_resultados.time, "time", lambda: futuro)
+    assert cache.obter("tv") is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_erro_sem_seguidores_e_levantado_como_esta():
+    cache = CacheResultados()
+    with pytest.raises(ValueError):
+        cache.obter_ou_buscar("tv", lambda p: (_ for _ in ()).throw(ValueError("x")))
+
+
+def test_ttl_expira_itens(monkeypatch):
+    cache = CacheResultados(ttl=60)
+    cache.guardar("TV 50", _resultado("tv 50"))
+    assert cache.obter("  tv   50 ")["origem_cache"] == "memoria"
+    futuro = time.time() + 61
+    monkeypatch.setattr(cache_resultados.time, "time", lambda: futuro)
+    assert cache.obter("tv 50") is None
+    assert cache._memoria == {}
+
+
+def test_lru_descarta_o_menos_usado():
+    cache = CacheResultados(max_itens=2)
+    cache.guardar("a", _resultado("a"))
+    cache.guardar("b", _resultado("b"))
+    assert cache.obter("a") is not None
+    cache.guardar("c", _resultado("c"))
+    assert cache.obter("b") is None
+    assert cache.obter("a") is not None and cache.obter("c") is not None
+
+
+def test_resultado_vazio_nao_e_guardado():
+    cache = CacheResultados()
+    chamadas = []
+
+    def buscar(produto):
+        chamadas.append(produto)
+        return {"produto_buscado": produto, "produtos_patrocinados": []}
+
+    cache.obter_ou_buscar("tv", buscar)
+    cache.obter_ou_buscar("tv", buscar)
+    assert len(chamadas) == 2
+
+
+def test_buscas_simultaneas_compartilham_uma_execucao():
+    cache = CacheResultados()
+    liberar = threading.Event()
+    chamadas = []
+
+    def buscar(produto):
+        chamadas.append(produto)
+        liberar.wait(5)
+        return _resultado(produto)
+
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(cache.obter_ou_buscar("tv", buscar)))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    while cache.contadores["coalescidas"] < 4:
+        time.sleep(0.001)
+    liberar.set()
+    for t in threads:
+        t.join(5)
+
+    assert chamadas == ["tv"]
+    assert len(resultados) == 5
+    assert sorted(r.get("origem_cache", "busca") for r in resultados) == ["busca"] + ["coalescida"] * 4
+    # Cada requisição recebe a própria cópia
+    resultados[0]["produtos_patrocinados"].clear()
+    assert all(r["produtos_patrocinados"] for r in resultados[1:])
+    assert cache.obter_ou_buscar("tv", buscar)["origem_cache"] == "memoria"
+    assert chamadas == ["tv"]
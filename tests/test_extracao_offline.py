@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+from extracao_offline import analisar_html, extrair_produtos_html, selecionar, selecionar_um
+
+PAGINAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "paginas")
+
+HTML = """
+<html><body>
+  <div id="principal" class="grade resultados">
+    <div class="card destaque" data-offer-id="a1" lang="pt-BR">
+      <a href="/url?q=https://loja.com/p/1"><span class="nome">Geladeira Frost Free</span></a>
+      <span class="preco" aria-label="Preço R$ 2.999,00">R$ 2.999,00</span>
+    </div>
+    <div class="card" data-offer-id="b2" lang="pt">
+      <span class="nome">Fogão 4 bocas</span>
+    </div>
+  </div>
+  <p class="nome">fora da grade</p>
+</body></html>
+"""
+
+
+def _ids(nos):
+    return [no.get("data-offer-id") for no in nos]
+
+
+@pytest.mark.parametrize("seletor, esperado", [
+    ("div.card", ["a1", "b2"]),
+    ("div.card.destaque", ["a1"]),
+    ("#principal div[data-offer-id]", ["a1", "b2"]),
+    ("[data-offer-id='b2']", ["b2"]),
+    ("div[data-offer-id^='a']", ["a1"]),
+    ("div[data-offer-id$='2']", ["b2"]),
+    ("div[data-offer-id*='1']", ["a1"]),
+    ("div[class~='destaque']", ["a1"]),
+    ("div[lang|='pt']", ["a1", "b2"]),
+    ("div[class*='inexistente']", []),
+])
+def test_seletores_casam_como_no_navegador(seletor, esperado):
+    assert _ids(selecionar(analisar_html(HTML), seletor)) == esperado
+
+
+def test_descendente_e_grupos():
+    raiz = analisar_html(HTML)
+    nomes = [no.text_content().strip() for no in selecionar(raiz, "div.card span.nome")]
+    assert nomes == ["Geladeira Frost Free", "Fogão 4 bocas"]
+    # Grupos da vírgula mantêm a ordem do documento, sem repetir nós
+    assert [no.tag for no in selecionar(raiz, "p.nome, span.preco")] == ["span", "p"]
+    assert selecionar_um(raiz, "span[aria-label*='R$']").text_content() == "R$ 2.999,00"
+    assert selecionar_um(raiz, "table") is None
+
+
+def test_seletor_nao_suportado():
+    with pytest.raises(ValueError):
+        selecionar(analisar_html(HTML), "div:nth-child(2)")
+
+
+def test_paginas_do_corpus_batem_com_o_esperado():
+    with open(os.path.join(PAGINAS, "esperado.json"), encoding="utf-8") as f:
+        paginas = json.load(f)
+    for pagina in paginas:
+        with open(os.path.join(PAGINAS, pagina["arquivo"]), encoding="utf-8") as f:
+            ofertas = extrair_produtos_html(f.read())
+        assert [{chave: o.get(chave) for chave in e} for o, e in zip(ofertas, pagina["ofertas"])] == pagina["ofertas"]
+        assert len(ofertas) == len(pagina["ofertas"]), pagina["arquivo"]
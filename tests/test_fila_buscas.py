@@ -0,0 +1,49 @@
+import pytest
+
+import app as aplicacao
+from fila_buscas import FilaBuscas, Job
+
+
+class _Buscador:
+    def buscar(self, produto, forcar=False, ao_ofertar=None, prazo=None):
+        return {"produto_buscado": produto, "timestamp": "2026-01-01 00:00:00", "produtos_patrocinados": []}
+
+
+def test_evento_fim_sai_antes_do_status_concluido():
+    job = Job(["tv"])
+    vistos = []
+    original = job.registrar_evento
+
+    def registrar(tipo, **dados):
+        vistos.append((tipo, job.status))
+        original(tipo, **dados)
+
+    job.registrar_evento = registrar
+    job.finalizar("concluido", "fim", relatorio="r.json")
+    assert vistos == [("fim", "pendente")]
+    assert job.finalizado() and job.eventos[-1]["tipo"] == "fim"
+
+
+def test_pool_compartilhado_tem_sessao_para_cada_thread_de_cada_job():
+    pytest.importorskip("selenium")
+    fila = FilaBuscas(max_jobs=2, max_threads=3)
+    buscador = fila._obter_buscador()
+    assert buscador.selenium.pool_drivers.tamanho == 6
+
+
+def test_last_event_id_invalido_recomeca_do_inicio(monkeypatch):
+    job = Job(["tv"])
+    job.registrar_evento("enfileirado", total=1)
+    job.finalizar("concluido", "fim", relatorio="r.json")
+
+    class _Fila:
+        def obter(self, job_id):
+            return job
+
+    monkeypatch.setattr(aplicacao, "obter_fila", lambda: _Fila())
+    cliente = aplicacao.app.test_client()
+    for valor in ("abc", "-5", ""):
+        corpo = cliente.get(f"/jobs/{job.id}/eventos", headers={"Last-Event-ID": valor}).get_data(as_text=True)
+        assert corpo.startswith("id: 0\n"), valor
+    corpo = cliente.get(f"/jobs/{job.id}/eventos", headers={"Last-Event-ID": "0"}).get_data(as_text=True)
+    assert corpo.startswith("id: 1\n")
@@ -0,0 +1,29 @@
+from cache_resultados import CacheResultados
+from estatisticas import estatisticas_historico
+from historico import HistoricoPrecos
+
+
+def _resultado(produto, timestamp, precos):
+    return {"produto_buscado": produto, "timestamp": timestamp,
+            "produtos_patrocinados": [{"nome": f"{produto} {i}", "preco": preco, "loja": "Loja"}
+                                      for i, preco in enumerate(precos)]}
+
+
+def test_acerto_de_cache_nao_conta_duas_vezes_no_historico(tmp_path):
+    historico = HistoricoPrecos(str(tmp_path / "historico.db"))
+    cache = CacheResultados(ttl=60)
+    agora = "2099-01-01 10:00:00"
+    original = cache.obter_ou_buscar("tv 50", lambda p: _resultado(p, agora, ["R$ 1.000,00", "R$ 2.000,00"]))
+    repetido = cache.obter_ou_buscar("TV  50", lambda p: None)
+    assert repetido["do_cache"] is True and "do_cache" not in original
+
+    historico.registrar_relatorio("relatorio_a.json", {"resultados_detalhados": {"tv 50": original}})
+    historico.registrar_relatorio("relatorio_b.json", {"resultados_detalhados": {"tv 50": repetido}})
+
+    (linha,) = estatisticas_historico(historico, "produto", dias=365 * 200)
+    assert linha["ofertas"] == 2
+    # O relatório com o acerto de cache continua completo
+    (do_relatorio,) = estatisticas_historico(historico, "produto", relatorio="relatorio_b.json")
+    assert do_relatorio["ofertas"] == 2
+    assert len(historico.historico_produto("tv 50", dias=365 * 200)) == 2
+    assert historico.carregar_relatorio("relatorio_b.json")["resultados_detalhados"]["tv 50"]["do_cache"] is True
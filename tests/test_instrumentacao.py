@@ -0,0 +1,31 @@
+import json
+
+import instrumentacao
+from instrumentacao import LogRastros
+
+
+def test_log_de_rastros_rotaciona_por_tamanho(tmp_path):
+    caminho = tmp_path / "rastros.jsonl"
+    log = LogRastros(str(caminho), max_bytes=1000)
+    for i in range(100):
+        log.registrar({"etapa": "navegacao", "i": i})
+    log.fechar()
+    anterior = (tmp_path / "rastros.jsonl.1").read_text(encoding="utf-8").splitlines()
+    atual = caminho.read_text(encoding="utf-8").splitlines()
+    # Só o arquivo atual e um anterior são mantidos, ambos abaixo do limite (mais uma linha)
+    assert len(anterior) + len(atual) < 100
+    assert json.loads(atual[-1])["i"] == 99
+    assert json.loads(anterior[-1])["i"] + 1 == json.loads(atual[0])["i"]
+    assert caminho.stat().st_size < 1000
+
+
+def test_spans_por_card_ficam_so_nas_metricas(tmp_path, monkeypatch):
+    log = LogRastros(str(tmp_path / "rastros.jsonl"))
+    monkeypatch.setattr(instrumentacao, "_rastros", log)
+    instrumentacao.registrar_span("extracao_preco", 0.001, "ok", rastrear=False)
+    instrumentacao.registrar_span("navegacao", 0.5)
+    log.fechar()
+    linhas = (tmp_path / "rastros.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(linha)["etapa"] for linha in linhas] == ["navegacao"]
+    assert 'etapa="extracao_preco"' in instrumentacao.obter_metricas().exportar_prometheus()
+
@@ -0,0 +1,11 @@
+from links import resolver_link, verificar_corpus
+
+
+def test_corpus_de_links():
+    casos, divergencias = verificar_corpus()
+    assert casos and divergencias == []
+
+
+def test_loja_fora_do_registro_so_perde_rastreadores_inequivocos():
+    resolvido = resolver_link("https://outra-loja.com.br/p?sid=9&type=g&ref=x&utm_medium=cpc&gclid=1")
+    assert resolvido["link"] == "https://outra-loja.com.br/p?ref=x&sid=9&type=g"
@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip("selenium")
+
+import main
+import tentativas
+from tentativas import DisjuntorBloqueio, PoliticaTentativas
+
+
+class _Driver:
+    def __init__(self, nome, morto=False):
+        self.nome = nome
+        self.morto = morto
+
+    @property
+    def current_url(self):
+        if self.morto:
+            raise ConnectionRefusedError("chromedriver não responde")
+        return "https://www.google.com/search?tbm=shop"
+
+    @property
+    def page_source(self):
+        return "<html></html>"
+
+
+class _Pool:
+    def __init__(self, drivers):
+        self.drivers = list(drivers)
+        self.emprestados = []
+        self.devolvidos = []
+
+    def adquirir(self, timeout=None):
+        driver = self.drivers.pop(0)
+        self.emprestados.append(driver)
+        return driver
+
+    def devolver(self, driver, descartar=False):
+        self.devolvidos.append((driver, descartar))
+
+
+def test_sessao_que_nao_responde_e_trocada_na_tentativa_seguinte(monkeypatch):
+    monkeypatch.setattr(tentativas, "_disjuntor", DisjuntorBloqueio())
+    morto, novo = _Driver("morto", morto=True), _Driver("novo")
+    usados = []
+
+    def consulta(driver, produto, *args, **kwargs):
+        usados.append(driver)
+        if driver.morto:
+            raise RuntimeError("sessão caiu no meio da consulta")
+        return {"produto_buscado": produto, "produtos_patrocinados": [{"nome": produto}]}
+
+    monkeypatch.setattr(main, "_executar_consulta", consulta)
+    pool = _Pool([morto, novo])
+    resultado = main.buscar_produtos_patrocinados("tv", max_tentativas=3, pool=pool,
+                                                  politica_tentativas=PoliticaTentativas(3, espera_base=0))
+    assert resultado["produtos_patrocinados"]
+    assert usados == [morto, novo]
+    assert pool.devolvidos == [(morto, True), (novo, False)]
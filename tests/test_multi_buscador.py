@@ -0,0 +1,47 @@
+import threading
+
+import multi_buscador
+from multi_buscador import MultiBuscador
+
+
+class _Buscador:
+    def __init__(self, espera=None):
+        self.espera = espera
+        self.chamadas = []
+        self._lock = threading.Lock()
+
+    def buscar(self, produto, forcar=False, ao_ofertar=None, prazo=None):
+        with self._lock:
+            self.chamadas.append((produto, prazo))
+        if self.espera is not None:
+            self.espera.wait(prazo)
+            raise TimeoutError(f"Prazo da busca por '{produto}' esgotado")
+        return {"produto_buscado": produto, "timestamp": "2026-01-01 00:00:00",
+                "produtos_patrocinados": [{"nome": produto, "preco": "R$ 1,00"}]}
+
+
+class _Historico:
+    def registrar_relatorio(self, nome, relatorio):
+        pass
+
+
+class _Detector:
+    def processar(self, resultado):
+        return []
+
+
+def test_produtos_repetidos_sao_buscados_uma_vez(tmp_path, monkeypatch):
+    monkeypatch.setattr(multi_buscador, "FORMATO_RELATORIO", "json")
+    buscador = _Buscador()
+    multi = MultiBuscador(buscador=buscador, diretorio=str(tmp_path), historico=_Historico(), detector=_Detector())
+    relatorio = multi.executar_buscas_simultaneas(["tv", "geladeira", "tv"], max_threads=2)
+    assert sorted(p for p, _ in buscador.chamadas) == ["geladeira", "tv"]
+    assert list(relatorio["resultados_detalhados"]) == ["tv", "geladeira"]
+
+
+def test_prazo_da_tarefa_chega_a_busca():
+    buscador = _Buscador(espera=threading.Event())
+    multi = MultiBuscador(buscador=buscador, timeout_tarefa=0.2)
+    (produto, resultado), = list(multi.buscar_em_fluxo(["tv"], max_threads=1))
+    assert buscador.chamadas == [("tv", 0.2)]
+    assert "esgotado" in resultado["erro"]
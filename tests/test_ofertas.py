@@ -0,0 +1,64 @@
+from ofertas import (
+    LoteOfertas, ResultadoBusca, desserializar_resultado, desserializar_resultados, ler_resultados,
+    ofertas_sinteticas, serializar_resultado, serializar_resultados
+)
+
+
+def _resultado_variado():
+    return {
+        "produto_buscado": "geladeira frost free",
+        "timestamp": "2026-03-01 12:34:56",
+        "produtos_patrocinados": [
+            {"nome": "Geladeira Brastemp 375L", "preco": "R$ 3.499,00", "loja": "Magazine Luiza",
+             "link": "https://loja.com/p/1", "preco_centavos": 349900, "parcelas": 10,
+             "valor_parcela_centavos": 34990, "preco_anterior_centavos": 399900},
+            # Texto de preço que não sai de formatar_centavos, campos nulos e ausentes
+            {"nome": "Geladeira Consul", "preco": "R$3499", "loja": None, "preco_centavos": 349900},
+            {"nome": "Refrigerador — edição “ñ”", "preco": None, "link": "", "preco_centavos": None},
+            # Tipos fora do modelo e chaves desconhecidas seguem em extras
+            {"nome": "Geladeira Electrolux", "preco_centavos": "349900", "parcelas": 2 ** 70,
+             "avaliacao": 4.5, "selos": ["frete grátis"], "fonte": "loja_html"},
+        ],
+        "backend": "http",
+        "tempos_fases": {"navegacao": 1.2},
+    }
+
+
+def test_ida_e_volta_binaria_nao_perde_nada():
+    resultado = _resultado_variado()
+    dados = serializar_resultado(resultado)
+    volta = desserializar_resultado(dados)
+    assert volta == resultado
+    # Ofertas sem extras mantêm a ordem das chaves da extração
+    assert [list(o) for o in volta["produtos_patrocinados"][:3]] == \
+        [list(o) for o in resultado["produtos_patrocinados"][:3]]
+
+
+def test_timestamp_fora_do_formato_segue_como_texto():
+    resultado = {"produto_buscado": "tv", "timestamp": "01/03/2026", "produtos_patrocinados": []}
+    assert desserializar_resultado(serializar_resultado(resultado)) == resultado
+    assert desserializar_resultado(serializar_resultado({"produto_buscado": "tv"})) == {"produto_buscado": "tv"}
+
+
+def test_varios_resultados_e_textos_compartilhados():
+    resultados = ofertas_sinteticas(200, ofertas_por_busca=20)
+    dados = serializar_resultados(resultados)
+    assert desserializar_resultados(dados) == resultados
+
+    compartilhados = {}
+    lidos = ler_resultados(dados, compartilhados)
+    lojas = {}
+    for lido in lidos:
+        for oferta in lido.ofertas:
+            # A mesma loja em buscas diferentes vira um único objeto
+            assert lojas.setdefault(oferta.loja, oferta.loja) is oferta.loja
+    assert [r.para_dict() for r in lidos] == resultados
+
+
+def test_lote_em_colunas():
+    resultado = _resultado_variado()
+    lote = LoteOfertas.de_dicts(resultado["produtos_patrocinados"])
+    assert len(lote) == 4
+    assert lote[0].para_dict() == resultado["produtos_patrocinados"][0]
+    assert lote.para_dicts() == resultado["produtos_patrocinados"]
+    assert isinstance(ResultadoBusca.de_dict(resultado).timestamp, int)
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from pool_drivers import PoolDrivers
+from tentativas import TRANSITORIA, FalhaBusca, classificar_falha
+
+
+class _Driver:
+    current_url = "about:blank"
+    window_handles = ["aba"]
+
+    def __init__(self):
+        self.switch_to = self
+
+    def window(self, aba):
+        pass
+
+    def delete_all_cookies(self):
+        pass
+
+    def get(self, url):
+        pass
+
+    def execute_script(self, script):
+        return None
+
+    def quit(self):
+        pass
+
+
+def test_falha_da_fabrica_libera_a_vaga():
+    falhas = [RuntimeError("chrome não iniciou")]
+
+    def fabrica():
+        if falhas:
+            raise falhas.pop()
+        return _Driver()
+
+    pool = PoolDrivers(tamanho=1, aquecer=False, fabrica=fabrica)
+    with pytest.raises(RuntimeError):
+        pool.adquirir()
+    assert pool._criadas == 0
+    assert isinstance(pool.adquirir(timeout=1), _Driver)
+
+
+def test_aquecer_para_quando_a_fabrica_nao_entrega_driver():
+    pool = PoolDrivers(tamanho=2, fabrica=lambda: None)
+    assert pool._criadas == 0
+
+
+def _esperar_driver(pool, timeout=None):
+    """Pede um driver em outra thread; retorna a thread e a lista com o driver ou o erro"""
+    recebido = []
+
+    def pedir():
+        try:
+            recebido.append(pool.adquirir(timeout=timeout))
+        except Exception as e:
+            recebido.append(e)
+
+    thread = threading.Thread(target=pedir, daemon=True)
+    thread.start()
+    time.sleep(0.1)
+    assert not recebido
+    return thread, recebido
+
+
+@pytest.mark.parametrize("descartar", [False, True])
+def test_quem_espera_acorda_quando_a_sessao_volta_ou_a_vaga_abre(descartar):
+    pool = PoolDrivers(tamanho=1, aquecer=False, fabrica=_Driver)
+    emprestado = pool.adquirir()
+    thread, recebido = _esperar_driver(pool)
+    pool.devolver(emprestado, descartar=descartar)
+    thread.join(1)
+    assert len(recebido) == 1 and isinstance(recebido[0], _Driver)
+    assert (recebido[0] is emprestado) is not descartar
+
+
+def test_quem_espera_acorda_quando_a_fabrica_falha():
+    liberar = threading.Event()
+    fabricas = [lambda: liberar.wait(1) and None]
+    pool = PoolDrivers(tamanho=1, aquecer=False,
+                       fabrica=lambda: fabricas.pop()() if fabricas else _Driver())
+    # A primeira chamada reserva a única vaga e fica presa na fábrica
+    primeira, erro = _esperar_driver(pool)
+    thread, recebido = _esperar_driver(pool)
+    liberar.set()
+    primeira.join(1)
+    thread.join(1)
+    assert isinstance(erro[0], FalhaBusca)
+    assert len(recebido) == 1 and isinstance(recebido[0], _Driver)
+
+
+def test_timeout_sem_vaga_e_falha_transitoria():
+    pool = PoolDrivers(tamanho=1, aquecer=False, fabrica=_Driver)
+    pool.adquirir()
+    inicio = time.monotonic()
+    with pytest.raises(FalhaBusca) as erro:
+        pool.adquirir(timeout=0.2)
+    assert time.monotonic() - inicio < 1
+    assert classificar_falha(erro.value) == TRANSITORIA
+
+
+def test_fechar_acorda_quem_espera():
+    pool = PoolDrivers(tamanho=1, aquecer=False, fabrica=_Driver)
+    pool.adquirir()
+    thread, recebido = _esperar_driver(pool)
+    pool.fechar()
+    thread.join(1)
+    assert len(recebido) == 1 and isinstance(recebido[0], RuntimeError)
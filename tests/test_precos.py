@@ -0,0 +1,33 @@
+import pytest
+
+from precos import analisar_preco, converter_centavos, formatar_centavos
+
+
+@pytest.mark.parametrize("texto, centavos", [
+    ("R$ 1.234,56", 123456),
+    ("R$ 1.234.567,89", 123456789),
+    ("R$ 3.499,00 à vista", 349900),
+    ("R$ 0,5", 50),
+    ("1.234", 123400),
+    ("1234", 123400),
+    ("12.99", 1299),
+    ("10x de R$ 31,99", 3199),
+])
+def test_converter_centavos(texto, centavos):
+    assert converter_centavos(texto) == centavos
+
+
+@pytest.mark.parametrize("texto", [None, "", ",", "grátis", "R$ --"])
+def test_converter_centavos_sem_numero(texto):
+    assert converter_centavos(texto) is None
+
+
+def test_formatar_e_converter_sao_inversos():
+    for centavos in (0, 5, 99, 100, 123456, 123456789):
+        assert converter_centavos(formatar_centavos(centavos)) == centavos
+
+
+def test_analisar_preco_le_parcelas_e_preco_anterior():
+    campos = analisar_preco("R$ 3.199,00", "Notebook R$ 3.199,00 ou 10x de R$ 319,90 Custava R$ 3.499,00")
+    assert campos == {"preco_centavos": 319900, "parcelas": 10, "valor_parcela_centavos": 31990,
+                      "preco_anterior_centavos": 349900}
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from relatorio_incremental import EXTENSAO_INDICE, EscritorRelatorio, LeitorRelatorio, carregar_relatorio_arquivo
+
+
+def _resultado(produto, precos=("R$ 10,00",)):
+    return {"produto_buscado": produto, "timestamp": "2026-01-01 10:00:00",
+            "produtos_patrocinados": [{"nome": f"{produto} {i}", "preco": p} for i, p in enumerate(precos)]}
+
+
+def _gravar(caminho, comprimir, finalizar=True):
+    produtos = ["tv", "geladeira", "fogão"]
+    escritor = EscritorRelatorio(str(caminho), produtos=produtos, inicio="2026-01-01 10:00:00", comprimir=comprimir)
+    # Concluídos fora da ordem da lista de entrada
+    escritor.adicionar(_resultado("fogão", ("R$ 1.000,00", "R$ 900,00")))
+    escritor.adicionar(_resultado("tv"))
+    if finalizar:
+        escritor.finalizar({"total_produtos_buscados": 3})
+    else:
+        escritor.fechar()
+    return produtos
+
+
+@pytest.mark.parametrize("comprimir, nome", [(True, "r.jsonl.gz"), (False, "r.jsonl")])
+def test_leitura_de_um_produto_pelo_indice(tmp_path, comprimir, nome):
+    caminho = tmp_path / nome
+    _gravar(caminho, comprimir)
+    with LeitorRelatorio(str(caminho)) as leitor:
+        assert leitor.completo
+        assert leitor.produtos() == ["tv", "fogão"]
+        assert leitor.resultado("fogão") == _resultado("fogão", ("R$ 1.000,00", "R$ 900,00"))
+        assert leitor.resultado("geladeira") is None
+        assert leitor.resumo() == {"total_produtos_buscados": 3}
+
+
+def test_indice_ausente_e_reconstruido(tmp_path):
+    caminho = tmp_path / "r.jsonl.gz"
+    _gravar(caminho, True)
+    os.remove(str(caminho) + EXTENSAO_INDICE)
+    with LeitorRelatorio(str(caminho)) as leitor:
+        assert leitor.produtos() == ["tv", "fogão"]
+        assert leitor.resultado("tv") == _resultado("tv")
+
+
+def test_registro_sem_entrada_no_indice_e_lido(tmp_path):
+    caminho = tmp_path / "r.jsonl"
+    _gravar(caminho, False, finalizar=False)
+    # Simula uma queda entre a gravação do registro e a do índice
+    escritor_indice = str(caminho) + EXTENSAO_INDICE
+    with open(escritor_indice, encoding="utf-8") as f:
+        linhas = f.readlines()
+    with open(escritor_indice, "w", encoding="utf-8") as f:
+        f.writelines(linhas[:-1])
+    with LeitorRelatorio(str(caminho)) as leitor:
+        assert leitor.produtos() == ["tv", "fogão"]
+
+
+def test_lote_interrompido_recalcula_o_resumo(tmp_path):
+    caminho = tmp_path / "r.jsonl.gz"
+    _gravar(caminho, True, finalizar=False)
+    # Último registro truncado no meio
+    with open(caminho, "ab") as f:
+        f.write(b"\x1f\x8b\x08\x00")
+    os.remove(str(caminho) + EXTENSAO_INDICE)
+    relatorio = carregar_relatorio_arquivo(str(caminho))
+    assert list(relatorio["resultados_detalhados"]) == ["tv", "fogão"]
+    assert relatorio["resumo"]["total_produtos_buscados"] == 3
+    assert relatorio["resumo"]["buscas_sucessos"] == 2
+    assert relatorio["resumo"]["total_produtos_encontrados"] == 3
@@ -0,0 +1,42 @@
+from extracao import SELETORES_PRECO, SELETORES_NOME, SELETORES_PRODUTOS
+from seletores import RegistroSeletores
+
+
+def _registro(tmp_path, intervalo_sondagem=5):
+    return RegistroSeletores(arquivo_estatisticas=str(tmp_path / "estatisticas.json"),
+                             arquivo_seletores=str(tmp_path / "seletores.json"),
+                             intervalo_sondagem=intervalo_sondagem)
+
+
+def test_seletor_de_preco_rebaixado_nunca_passa_o_curado(tmp_path):
+    registro = _registro(tmp_path)
+    generico = "div[data-offer-id] span"
+    for _ in range(50):
+        # O genérico "acerta" (casou uma parcela com R$) e o curado falha no card
+        registro.registrar_cascata("preco", [SELETORES_PRECO[0], generico], generico)
+    for _ in range(3 * registro.intervalo_sondagem):
+        assert registro.ordem("preco") == SELETORES_PRECO
+
+
+def test_cascata_de_nome_mantem_ordem_curada(tmp_path):
+    registro = _registro(tmp_path)
+    for _ in range(20):
+        registro.registrar("nome", "*[class*='name']", True)
+        registro.registrar("nome", SELETORES_NOME[0], False)
+    assert registro.ordem("nome") == SELETORES_NOME
+    assert [s["seletor"] for s in registro.relatorio()["nome"]] == SELETORES_NOME
+
+
+def test_cascata_de_produtos_se_adapta(tmp_path):
+    registro = _registro(tmp_path, intervalo_sondagem=0)
+    ultimo = SELETORES_PRODUTOS[-1]
+    for _ in range(10):
+        registro.registrar_cascata("produtos", SELETORES_PRODUTOS, ultimo)
+    assert registro.ordem("produtos")[0] == ultimo
+
+
+def test_sondagem_coloca_seletor_rebaixado_na_frente(tmp_path):
+    registro = _registro(tmp_path, intervalo_sondagem=3)
+    primeiros = [registro.ordem("produtos")[0] for _ in range(3)]
+    assert primeiros[0] == primeiros[1] == SELETORES_PRODUTOS[0]
+    assert primeiros[2] != SELETORES_PRODUTOS[0]
@@ -0,0 +1,38 @@
+import pytest
+
+from tentativas import (
+    BLOQUEIO, MARCACAO, SESSAO_PERDIDA, TRANSITORIA, FalhaBusca, PoliticaTentativas, classificar_falha
+)
+
+
+class _DriverMorto:
+    @property
+    def current_url(self):
+        raise ConnectionRefusedError("chromedriver não responde")
+
+
+class InvalidSessionIdException(Exception):
+    pass
+
+
+class NoSuchWindowException(Exception):
+    pass
+
+
+@pytest.mark.parametrize("erro, driver, tipo", [
+    (TimeoutError("lento"), None, TRANSITORIA),
+    (ValueError("card sem nome"), None, MARCACAO),
+    (FalhaBusca(BLOQUEIO, "captcha"), _DriverMorto(), BLOQUEIO),
+    (InvalidSessionIdException("invalid session id"), None, SESSAO_PERDIDA),
+    (NoSuchWindowException("no such window"), None, SESSAO_PERDIDA),
+    (TimeoutError("lento"), _DriverMorto(), SESSAO_PERDIDA),
+])
+def test_classificar_falha(erro, driver, tipo):
+    assert classificar_falha(erro, driver) == tipo
+
+
+def test_sessao_perdida_e_repetida_em_outra_sessao():
+    politica = PoliticaTentativas()
+    assert politica.repetir(SESSAO_PERDIDA)
+    assert not politica.mesma_sessao(SESSAO_PERDIDA)
+    assert politica.mesma_sessao(TRANSITORIA)